@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# source code owned by Twitch Plays Pokemon AUTHORIZED USE ONLY see LICENSE.MD
+"""Match attempt budgets per mode combination, see attempt_budgets in settings.yaml."""
+import json
+import logging
+import math
+import os
+import random
+
+log = logging.getLogger(__name__)
+
+
+class AttemptBudgets:
+    """Rolling balancing statistics per (metagame, gimmick, team sizes),
+    and the max_attempts each combination gets from them.
+
+    Attributes:
+        stats: dict of combination key to a dict of balanced 'matches',
+            rolling 'acceptance_rate', rolling 'attempts_to_accept' of
+            the accepted matches (None until one is accepted), and
+            rolling 'best_winchance' reached.
+    """
+
+    def __init__(self, cfg):
+        self.enabled = cfg['enabled']
+        self.min_matches = cfg['min_matches']
+        self.smoothing = cfg['smoothing']
+        self.hopeless_acceptance_rate = cfg['hopeless_acceptance_rate']
+        self.min_attempts = cfg['min_attempts']
+        self.attempts_factor = cfg['attempts_factor']
+        self.explore_rate = cfg['explore_rate']
+        self.path = cfg['path']
+        self.save_every = cfg['save_every']
+        self.stats = {}
+        self._unsaved = 0
+        if self.path and os.path.exists(self.path):
+            self.load(self.path)
+
+    @staticmethod
+    def key(metagame, gimmick, team_sizes):
+        return "{}/{}/{}v{}".format(metagame.primary_id, gimmick.primary_id, team_sizes[0], team_sizes[1])
+
+    def get(self, key, max_attempts):
+        """Attempt budget of a combination, at most max_attempts."""
+        if not self.enabled:
+            return max_attempts
+        if random.random() < self.explore_rate:
+            # Full budget now and then, so budgets cut short can recover.
+            return max_attempts
+        return self._get_budget(self.stats.get(key), max_attempts)
+
+    def record(self, key, accepted, attempts, best_winchance=None):
+        """Update a combination's statistics with a balanced match.
+
+        Args:
+            accepted: Whether the match was acceptably balanced.
+            attempts: Match attempts made.
+            best_winchance: Estimated winchance of the match, None if
+                no attempt got analyzed.
+        """
+        stats = self.stats.setdefault(key, {
+            'matches': 0, 'acceptance_rate': 0.0, 'attempts_to_accept': None, 'best_winchance': None})
+        stats['matches'] += 1
+        # plain averages until there are enough matches for the smoothing
+        weight = max(self.smoothing, 1 / stats['matches'])
+        stats['acceptance_rate'] = _rolling(stats['acceptance_rate'], float(accepted), weight)
+        if accepted:
+            stats['attempts_to_accept'] = _rolling(stats['attempts_to_accept'], attempts, weight)
+        if best_winchance is not None:
+            stats['best_winchance'] = _rolling(stats['best_winchance'], best_winchance, weight)
+        self._unsaved += 1
+        if self.path and self._unsaved >= self.save_every:
+            self.save()
+
+    def export(self, max_attempts):
+        """Copy of the statistics, with the 'budget' of each combination."""
+        return {key: dict(stats, budget=self._get_budget(stats, max_attempts))
+                for key, stats in self.stats.items()}
+
+    def load(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            self.stats = json.load(f)
+        log.info("Loaded attempt budget statistics of %d mode combinations from %s", len(self.stats), path)
+
+    def save(self, path=None):
+        path = path or self.path
+        temp_path = path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.stats, f, indent=1, sort_keys=True)
+            os.replace(temp_path, path)
+        except IOError:
+            log.exception("Failed to save attempt budget statistics to %s", path)
+        else:
+            self._unsaved = 0
+
+    def _get_budget(self, stats, max_attempts):
+        if stats is None or stats['matches'] < self.min_matches:
+            return max_attempts
+        if stats['acceptance_rate'] < self.hopeless_acceptance_rate:
+            return min(self.min_attempts, max_attempts)
+        if stats['attempts_to_accept'] is None:
+            return max_attempts
+        budget = math.ceil(stats['attempts_to_accept'] * self.attempts_factor)
+        return max(self.min_attempts, min(budget, max_attempts))
+
+
+def _rolling(average, value, weight):
+    if average is None:
+        return value
+    return average + (value - average) * weight
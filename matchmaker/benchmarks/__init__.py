@@ -0,0 +1,20 @@
+"""
+Benchmarks for the matchmaker. They need the same environment as the tests
+(a local mongod and pbrpokemondb.json), unless noted otherwise.
+
+Query latency of the pokesets collection, with and without indexes:
+python -m matchmaker.benchmarks.pokesets
+
+Time per matchanalyzer.analyze call for 3v3 and 6v6 matches (no mongod):
+python -m matchmaker.benchmarks.analyzer
+
+Recorded analyses to check a changed analyzer against, with throughput per
+team size (no mongod, check doesn't need pbrpokemondb.json either):
+python -m matchmaker.benchmarks.golden record
+python -m matchmaker.benchmarks.golden check
+
+Analyzer calls per acceptably balanced match, with new match attempts only
+and with local search (no mongod):
+python -m matchmaker.benchmarks.balancing
+
+"""
@@ -0,0 +1,94 @@
+"""
+Times matchanalyzer.analyze on random 3v3 and 6v6 matches built from the
+sets in pbrpokemondb.json. No database is needed.
+
+python -m matchmaker.benchmarks.analyzer [--matches N] [--seed S] [--analyzer PATH] [--fight-cache-size N]
+
+--analyzer loads another analyzer.py to time side by side with the current
+one, e.g. the one of an older commit. Modules next to it (effectiveness.py)
+are imported from the same directory:
+git archive <commit> matchmaker/utils/matchanalyzer | tar -x -C /tmp/before
+python -m matchmaker.benchmarks.analyzer --analyzer /tmp/before/matchmaker/utils/matchanalyzer/analyzer.py
+
+The current analyzer runs without its fight cache unless --fight-cache-size
+is given, so the numbers measure the analysis itself.
+"""
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import time
+import types
+from copy import deepcopy
+
+import pokecat
+
+from matchmaker.utils.matchanalyzer import MatchMaker
+from matchmaker.utils.pbrpokemondb import get_pbr_pokemon_db
+from matchmaker.utils.pokemondb import default_dir_path
+
+TEAM_SIZES = (3, 6)
+
+
+def make_matches(pokesets, team_size, count, seed):
+    rng = random.Random(seed)
+    matches = []
+    for _ in range(count):
+        sets = rng.sample(pokesets, 2 * team_size)
+        teams = [pokecat.instantiate_pokeset(deepcopy(pokeset)) for pokeset in sets]
+        matches.append((teams[:team_size], teams[team_size:]))
+    return matches
+
+
+def load_analyzer(file_path):
+    # a package of its own, so relative imports find the modules next to file_path
+    package = types.ModuleType("analyzer_under_test")
+    package.__path__ = [os.path.dirname(os.path.abspath(file_path))]
+    sys.modules[package.__name__] = package
+    spec = importlib.util.spec_from_file_location("analyzer_under_test.analyzer", file_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module.MatchMaker
+
+
+def timed(analyze, matches):
+    durations = []
+    for blue, red in matches:
+        start = time.perf_counter()
+        analyze(blue, red)
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return (sum(durations) / len(durations), durations[len(durations) // 2],
+            durations[min(len(durations) - 1, int(len(durations) * 0.99))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--matches", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--analyzer", help="path of another analyzer.py to compare against")
+    parser.add_argument("--fight-cache-size", type=int, default=0)
+    args = parser.parse_args()
+
+    pokesets = get_pbr_pokemon_db(default_dir_path)
+    current = MatchMaker(fight_cache_size=args.fight_cache_size)
+    analyzers = [("current", current.analyze)]
+    if args.analyzer:
+        analyzers.insert(0, (args.analyzer, load_analyzer(args.analyzer)().analyze))
+
+    print("{} matches per team size, {} pokesets\n".format(args.matches, len(pokesets)))
+    print("    {:<8} {:<40} {:>9} {:>9} {:>9}".format("match", "analyzer", "mean ms", "p50 ms", "p99 ms"))
+    for team_size in TEAM_SIZES:
+        matches = make_matches(pokesets, team_size, args.matches, args.seed)
+        for name, analyze in analyzers:
+            mean, p50, p99 = timed(analyze, matches)
+            print("    {:<8} {:<40} {:>9.3f} {:>9.3f} {:>9.3f}".format(
+                "{0}v{0}".format(team_size), name[-40:], mean, p50, p99))
+    if current.fight_cache is not None:
+        print("\nfight cache: {}".format(current.fight_cache.stats()))
+
+
+if __name__ == '__main__':
+    main()
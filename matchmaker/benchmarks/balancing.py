@@ -0,0 +1,62 @@
+"""
+Compares the match balancing strategies of the matchmaker: new match attempts
+only, and new attempts followed by replacing single Pokemon of the most
+balanced match so far (local_search in settings.yaml). Uses the in-memory set
+repository, so no database is needed, only pbrpokemondb.json.
+
+python -m matchmaker.benchmarks.balancing [--matches N] [--seed S] [--event EVENT] [--new-attempts N]
+
+Both strategies start from the same seed. For each, prints how many
+matches were acceptably balanced, the analyzer calls per acceptable match
+and the time per match.
+"""
+import argparse
+import logging
+import random
+import sys
+import time
+
+from matchmaker import Matchmaker
+from matchmaker.utils.memorypokemondb import MemoryPokemonSetRepository
+
+
+def run(event, local_search, matches, seed):
+    # a new matchmaker for each strategy, so both start from the same rotation and cooldowns
+    random.seed(seed)
+    mm = Matchmaker(event, MemoryPokemonSetRepository('pbr'), 'pbr')
+    mm._cfg['local_search'].update(local_search)
+    start = time.perf_counter()
+    for i in range(matches):
+        mm.make(seed=seed + i)
+    duration = time.perf_counter() - start
+    return dict(mm.balancing_stats), duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--matches", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--event", default="standard")
+    parser.add_argument("--new-attempts", type=int, default=None,
+                        help="new attempts before local search, defaults to settings.yaml")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("matchmaker").setLevel(logging.ERROR)
+
+    local_search = {}
+    if args.new_attempts is not None:
+        local_search['new_attempts'] = args.new_attempts
+    print("{:<14} {:>9} {:>11} {:>10} {:>11} {:>9}".format(
+        "strategy", "accepted", "new calls", "swap calls", "calls/acc", "ms/match"))
+    for name, enabled in (("new attempts", False), ("local search", True)):
+        stats, duration = run(args.event, dict(local_search, enabled=enabled), args.matches, args.seed)
+        accepted = stats.get('accepted', 0)
+        calls = stats.get('analyses', 0) + stats.get('swap_analyses', 0)
+        print("{:<14} {:>4}/{:<4} {:>11} {:>10} {:>11} {:>9.1f}".format(
+            name, accepted, args.matches, stats.get('analyses', 0), stats.get('swap_analyses', 0),
+            "{:.2f}".format(calls / accepted) if accepted else "-", duration / args.matches * 1000))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Golden outputs of matchanalyzer.analyze, to make sure a changed analyzer still
+gives exactly the same results, and how fast it gives them.
+
+python -m matchmaker.benchmarks.golden record [--matches N] [--seed S] [--golden PATH] [--analyzer PATH]
+python -m matchmaker.benchmarks.golden check [--golden PATH] [--analyzer PATH] [--fight-cache-size N]
+
+record samples team pairs from pbrpokemondb.json, --matches for every team
+size and effectiveness variant, and stores the teams together with their full
+analysis. Record with the analyzer before a change (--analyzer takes an
+analyzer.py like the analyzer benchmark does), then check the changed one.
+
+check analyzes the stored teams again and lists every analysis that differs
+from the recorded one, then prints analyses per second and p50/p99 latency per
+team size. It only needs the golden file. The exit status is 1 if anything
+differs.
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from collections import OrderedDict
+from copy import deepcopy
+
+import pokecat
+
+from matchmaker.benchmarks.analyzer import load_analyzer
+from matchmaker.utils.matchanalyzer import MatchMaker, render_match_prediction
+from matchmaker.utils.matchanalyzer.effectiveness import TABLES
+from matchmaker.utils.pbrpokemondb import get_pbr_pokemon_db
+from matchmaker.utils.pokemondb import default_dir_path
+
+DEFAULT_GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "analyzer_golden.json.gz")
+# (blue, red), including the uneven sizes some gimmicks make
+TEAM_SIZES = ((1, 1), (2, 2), (3, 3), (4, 4), (6, 6), (2, 3), (3, 4))
+
+
+def as_json(analysis):
+    """The analysis the way it is stored, with its MatchPrediction rendered and without the raw Deaths."""
+    if 'Deaths' in analysis:
+        analysis = render_match_prediction(dict(analysis))
+        del analysis['Deaths']
+    return json.loads(json.dumps(analysis))
+
+
+def make_cases(pokesets, matches, seed):
+    rng = random.Random(seed)
+    cases = []
+    for blue_size, red_size in TEAM_SIZES:
+        for effectiveness in sorted(TABLES):
+            for _ in range(matches):
+                sets = rng.sample(pokesets, blue_size + red_size)
+                teams = [pokecat.instantiate_pokeset(deepcopy(pokeset)) for pokeset in sets]
+                cases.append({"effectiveness": effectiveness,
+                              "blue": teams[:blue_size], "red": teams[blue_size:]})
+    # stored as json, so the recorded teams are exactly the ones check reads back
+    return json.loads(json.dumps(cases))
+
+
+def get_analyze(analyzer_path, fight_cache_size):
+    if analyzer_path:
+        return load_analyzer(analyzer_path)().analyze
+    return MatchMaker(fight_cache_size=fight_cache_size).analyze
+
+
+def record(args):
+    analyze = get_analyze(args.analyzer, 0)
+    cases = make_cases(get_pbr_pokemon_db(default_dir_path), args.matches, args.seed)
+    for case in cases:
+        case["analysis"] = as_json(analyze(case["blue"], case["red"], case["effectiveness"]))
+    with gzip.open(args.golden, "wt", encoding="utf-8") as golden_file:
+        json.dump({"seed": args.seed, "analyzer": args.analyzer or "current", "cases": cases}, golden_file)
+    print("Recorded {} analyses to {}".format(len(cases), args.golden))
+    return 0
+
+
+def check(args):
+    with gzip.open(args.golden, "rt", encoding="utf-8") as golden_file:
+        golden = json.load(golden_file)
+    analyze = get_analyze(args.analyzer, args.fight_cache_size)
+
+    durations = OrderedDict()
+    mismatches = 0
+    for i, case in enumerate(golden["cases"]):
+        start = time.perf_counter()
+        analysis = analyze(case["blue"], case["red"], case["effectiveness"])
+        duration = (time.perf_counter() - start) * 1000
+        durations.setdefault("{}v{}".format(len(case["blue"]), len(case["red"])), []).append(duration)
+        analysis = as_json(analysis)
+        if analysis != case["analysis"]:
+            mismatches += 1
+            differing = sorted(key for key in set(analysis) | set(case["analysis"])
+                               if analysis.get(key) != case["analysis"].get(key))
+            print("case {} ({}v{}, {}): {} differ".format(
+                i, len(case["blue"]), len(case["red"]), case["effectiveness"], ", ".join(differing)))
+
+    print("{} analyses, {} differ from {} (recorded with {})\n".format(
+        len(golden["cases"]), mismatches, args.golden, golden["analyzer"]))
+    print("    {:<8} {:>10} {:>9} {:>9}".format("match", "per sec", "p50 ms", "p99 ms"))
+    for team_size, times in durations.items():
+        times.sort()
+        print("    {:<8} {:>10.1f} {:>9.3f} {:>9.3f}".format(
+            team_size, len(times) / sum(times) * 1000, times[len(times) // 2],
+            times[min(len(times) - 1, int(len(times) * 0.99))]))
+    return 1 if mismatches else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("record", "check"))
+    parser.add_argument("--golden", default=DEFAULT_GOLDEN_PATH)
+    parser.add_argument("--analyzer", help="path of another analyzer.py to record or check")
+    parser.add_argument("--matches", type=int, default=25, help="per team size and effectiveness (record)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fight-cache-size", type=int, default=0, help="(check)")
+    args = parser.parse_args()
+    return record(args) if args.command == "record" else check(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Runs the query shapes issued by PokemonSetRepository against a local mongod
+and reports their latency and the chosen query plan, once without and once
+with the repository's indexes. The resident set index answering `get_by` is
+timed for comparison.
+
+python -m matchmaker.benchmarks.pokesets [--uri URI] [--db NAME] [--repeat N]
+
+The database given by --db is populated from pbrpokemondb.json and has its
+indexes dropped and recreated, so don't point it at the production database.
+"""
+import argparse
+import random
+import time
+
+import pymongo
+
+from matchmaker.utils.pokemondb import PokemonSetRepository, make_get_by_query
+
+
+def query_shapes(repository):
+    """(name, get_by kwargs) pairs mirroring the lookups done by TeamsMaker."""
+    rng = random.Random(0)
+    pokesets = list(repository.index.documents())
+    sample = rng.choice(pokesets)
+    species_id = sample["_id"]["species"]
+    setname = sample["_id"]["setname"]
+    return [
+        ("metagame", dict(tags_all=["standard"])),
+        ("metagame combo", dict(tags_none=["no-mixing"], tags_all=["standard"])),
+        ("afflicted", dict(tags_none=["species+Shedinja"], tags_all=["standard"])),
+        ("pokemon theme", dict(tags_any=["type+Fire"], tags_all=["standard"])),
+        ("shinies", dict(tags_all=["standard"], shinies=True, hidden=False)),
+        ("bid species", dict(species_id=species_id)),
+        ("bid species+setname", dict(species_id=species_id, setname=setname)),
+    ]
+
+
+def winning_index(explanation):
+    """Name of the index used by the winning plan, or the scan stage."""
+    stage = explanation["queryPlanner"]["winningPlan"]
+    while stage:
+        if "indexName" in stage:
+            return stage["indexName"]
+        if stage.get("stage") == "COLLSCAN":
+            return "COLLSCAN"
+        stage = stage.get("inputStage") or (stage.get("inputStages") or [None])[0]
+    return "?"
+
+
+def timed(func, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return durations[len(durations) // 2], durations[min(len(durations) - 1, int(len(durations) * 0.99))]
+
+
+def run_queries(repository, shapes, repeat):
+    rows = []
+    for name, kwargs in shapes:
+        kwargs = dict(kwargs)
+        kwargs.pop("setname", None)
+        query = make_get_by_query(**kwargs)
+        p50, p99 = timed(lambda: list(repository.sets.find(query)), repeat)
+        rows.append((name, winning_index(repository.sets.find(query).explain()), p50, p99))
+    last_match = {"_id.species": shapes[-1][1]["species_id"], "enabled": True}
+    sort = [("last_match_at", -1)]
+    p50, p99 = timed(lambda: repository.sets.find_one(last_match, sort=sort), repeat)
+    rows.append(("last match for species",
+                 winning_index(repository.sets.find(last_match, sort=sort).limit(1).explain()), p50, p99))
+    return rows
+
+
+def print_rows(title, rows):
+    print(title)
+    print("    {:<26} {:<30} {:>9} {:>9}".format("query", "plan", "p50 ms", "p99 ms"))
+    for name, plan, p50, p99 in rows:
+        print("    {:<26} {:<30} {:>9.3f} {:>9.3f}".format(name, plan, p50, p99))
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--db", default="pbrmatchmaker_benchmark")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    db = pymongo.MongoClient(args.uri)[args.db]
+    repository = PokemonSetRepository(db, "pbr", appearance_flush_interval=0)
+    shapes = query_shapes(repository)
+    print("{} enabled pokesets\n".format(len(repository.index)))
+
+    repository.sets.drop_indexes()
+    print_rows("mongo, without indexes", run_queries(repository, shapes, args.repeat))
+    repository.ensure_indexes()
+    print_rows("mongo, with indexes", run_queries(repository, shapes, args.repeat))
+
+    rows = []
+    for name, kwargs in shapes:
+        p50, p99 = timed(lambda: repository.get_by(**kwargs), args.repeat)
+        rows.append((name, "set index", p50, p99))
+    print_rows("resident set index (get_by)", rows)
+
+
+if __name__ == '__main__':
+    main()
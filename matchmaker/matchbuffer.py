@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# source code owned by Twitch Plays Pokemon AUTHORIZED USE ONLY see LICENSE.MD
+"""Automated matches made ahead of time, see match_buffer in settings.yaml."""
+import logging
+import random
+from collections import Counter, deque
+from contextlib import contextmanager
+
+import gevent
+import greenlet
+
+log = logging.getLogger(__name__)
+
+
+class MatchBuffer:
+    """Bounded queue of matches filled by a background greenlet.
+
+    The buffered matches belong to the matchmaker state given by get_key
+    when they were made.  Once the key changes, they are thrown away.
+
+    The filling draws from a random.Random of its own, so it doesn't take
+    numbers from the random module between a seed() and the match made
+    with it.  It is swapped in for the state of the random module only
+    while the filling greenlet runs, other greenlets running meanwhile
+    draw from the random module as usual.
+
+    Attributes:
+        size: Most matches to keep.  0 disables the buffer.
+        stats: Counter of matches taken from the buffer ('hits'), takes
+            finding the buffer empty ('misses'), and matches thrown away
+            ('invalidated').
+    """
+
+    def __init__(self, size, make, get_key, get_match_key=None):
+        """
+        Args:
+            size: Most matches to keep.  0 disables the buffer.
+            make: Function making a match.
+            get_key: Function returning the state the made matches
+                depend on, compared with ==.
+            get_match_key: Optional function returning the state a single
+                made match depends on, compared with ==.  A buffered match
+                is thrown away once its key changed.
+        """
+        self.size = size
+        self.stats = Counter()
+        self._make = make
+        self._get_key = get_key
+        self._get_match_key = get_match_key
+        # (match, match key) pairs
+        self._matches = deque()
+        self._key = None
+        self._filler = None
+        self._paused = 0
+        self._random = random.Random()
+
+    def __len__(self):
+        return len(self._matches)
+
+    def pop(self):
+        """Take the oldest buffered match, and keep refilling in the background.
+
+        Returns: a Match, or None if none is buffered for the current state.
+        """
+        if not self.size:
+            return None
+        self._check_key()
+        match = None
+        while self._matches and match is None:
+            match, match_key = self._matches.popleft()
+            if self._get_match_key is not None and self._get_match_key(match) != match_key:
+                log.info("Buffered match is out of date, throwing it away.")
+                self.stats['invalidated'] += 1
+                match = None
+        self.stats['misses' if match is None else 'hits'] += 1
+        self._ensure_filler()
+        return match
+
+    def discard(self, predicate):
+        """Throw away the buffered matches for which predicate(match) is true."""
+        kept = deque((match, match_key) for match, match_key in self._matches if not predicate(match))
+        self.stats['invalidated'] += len(self._matches) - len(kept)
+        self._matches = kept
+
+    def invalidate(self):
+        """Throw away all buffered matches."""
+        self.stats['invalidated'] += len(self._matches)
+        self._matches.clear()
+        self._key = None
+
+    @contextmanager
+    def paused(self):
+        """Stop filling for the duration of the with block, e.g. while a
+        match is made in the foreground.  A match the filler was making is
+        given up, filling goes on afterwards."""
+        was_filling = self._filler is not None and not self._filler.dead
+        if was_filling:
+            self._filler.kill()
+        self._paused += 1
+        try:
+            yield
+        finally:
+            self._paused -= 1
+            if was_filling:
+                self._ensure_filler()
+
+    def close(self):
+        """Stop the background filling and throw away all buffered matches."""
+        if self._filler is not None:
+            self._filler.kill()
+            self._filler = None
+        self.invalidate()
+
+    def _check_key(self):
+        key = self._get_key()
+        if key != self._key:
+            if self._matches:
+                log.info("Matchmaker state changed, throwing away %d buffered matches.", len(self._matches))
+            self.invalidate()
+            self._key = key
+
+    def _ensure_filler(self):
+        if not self._paused and (self._filler is None or self._filler.dead):
+            self._filler = gevent.spawn(self._fill_loop)
+
+    def _fill_loop(self):
+        while True:
+            self._check_key()
+            if len(self._matches) >= self.size:
+                return
+            key = self._key
+            try:
+                match = self._make_with_own_random()
+                match_key = self._get_match_key(match) if self._get_match_key is not None else None
+            except Exception:
+                # tried again on the next pop
+                log.exception("Failed to make a buffered match")
+                return
+            if self._get_key() == key:
+                self._matches.append((match, match_key))
+            gevent.sleep(0)
+
+    def _make_with_own_random(self):
+        # The match is made with gevent.sleep()s in between, so the states
+        # are swapped on every switch from and to this greenlet.
+        filler = gevent.getcurrent()
+        outside_state = None
+
+        def swap_in():
+            nonlocal outside_state
+            outside_state = random.getstate()
+            random.setstate(self._random.getstate())
+
+        def swap_out():
+            self._random.setstate(random.getstate())
+            random.setstate(outside_state)
+
+        def trace(event, args):
+            if event in ('switch', 'throw'):
+                origin, target = args
+                if origin is filler:
+                    swap_out()
+                elif target is filler:
+                    swap_in()
+            if previous_trace is not None:
+                return previous_trace(event, args)
+
+        previous_trace = greenlet.settrace(trace)
+        swap_in()
+        try:
+            return self._make()
+        finally:
+            swap_out()
+            greenlet.settrace(previous_trace)
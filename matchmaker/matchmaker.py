@@ -12,11 +12,15 @@
 import gevent
 import logging
 import random
+import time
 import yaml
 import os
 from itertools import chain
+from collections import Counter
 from copy import deepcopy
 
+from .attemptbudgets import AttemptBudgets
+from .matchbuffer import MatchBuffer
 from .modemaker import MatchModeMaker
 from .teamsmaker import TeamsMaker
 from .settings import MatchSettings
@@ -42,21 +46,31 @@ class Match:
         metagame: MatchMetagame for the match.
         gimmick: MatchGimmick for the match.
         analysis: dict with match analysis results, as described in
-            tpp/utils/matchanalyzer/analyzer.py.
+            tpp/utils/matchanalyzer/analyzer.py.  None until analyzed
+            if the match was made with analyze=False.
+        effectiveness: type effectiveness variant of the gimmick,
+            used for the analysis.
+        estimated_winchance: quick winchance estimate made before the
+            analysis, see tiered_evaluation in settings.yaml.  None if
+            the match wasn't estimated.
+        pre_alteration_teams: 2D list of teams before gimmick alterations,
+            for replacing single Pokemon when rebalancing.  None unless
+            the teams were made by the matchmaker.
     """
 
-    def __init__(self, teams, public_teams, settings, metagame, gimmick):
+    def __init__(self, teams, public_teams, settings, metagame, gimmick, analyze=True):
         self.teams = teams
         self.public_teams = public_teams
         self.settings = settings
         self.metagame = metagame
         self.gimmick = gimmick
         blue, red = self.teams[0], self.teams[1]
-        effectiveness = 'normal'
-        for tag in self.gimmick.tags:
-            if 'effectiveness=' in tag:
-                effectiveness = tag[14:]
-        self.analysis = matchanalyzer.analyze(blue, red, effectiveness)
+        self.effectiveness = _get_effectiveness(gimmick)
+        self.analysis = None
+        self.estimated_winchance = None
+        self.pre_alteration_teams = None
+        if analyze:
+            self.analysis = matchanalyzer.analyze(blue, red, self.effectiveness)
 
     def pretty(self, use_set_display_names=False, use_bid_aliases=True,
                use_public_teams=False, show_prediction=True):
@@ -114,6 +128,14 @@ class Match:
         return self.pretty()
 
 
+def _get_effectiveness(gimmick):
+    """Type effectiveness variant of a gimmick, for the analysis."""
+    for tag in gimmick.tags:
+        if 'effectiveness=' in tag:
+            return tag[14:]
+    return 'normal'
+
+
 def pretty_teams(teams, use_set_display_names=False):
     """Return formatted teams info."""
     return '{} / {}'.format(_pretty_team(teams[0], use_set_display_names),
@@ -143,6 +165,7 @@ class Rotation:
         self._rotation = []
         self._mode_maker = mode_maker
         self._gimmicks_per_rotation = cfg['gimmicks_per_rotation']
+        self.generation = 0
         if self.enabled:
             self.rotate()
 
@@ -152,6 +175,7 @@ class Rotation:
 
     def rotate(self):
         """Update rotation with a new group of gimmicks"""
+        self.generation += 1
         # Prevent the previous rotation's MatchGimmicks from being selected again.
         unselectable_gimmicks = self._rotation
         self._rotation = []
@@ -187,6 +211,19 @@ class Matchmaker:
             that activate when there is one move per Pokemon.
         _team_choice_settings:
         rotation: Rotation object.
+        match_buffer: MatchBuffer of automated matches made ahead of
+            time, see match_buffer in settings.yaml.
+        attempt_budgets: AttemptBudgets with balancing statistics per
+            mode combination, see attempt_budgets in settings.yaml.
+        tiered_evaluation_stats: Counter of match attempts 'estimated',
+            'pruned' without full analysis, pruned ones 'audited' with
+            a full analysis anyway, and audited ones the analysis found
+            acceptably balanced ('wrongly_pruned').
+        balancing_stats: Counter of balanced 'matches', how many were
+            'accepted' as acceptably balanced, 'analyses' of new match
+            attempts and 'swap_analyses' of attempts with a replaced
+            Pokemon (see local_search in settings.yaml), and matches
+            'accepted_after_swap'.
     """
 
     def __init__(self, event, set_repository, game_id, bet_bonus_enabled=True, debug_cfg=None):
@@ -209,11 +246,45 @@ class Matchmaker:
         self.unselectable_mode_ids = []
         self.cooldowns = {}
         self.bet_bonus_enabled = bet_bonus_enabled
+        self.tiered_evaluation_stats = Counter()
+        self.balancing_stats = Counter()
+        self._set_repository = set_repository
+        self.match_buffer = MatchBuffer(
+            cfg['match_buffer']['size'], self._make_buffered, self._get_match_buffer_key,
+            self._get_buffered_match_key)
+        self.attempt_budgets = AttemptBudgets(cfg['attempt_budgets'])
 
 
-    def make(self, from_rotation=None, retries_max=20):
-        """Make a match."""
+    def make(self, from_rotation=None, retries_max=20, seed=None, deadline_ms=None):
+        """Make a match.
+
+        Args:
+            deadline_ms: Milliseconds to spend on balancing.  Once
+                they're up, the most balanced valid match so far is used,
+                modes that fail are still retried until there is one.
+                None for the event's deadline_ms, 0 for no limit.
+            seed: Seed for random.  The same seed makes the same match
+                with the same config, rotation and cooldowns, whatever
+                analysis_processes and analysis_batch_size are, as long as
+                nothing else draws from random meanwhile.  Seeded
+                matches are never taken from the match buffer.
+        """
+        if seed is None and from_rotation is None:
+            match = self.match_buffer.pop()
+            if match is not None:
+                log.info("Took match from the match buffer.")
+                return match
+        with self.match_buffer.paused():
+            return self._make_automated(from_rotation, retries_max, seed, self._get_deadline(deadline_ms))
+
+    def _make_buffered(self):
+        """Make an automated match for the match buffer."""
+        return self._make_automated(deadline=self._get_deadline())
+
+    def _make_automated(self, from_rotation=None, retries_max=20, seed=None, deadline=None):
         log.info("Making match.")
+        if seed is not None:
+            random.seed(seed)
         if from_rotation is None:
             from_rotation = self.rotation.enabled
         metagame = gimmick = None
@@ -223,7 +294,7 @@ class Matchmaker:
                 (metagame, gimmick) = self._select_modes(from_rotation)
                 log.info("Metagame: {}".format(metagame))
                 log.info("Gimmick: {}".format(gimmick))
-                match = self._make_balanced_match(metagame, gimmick)
+                match = self._make_balanced_match(metagame, gimmick, deadline=deadline)
             except InvalidMatch as e:
                 if retries_remaining == 0:
                     raise
@@ -236,9 +307,20 @@ class Matchmaker:
                 break
         return match
 
-    def make_from_bid(self, match_bid_command):
-        """Make a match from a bid command."""
+    def make_from_bid(self, match_bid_command, seed=None, deadline_ms=None):
+        """Make a match from a bid command.
+
+        Args:
+            seed: Seed for random, see make().
+            deadline_ms: Milliseconds to spend on balancing, see make().
+        """
+        with self.match_buffer.paused():
+            return self._make_from_bid(match_bid_command, seed, self._get_deadline(deadline_ms))
+
+    def _make_from_bid(self, match_bid_command, seed=None, deadline=None):
         log.info("Making custom match from command: %s" % match_bid_command)
+        if seed is not None:
+            random.seed(seed)
         mode_args, team_args, team_sizes, bid_ally_hit, bid_battle_timer, unrecognized = (
             parsing.parse_match_bid_command(match_bid_command))
         if unrecognized:
@@ -321,9 +403,10 @@ class Matchmaker:
                 # Reject cancer matches, and matches over the turn limit.
                 raise InvalidMatch("This matchup got rejected because"
                                    " it potentially takes too long.")
+            matchanalyzer.render_match_prediction(match.analysis)
 
         else:  # Teams weren't specified
-            match = self._make_balanced_match(metagame, gimmick, team_sizes)
+            match = self._make_balanced_match(metagame, gimmick, team_sizes, deadline)
             ceilings = self._cfg['multi_mode_ceilings']
             ignore = ceilings['ignore']
             metagame_unignored_ids = [m for m in metagame.base_ids if m not in ignore]
@@ -398,9 +481,13 @@ class Matchmaker:
                 cooldown = self._mode_maker.get_mode_cooldown(mode_id)
                 if cooldown > 0:
                     self.cooldowns[mode_id] = cooldown
+        # Buffered matches were made before their modes went on cooldown.
+        self.match_buffer.discard(lambda match: any(
+            mode_id in self.cooldowns for mode_id in match.metagame.base_ids + match.gimmick.base_ids))
 
     def _make_from_modes_and_teams(
-            self, metagame, gimmick, reusedData=None, team_args=None, team_sizes=None):
+            self, metagame, gimmick, reusedData=None, team_args=None, team_sizes=None, analyze=True,
+            swap=None):
         """Make a match with provided modes and team args.
 
         Args:
@@ -409,6 +496,10 @@ class Matchmaker:
             team_args: Parsed team args from match bid.  None if
                 this is an automatically generated match, or if
                 the bidder did not specify teams.
+            analyze: False to leave the match analysis to the caller.
+            swap: (match, team index, pokemon index) to make the teams
+                of a match made with the same reusedData, with the
+                Pokemon at that pre-alteration position replaced.
 
         Returns: A Match.
         """
@@ -417,39 +508,97 @@ class Matchmaker:
             metagame, gimmick, teams_are_specified)
         self._validate_team_sizes(intermediate_settings, gimmick, team_args, team_sizes)
         if teams_are_specified:
-            teams, public_teams = (
+            teams, public_teams, pre_alteration_teams = (
                     self._teams_maker.make_from_team_choice(
                         metagame, gimmick, intermediate_settings, team_args))
+        elif swap:
+            swapped_match, team_index, pokemon_index = swap
+            teams, public_teams, pre_alteration_teams = (
+                self._teams_maker.make_swapped(metagame, gimmick, swapped_match.pre_alteration_teams,
+                                               reusedData, team_index, pokemon_index))
         else:
-            teams, public_teams = (
+            teams, public_teams, pre_alteration_teams = (
                 self._teams_maker.make(metagame, gimmick, intermediate_settings, reusedData, team_sizes))
         gevent.sleep(0.002)
         modifiable_settings = self._get_modifiable_match_settings(
             teams, metagame, gimmick, intermediate_settings,
         )
         match = Match(teams, public_teams,
-                      modifiable_settings, metagame, gimmick)
+                      modifiable_settings, metagame, gimmick, analyze)
+        match.pre_alteration_teams = pre_alteration_teams
         self._set_ally_hit(match)
         gevent.sleep(0.002)
         return match
 
-    def _make_balanced_match(self, metagame, gimmick, team_sizes=None):
-        """Make several matches and choose the most balanced one."""
-        max_attempts = self._cfg['max_attempts']
+    def _make_balanced_match(self, metagame, gimmick, team_sizes=None, deadline=None):
+        """Make several matches and choose the most balanced one.
+
+        Args:
+            deadline: time.monotonic() value to stop making matches at,
+                once there is a valid one.  None for no limit.
+        """
         acceptable_est_winchance = self._cfg['acceptable_estimated_winchance']
+        local_search = self._cfg['local_search']
+        can_swap = local_search['enabled'] and self._teams_maker.can_swap(metagame)
         best_match = None
         best_est_winchance = 1.0 * 100
-        remaining_attempts = max_attempts
         reusedData = ReusedData()
+        # Team sizes are chosen once for all attempts, the budget depends on them.
+        intermediate_settings = self._get_intermediate_settings(metagame, gimmick)
+        self._validate_team_sizes(intermediate_settings, gimmick, None, team_sizes)
+        self._teams_maker.make_reused_data(metagame, gimmick, intermediate_settings, reusedData, team_sizes)
+        budget_key = AttemptBudgets.key(metagame, gimmick, [len(team) for team in reusedData.sets])
+        max_attempts = self.attempt_budgets.get(budget_key, self._cfg['max_attempts'])
+        if max_attempts < self._cfg['max_attempts']:
+            log.debug("Attempt budget of {}: {}".format(budget_key, max_attempts))
+        remaining_attempts = max_attempts
+        candidates = []
+        swaps = []
+        swaps_of = None
         while True:
-            match = self._make_from_modes_and_teams(metagame, gimmick,
-                                                    reusedData=reusedData, team_sizes=team_sizes)
+            if best_match is not None and _is_past(deadline):
+                log.warning("Out of time after {} of {} match attempts."
+                            .format(max_attempts - remaining_attempts, max_attempts))
+                break
+            match = None
+            is_swap = False
+            if (can_swap and best_match is not None and remaining_attempts > 1 and
+                    max_attempts - remaining_attempts >= local_search['new_attempts']):
+                # Try replacing single Pokemon of the most balanced match so far.
+                if swaps_of is not best_match:
+                    swaps_of = best_match
+                    swaps = _get_swaps(best_match)
+                while swaps and match is None:
+                    try:
+                        match = self._make_from_modes_and_teams(
+                            metagame, gimmick, reusedData=reusedData, team_sizes=team_sizes,
+                            swap=(best_match,) + swaps.pop(0))
+                    except InvalidMatch as e:
+                        log.debug("Could not replace a Pokemon: {}".format(e))
+                if match is not None:
+                    is_swap = True
+                    self.balancing_stats['swap_analyses'] += 1
+            if match is None:
+                if not candidates:
+                    max_matches = remaining_attempts
+                    if can_swap:
+                        # Matches made past the switch to local search would only be used after
+                        # swaps drew from random, so seeded matches would depend on the batch size.
+                        max_matches = min(max_matches, max(
+                            1, local_search['new_attempts'] - (max_attempts - remaining_attempts)))
+                    candidates = self._make_analyzed_candidates(
+                        metagame, gimmick, reusedData, team_sizes, max_matches, deadline)
+                match = candidates.pop(0)
             remaining_attempts -= 1
             if remaining_attempts <= 0:
                 break
             attempt_info = "Match attempt {}/{}. ".format(
                 max_attempts - remaining_attempts,
                 max_attempts)
+            if match.analysis is None:
+                log.debug("{} Pruned with estimated winchance: {:.2f}"
+                          .format(attempt_info, match.estimated_winchance))
+                continue
             if (match.settings['check_cancer_recommendation'] and
                     not match.analysis["CancerChecks"]["UseMatch"]):
                 log.debug("{} Failed cancer check recommendation."
@@ -470,6 +619,9 @@ class Matchmaker:
                 # Record the most balanced match found so far.
                 best_match = match
                 best_est_winchance = est_winchance
+        self.attempt_budgets.record(
+            budget_key, best_est_winchance < acceptable_est_winchance, max_attempts - remaining_attempts,
+            best_est_winchance if best_match is not None else None)
         # Info for logging.
         all_attempts_info = ("Remaining attempts: {}/{} Estimated winchance: {:.2f}"
                              .format(remaining_attempts,
@@ -481,6 +633,9 @@ class Matchmaker:
             log.warning("All attempted matches failed cancer recommendations. "
                         "Matchmaker was unable to provide any match balancing.")
             best_match = match
+            if best_match.analysis is None:
+                best_match.analysis = matchanalyzer.analyze(
+                    best_match.teams[0], best_match.teams[1], best_match.effectiveness)
         elif best_est_winchance < acceptable_est_winchance:
             if remaining_attempts > 10:
                 log.info("Found acceptably balanced match. " + all_attempts_info)
@@ -488,11 +643,127 @@ class Matchmaker:
                 log.warning("Struggled to find acceptably balanced match. " + all_attempts_info)
         else:
             log.warning("Failed to find acceptably balanced match. " + all_attempts_info)
+        stats = self.balancing_stats
+        stats['matches'] += 1
+        if best_est_winchance < acceptable_est_winchance:
+            stats['accepted'] += 1
+            if is_swap:
+                stats['accepted_after_swap'] += 1
+        log.debug("Balancing: {} of {} matches accepted, {} analyses of new attempts, {} of swaps."
+                  .format(stats['accepted'], stats['matches'], stats['analyses'], stats['swap_analyses']))
+        if self._cfg['tiered_evaluation']['enabled']:
+            stats = self.tiered_evaluation_stats
+            log.debug("Tiered evaluation: {} of {} estimated attempts pruned, "
+                      "{} of {} audited pruned attempts were acceptable."
+                      .format(stats['pruned'], stats['estimated'],
+                              stats['wrongly_pruned'], stats['audited']))
+        # only the chosen match's prediction is read
+        matchanalyzer.render_match_prediction(best_match.analysis)
         return best_match
 
+    def _make_analyzed_candidates(self, metagame, gimmick, reusedData, team_sizes, max_matches,
+                                  deadline=None):
+        """Make the next batch of matches for _make_balanced_match.
+
+        A batch has analysis_batch_size matches, or analysis_processes if
+        that is 0, and at most max_matches.  With analysis_processes set, each match is handed to
+        the worker processes as soon as it is made, so the next one is made
+        while the previous ones are analyzed.  Once a match is acceptably
+        balanced no more are made, the ones made after it are left
+        unanalyzed and _make_balanced_match stops before reaching them.
+
+        With tiered_evaluation enabled, every match is estimated first.
+        Matches estimated too unbalanced are pruned and left unanalyzed,
+        except for a few audited ones.
+
+        Past the deadline, the batch ends after its first match.
+        """
+        processes = self._cfg['analysis_processes']
+        batch_size = self._cfg['analysis_batch_size'] or processes
+        acceptable_est_winchance = self._cfg['acceptable_estimated_winchance']
+        tiers = self._cfg['tiered_evaluation']
+        matches = []
+        to_analyze = []
+        pruned = []
+
+        def make_pairs():
+            for _ in range(max(1, min(batch_size, max_matches))):
+                if matches and _is_past(deadline):
+                    return
+                match = self._make_from_modes_and_teams(metagame, gimmick, reusedData=reusedData,
+                                                        team_sizes=team_sizes, analyze=False)
+                matches.append(match)
+                if tiers['enabled']:
+                    match.estimated_winchance = matchanalyzer.estimate(
+                        match.teams[0], match.teams[1], match.effectiveness)
+                    self.tiered_evaluation_stats['estimated'] += 1
+                    if match.estimated_winchance > tiers['prune_estimated_winchance']:
+                        self.tiered_evaluation_stats['pruned'] += 1
+                        pruned.append(match)
+                        # audited matches are analyzed anyway, to see whether pruning them was right
+                        if random.random() >= tiers['audit_rate']:
+                            continue
+                to_analyze.append(match)
+                yield match.teams[:2]
+
+        def is_acceptable(match, analysis):
+            if (match.settings['check_cancer_recommendation'] and
+                    not analysis["CancerChecks"]["UseMatch"]):
+                return False
+            return analysis["WinPercentage"] < acceptable_est_winchance
+
+        def acceptable(i, analysis):
+            return is_acceptable(to_analyze[i], analysis)
+
+        analyses = matchanalyzer.analyze_many(make_pairs(), _get_effectiveness(gimmick), acceptable, processes)
+        for match, analysis in zip(to_analyze, analyses):
+            match.analysis = analysis
+            if analysis is not None:
+                self.balancing_stats['analyses'] += 1
+        for match in pruned:
+            if match.analysis is not None:
+                self.tiered_evaluation_stats['audited'] += 1
+                if is_acceptable(match, match.analysis):
+                    self.tiered_evaluation_stats['wrongly_pruned'] += 1
+        return matches
+
     def set_unselectable_modes(self, modes_list):
         self.unselectable_mode_ids = modes_list
 
+    def close(self):
+        """Stop making matches for the match buffer and save the attempt
+        budget statistics, e.g. before replacing this matchmaker with one
+        for another event."""
+        self.match_buffer.close()
+        if self.attempt_budgets.path:
+            self.attempt_budgets.save()
+
+    def export_attempt_budgets(self):
+        """Balancing statistics and attempt budget per mode combination."""
+        return self.attempt_budgets.export(self._cfg['max_attempts'])
+
+    def _get_deadline(self, deadline_ms=None):
+        """time.monotonic() value deadline_ms from now, None for no deadline."""
+        if deadline_ms is None:
+            deadline_ms = self._cfg['deadline_ms']
+        if not deadline_ms:
+            return None
+        return time.monotonic() + deadline_ms / 1000
+
+    def _get_match_buffer_key(self):
+        """Everything automated match selection depends on, besides cooldowns."""
+        return (self._cfg['event_id'], self.rotation.enabled, self.rotation.generation,
+                tuple(self.unselectable_mode_ids))
+
+    def _get_buffered_match_key(self, match):
+        """When the species of a buffered match's Pokemon last appeared.
+
+        Appearances change the rarities of their species, and a set that
+        just appeared shouldn't appear again in the next buffered match.
+        """
+        return [self._set_repository.get_last_match_date_for_species(pokeset['species']['id'])
+                for pokeset in chain(*match.pre_alteration_teams)]
+
     def _select_modes(self, from_rotation=False):
         """Select the MatchMetagame and MatchGimmick.
 
@@ -693,6 +964,41 @@ class Matchmaker:
         return cfg
 
 
+def _is_past(deadline):
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def _get_swaps(match):
+    """Pre-alteration positions of a match's Pokemon to try replacing, most promising first.
+
+    The favored team's most valuable Pokemon come first, then the other
+    team's least valuable ones, by the Value of the match analysis.
+    """
+    positions = {}
+    for t_ind, team in enumerate(match.pre_alteration_teams):
+        for p_ind, pokeset in enumerate(team):
+            positions.setdefault((pokeset['species']['id'], pokeset['setname']), []).append((t_ind, p_ind))
+    favored = []
+    underdog = []
+    red_is_favored = match.analysis['Winner'] == 'red'
+    current_positions = [(t_ind, p_ind) for t_ind, team in enumerate(match.teams) for p_ind in range(len(team))]
+    # gimmicks may reorder the teams or trade Pokemon, so find them by their set
+    for current_position, pokemon, analyzed in zip(current_positions, chain(*match.teams),
+                                                     match.analysis['Pokemon']):
+        candidates = positions.get((pokemon['original_species']['id'], pokemon['setname']))
+        if not candidates:
+            continue
+        # A set in the match more than once is each of its positions once,
+        # the one it is still at if it was not moved.
+        position = current_position if current_position in candidates else candidates[0]
+        candidates.remove(position)
+        if (analyzed['Team'] == 'Red') == red_is_favored:
+            favored.append((-analyzed['Value'], position))
+        else:
+            underdog.append((analyzed['Value'], position))
+    return [position for _, position in sorted(favored) + sorted(underdog)]
+
+
 def _is_one_move_per_pokemon(teams):
     """Determine if there is only one move per Pokemon, for all Pokemon."""
     for p in chain(*teams):
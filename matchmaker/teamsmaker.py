@@ -35,13 +35,14 @@ class TeamsMaker:
             gimmick: Selected MatchGimmick.
             team_args: 2d list of team arguments in the bid.
 
-        Returns: 2D list of teams with instantiated Pokemon sets.
+        Returns: teams, public_teams and pre_alteration_teams, 2D lists
+            of instantiated Pokemon sets.
         """
         teams = [[None] * len(team) for team in team_args]
 
-        match_sets = []
+        # Parse the whole bid first, so its pokesets can be fetched at once.
+        pokeset_args = []
         for t_ind, team in enumerate(teams):
-            team_sets = []
             for p_ind, _ in enumerate(team):
                 pokeset_arg = team_args[t_ind][p_ind].strip()
                 species_id, setname = (
@@ -50,8 +51,18 @@ class TeamsMaker:
                     raise InvalidMatch("Species-only requests are not supported"
                                        " for metagame mixes. Please omit teams,"
                                        " or specify setnames for all species.")
+                pokeset_args.append((pokeset_arg, species_id, setname))
+        candidates = iter(self._set_repository.get_many_by_id_components(
+            (species_id, setname) for _, species_id, setname in pokeset_args))
+        pokeset_args = iter(pokeset_args)
+
+        match_sets = []
+        for t_ind, team in enumerate(teams):
+            team_sets = []
+            for p_ind, _ in enumerate(team):
+                pokeset_arg, species_id, setname = next(pokeset_args)
                 pokeset = self._select_pokeset_from_bid(
-                    pokeset_arg, species_id, setname,
+                    pokeset_arg, species_id, setname, next(candidates),
                     metagame, match_sets, team_sets)
                 teams[t_ind][p_ind] = pokeset
                 match_sets.append(pokeset)
@@ -68,14 +79,51 @@ class TeamsMaker:
     def _make(self, metagame, gimmick, match_settings, reusedData=None, pre_alteration_teams=None, team_sizes=None):
         if not pre_alteration_teams:
             # Bidder didn't choose team pokemon, so generate them.
-            if not reusedData.sets:
-                reusedData.sets = self._get_reusable_set_data(metagame, gimmick, match_settings, team_sizes)
+            self.make_reused_data(metagame, gimmick, match_settings, reusedData, team_sizes)
             pre_alteration_teams = self._make_pre_alteration_teams(
                 metagame, gimmick, reusedData.sets)
         gevent.sleep(0.002)
         teams, public_teams = _make_gimmick_alterations(
             pre_alteration_teams, gimmick)
-        return teams, public_teams
+        return teams, public_teams, pre_alteration_teams
+
+    def make_reused_data(self, metagame, gimmick, match_settings, reusedData, team_sizes=None):
+        """Choose the team sizes and the sets to pick the teams from, unless
+        reusedData already has them from an earlier attempt."""
+        if not reusedData.sets:
+            reusedData.sets = self._get_reusable_set_data(metagame, gimmick, match_settings, team_sizes)
+
+    def can_swap(self, metagame):
+        """Whether make_swapped can replace single Pokemon of the metagame's teams."""
+        # not for fixed teams, or teams that have to stay with their trainer
+        return not (metagame.primary_mode.default_teams or metagame.versus_tags)
+
+    def make_swapped(self, metagame, gimmick, pre_alteration_teams, reusedData, team_index, pokemon_index):
+        """Make teams with one Pokemon replaced by another pokeset of the same SetCollection.
+
+        Args:
+            pre_alteration_teams: 2D list of teams to start from.  Not altered.
+            reusedData: ReusedData the teams were made with.
+            team_index, pokemon_index: Position of the Pokemon to replace.
+
+        Returns: teams, public_teams and pre_alteration_teams.
+        """
+        pre_alteration_teams = [list(team) for team in pre_alteration_teams]
+        replaced = pre_alteration_teams[team_index][pokemon_index]
+        match_sets = [replaced]
+        if not metagame.allow_duplicate_pokesets:
+            match_sets = list(chain(*pre_alteration_teams))
+        team_sets = []
+        if not metagame.allow_duplicate_team_species:
+            team_sets = [pokeset for p_ind, pokeset in enumerate(pre_alteration_teams[team_index])
+                         if p_ind != pokemon_index]
+        collection = reusedData.sets[team_index][pokemon_index]
+        pre_alteration_teams[team_index][pokemon_index] = self._select_pokeset(
+            collection.shinies, collection.nonshinies, match_sets, team_sets, None)
+        gevent.sleep(0.002)
+        teams, public_teams = _make_gimmick_alterations(
+            pre_alteration_teams, gimmick)
+        return teams, public_teams, pre_alteration_teams
 
 
     def _get_reusable_set_data(self, metagame, gimmick, match_settings, team_sizes):
@@ -182,13 +230,12 @@ class TeamsMaker:
 
         default_teams = deepcopy(metagame.primary_mode.default_teams)
         if default_teams:
+            candidates = iter(self._set_repository.get_many_by_id_components(
+                parse_pokeset(pokeset_arg) for team in default_teams for pokeset_arg in team))
             for t_ind, team in enumerate(default_teams):
                 for p_ind, _ in enumerate(team):
-                    species_id, setname = (
-                        parse_pokeset(default_teams[t_ind][p_ind]))
-                    pokeset = self._set_repository.get_by(
-                        species_id=species_id, setname=setname)[0]['data']
-                    default_teams[t_ind][p_ind] = pokecat.instantiate_pokeset(pokeset)
+                    pokeset = next(candidates)[0]['data']
+                    default_teams[t_ind][p_ind] = pokecat.instantiate_pokeset(deepcopy(pokeset))
             return default_teams
 
         match_sets = []
@@ -215,11 +262,11 @@ class TeamsMaker:
         return teams
 
     def _select_pokeset_from_bid(
-            self, pokeset_arg, species_id, setname,
+            self, pokeset_arg, species_id, setname, candidates,
             metagame, match_sets, team_sets):
-        # Filter to Pokemon in the provided species_id / setname.
-        pokesets = [p['data'] for p in self._set_repository.get_by(
-            species_id=species_id, setname=setname)]
+        # Filter to Pokemon in the provided species_id / setname,
+        # candidates being the repository's matches for them.
+        pokesets = [p['data'] for p in candidates]
         if not pokesets:
             raise InvalidMatch("Setname does not exist for {}.".format(pokeset_arg))
         # Filter to Pokemon that are biddable.
@@ -267,12 +314,12 @@ class TeamsMaker:
         # Choose a random pokeset from the list of remaining sets.
         # pokeset = self._select_pokeset_from_list(pokesets, rarity=1)
         # Choose the first pokeset from the list of remaining sets.
-        pokeset = pokecat.instantiate_pokeset(pokesets[0])
+        pokeset = pokecat.instantiate_pokeset(deepcopy(pokesets[0]))
         return pokeset
 
     def _get_pokeset_selections(self, tags_none, tags_any, tags_all, rarify_shinies, team_size, versus_tags):
-        """Select an instantiated pokeset, using random weights."""
-        sets = self._set_repository.get_by(
+        """Get the handles of the pokesets to select from, split into shinies and nonshinies."""
+        sets = self._set_repository.get_handles_by(
             tags_none=tags_none, tags_any=tags_any, tags_all=tags_all)
         shinies = []
         nonshinies = []
@@ -282,9 +329,9 @@ class TeamsMaker:
         if versus_tags and versus_tags[0] == 'pwt-custom':
             sets_by_tag = {}
             for set in sets:
-                tags = set['data']['tags']
+                tags = set.tags
                 if 'runmon' in tags:
-                    trainer_tag = "setname+" + set['data']['setname']
+                    trainer_tag = "setname+" + set.setname
                     sets_by_tag.setdefault(trainer_tag, []).append(set)
                 elif 'in-game' in tags:
                     trainer_tags = list(filter(lambda tag: 'PWT' in tag, tags))
@@ -298,7 +345,7 @@ class TeamsMaker:
                     sets.extend(tag_sets)
 
         for pokeset in sets:
-            if rarify_shinies and pokeset['data']['shiny']:
+            if rarify_shinies and pokeset.shiny:
                 shinies.append(pokeset)
             else:
                 nonshinies.append(pokeset)
@@ -328,27 +375,29 @@ class TeamsMaker:
     def _get_filtered_selection(self, pokesets, not_sets, not_species_ids, tag=None):
         sets = []
         for pokeset in pokesets:
-            if any(pokeset['_id']['species'] == not_set['species']['id'] and
-                   pokeset['_id']['setname'] == not_set['setname'] for
+            if any(pokeset.species == not_set['species']['id'] and
+                   pokeset.setname == not_set['setname'] for
                    not_set in not_sets):
                 continue
-            if any(pokeset['_id']['species'] == not_sp for
+            if any(pokeset.species == not_sp for
                    not_sp in not_species_ids):
                 continue
-            if tag and tag not in pokeset['data']['tags']:
+            if tag and tag not in pokeset.tags:
                 continue
             sets.append(pokeset)
         return sets
 
-    def _select_pokeset_from_list(self, dbpokesets, rarity=None):
+    def _select_pokeset_from_list(self, handles, rarity=None):
         def raritygetter(el, coll):
             return max(
-                rarity if rarity else el.get("effective_rarity", 0),
+                rarity if rarity else el.effective_rarity,
                 0.0000000000001
             )
-        pokeset = weighted_select(dbpokesets, raritygetter)
-        if pokeset:
-            return pokecat.instantiate_pokeset(deepcopy(pokeset['data']))
+        handle = weighted_select(handles, raritygetter)
+        if handle:
+            # only the selected pokeset gets fetched in full
+            pokeset = self._set_repository.get_by_id_components(handle.species, handle.setname)
+            return pokecat.instantiate_pokeset(pokeset)
         return None
 
 
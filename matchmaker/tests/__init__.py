@@ -9,20 +9,41 @@ python -m matchmaker.tests
 Run all unittests (takes a long time):
 python -m unittest matchmaker.tests -fv
 
+Run without a mongod, keeping the pokesets in memory:
+MATCHMAKER_SET_REPOSITORY=memory python -m matchmaker.tests
+
 """
+import pokecat
 import yaml
 import sys
 import pymongo
 import logging
+import io
+import json
 import os
+import random
 import unittest
 import time
+import tempfile
+import gevent
 from os import path
-from collections import OrderedDict
+from types import SimpleNamespace
+from collections import OrderedDict, Counter
+from itertools import chain
+from copy import deepcopy
+from datetime import datetime
 from rainbow_logging_handler import RainbowLoggingHandler
 
 from matchmaker import Matchmaker, InvalidMatch
-from matchmaker.utils.pokemondb import PokemonSetRepository
+from matchmaker.matchmaker import _get_swaps
+from matchmaker.matchbuffer import MatchBuffer
+from matchmaker.attemptbudgets import AttemptBudgets
+from matchmaker.utils.pokemondb import (PokemonSetRepository, make_get_by_query, make_pokeset_key,
+                                        make_pokeset_db_id, MAX_COOLDOWN)
+from matchmaker.utils.memorypokemondb import MemoryPokemonSetRepository, _matches
+from matchmaker.utils.pbrpokemondb import _iter_json_array
+from matchmaker.utils import matchanalyzer, pokedex
+from matchmaker.utils.matchanalyzer import MatchMaker, effectiveness, moves
 
 _matchmaker_dir = os.path.join(os.curdir, os.path.dirname(__file__))
 
@@ -78,12 +99,12 @@ def run_suites(test_cases):
 
 # Matchmaker setup function. PokemonSetRepository loads the pokesets from json into the db, which takes a few seconds.
 
-def setup_matchmaker(event, bet_bonus_enabled=True, equalize_rarities=False):
+def setup_matchmaker(event, bet_bonus_enabled=True, equalize_rarities=False, set_repository=None):
+    """set_repository is 'mongo' or 'memory', defaulting to the
+    MATCHMAKER_SET_REPOSITORY environment variable, or else 'mongo'."""
     log.info("Setting up matchmaker for the %s event..." % event)
     log.info("Loading Pokemon set repository...")
-    mongodb_client = pymongo.MongoClient()
-    db = mongodb_client['tpp3']
-    pokemon_sets = PokemonSetRepository(db, 'pbr')
+    pokemon_sets = make_set_repository(set_repository)
     log.info("Creating matchmaker object...")
     debug_cfg = {
         "equalize_rarities": equalize_rarities
@@ -93,6 +114,68 @@ def setup_matchmaker(event, bet_bonus_enabled=True, equalize_rarities=False):
     return mm
 
 
+def make_set_repository(kind=None):
+    if kind is None:
+        kind = os.environ.get('MATCHMAKER_SET_REPOSITORY', 'mongo')
+    if kind == 'memory':
+        return MemoryPokemonSetRepository('pbr')
+    if kind == 'mongo':
+        mongodb_client = pymongo.MongoClient()
+        db = mongodb_client['tpp3']
+        return PokemonSetRepository(db, 'pbr')
+    raise ValueError("Unknown set repository kind: %s" % kind)
+
+
+class MemoryCollection:
+    """Just enough of a pymongo collection for PokemonSetRepository, kept in memory.
+
+    Records the operations of every bulk write, and fails them while
+    fail_writes is set.
+    """
+
+    def __init__(self):
+        self.docs = []
+        self.bulk_writes = []
+        self.fail_writes = False
+
+    def create_indexes(self, indexes):
+        pass
+
+    def find(self, query=None, projection=None):
+        return [deepcopy(doc) for doc in self.docs if _matches(doc, query or {})]
+
+    def find_one(self, query):
+        return next(iter(self.find(query)), None)
+
+    def count_documents(self, query):
+        return len(self.find(query))
+
+    def replace_one(self, query, doc, upsert=False):
+        self.docs = [d for d in self.docs if not _matches(d, query)]
+        self.docs.append(deepcopy(doc))
+
+    def bulk_write(self, operations, ordered=True):
+        if self.fail_writes:
+            raise pymongo.errors.PyMongoError("writes are failing")
+        self.bulk_writes.append(operations)
+        for operation in operations:
+            update = operation._doc
+            doc = next((d for d in self.docs if _matches(d, operation._filter)), None)
+            if doc is None:
+                if not operation._upsert:
+                    continue
+                doc = deepcopy(operation._filter)
+                doc.update(deepcopy(update.get("$setOnInsert", {})))
+                self.docs.append(doc)
+            doc.update(deepcopy(update.get("$set", {})))
+            for field, amount in update.get("$inc", {}).items():
+                doc[field] = doc.get(field, 0) + amount
+
+
+def make_memory_db():
+    return {'pokesets': MemoryCollection(), 'pokeset_manifests': MemoryCollection()}
+
+
 # Automated testing classes & functions
 
 class StandardTestsShort(unittest.TestCase):
@@ -291,6 +374,621 @@ class DisabledBonusTests(unittest.TestCase):
         assert bonus == 0, "Bet bonus was %r instead of zero" % bonus
 
 
+class SetRepositoryTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.repository = MemoryPokemonSetRepository('pbr')
+
+    def test_index_matches_mongo_query(self):
+        rng = random.Random(0)
+        pokesets = [doc['data'] for doc in self.repository.index.documents()]
+        tags = sorted({tag for pokeset in pokesets for tag in pokeset['tags']})
+        species_ids = sorted(self.repository.index.species_ids())
+        for _ in range(100):
+            # tags of an actual set, so the queries aren't all empty
+            set_tags = rng.choice(pokesets)['tags']
+            criteria = dict(
+                species_id=rng.choice([None, None, rng.choice(species_ids)]),
+                tags_none=rng.sample(tags, rng.randint(0, 2)),
+                tags_any=rng.sample(set_tags, min(len(set_tags), rng.randint(0, 2))),
+                tags_all=rng.sample(set_tags, min(len(set_tags), rng.randint(0, 2))),
+                not_sets=rng.sample(pokesets, rng.randint(0, 3)),
+                not_species_ids=rng.sample(species_ids, rng.randint(0, 3)),
+                shinies=rng.choice([None, True, False]),
+                hidden=rng.choice([None, True, False]),
+            )
+            expected = self.repository.find(make_get_by_query(**criteria))
+            actual = self.repository.get_by(**criteria)
+            self.assertEqual(sorted(make_pokeset_key(doc['_id']) for doc in actual),
+                             sorted(make_pokeset_key(doc['_id']) for doc in expected), criteria)
+
+    def test_tags_queries_match_mongo_query(self):
+        repository = PokemonSetRepository(make_memory_db(), 'pbr', appearance_flush_interval=None)
+        pokesets = [deepcopy(doc['data']) for doc in self.repository.index.documents()]
+        # a disabled set must not be found
+        disabled = pokesets.pop()
+        repository._sync(pokesets)
+        repository.refresh_index()
+        for pokeset in [disabled] + random.Random(0).sample(pokesets, 20):
+            species_id = pokeset['species']['id']
+            tags = pokeset['tags'][:1]
+            self.assertEqual(
+                repository.get_by_tags(tags),
+                [doc['data'] for doc in repository.find({'data.tags': {'$in': tags}})])
+            self.assertEqual(
+                repository.get_by_species_id_and_tags(species_id, tags),
+                [doc['data'] for doc in repository.find({'_id.species': species_id,
+                                                        'data.tags': {'$in': tags}})])
+            self.assertNotIn(disabled, repository.get_by_species_id_and_tags(species_id, tags))
+
+    def test_rarity_cooldown(self):
+        repository = MemoryPokemonSetRepository('pbr')
+        played = next(iter(repository.index.documents()))
+        repository.update_set_appearance(played['_id'], 'match', datetime.utcnow())
+        # nothing to write them to, so appearances don't pile up
+        self.assertFalse(repository._pending_appearances)
+        repository.update_rarities(full=True)
+        docs = repository.find()
+        sets_per_species = Counter(doc['_id']['species'] for doc in docs)
+        for doc in docs:
+            species_id = doc['_id']['species']
+            if species_id == played['_id']['species']:
+                # just played, so the whole species is on cooldown
+                self.assertAlmostEqual(doc['effective_rarity'], 0, places=5)
+            else:
+                self.assertAlmostEqual(doc['effective_rarity'],
+                                       doc['data']['rarity'] / sets_per_species[species_id])
+
+    def test_sync_writes_only_changes(self):
+        db = make_memory_db()
+        repository = PokemonSetRepository(db, 'pbr', appearance_flush_interval=None)
+        self.assertEqual(set(repository.index.keys()), set(self.repository.index.keys()))
+        pokemon_db = [deepcopy(doc['data']) for doc in self.repository.index.documents()]
+        writes = len(db['pokesets'].bulk_writes)
+        repository._sync(pokemon_db)
+        self.assertEqual(len(db['pokesets'].bulk_writes), writes, "unchanged manifest wasn't skipped")
+
+        changed_db = deepcopy(pokemon_db)
+        removed = changed_db.pop()
+        changed_db[0]['rarity'] += 1
+        repository._sync(changed_db)
+        self.assertEqual(len(db['pokesets'].bulk_writes[-1]), 2)
+        repository.refresh_index()
+        self.assertNotIn(make_pokeset_key(make_pokeset_db_id(removed)), repository.index)
+        changed_key = make_pokeset_key(make_pokeset_db_id(changed_db[0]))
+        self.assertEqual(repository.index.get(changed_key)['data']['rarity'], changed_db[0]['rarity'])
+
+        # the removed set is enabled again, the changed one changed back
+        repository._sync(pokemon_db)
+        self.assertEqual(len(db['pokesets'].bulk_writes[-1]), 2)
+        repository.refresh_index()
+        self.assertEqual(set(repository.index.keys()), set(self.repository.index.keys()))
+
+    def test_appearances_are_written_behind(self):
+        db = make_memory_db()
+        repository = PokemonSetRepository(db, 'pbr', appearance_flush_interval=None)
+        set_id = next(iter(repository.index.documents()))['_id']
+        for match_id in ('match1', 'match2'):
+            repository.update_set_appearance(set_id, match_id, datetime.utcnow())
+        self.assertEqual(repository.index.get(make_pokeset_key(set_id))['appearances'], 2)
+
+        db['pokesets'].fail_writes = True
+        with self.assertRaises(pymongo.errors.PyMongoError):
+            repository.flush()
+        # the failed updates are kept and merged with the next one
+        db['pokesets'].fail_writes = False
+        repository.update_set_appearance(set_id, 'match3', datetime.utcnow())
+        repository.flush()
+        self.assertEqual(len(db['pokesets'].bulk_writes[-1]), 1)
+        stored = db['pokesets'].find_one({'_id': set_id})
+        self.assertEqual(stored['appearances'], 3)
+        self.assertEqual(stored['last_match'], 'match3')
+
+    def test_incremental_rarity_update(self):
+        db = make_memory_db()
+        repository = PokemonSetRepository(db, 'pbr', appearance_flush_interval=None)
+        by_species = {}
+        for doc in self.repository.index.documents():
+            by_species.setdefault(doc['_id']['species'], []).append(deepcopy(doc['data']))
+        # two species of sets with a rarity, so the appearance changes all of the played ones
+        played_id, other_id = [species_id for species_id, pokesets in sorted(by_species.items())
+                               if all(pokeset['rarity'] for pokeset in pokesets)][:2]
+        repository._sync(by_species[played_id] + by_species[other_id])
+        repository.refresh_index()
+        repository.update_rarities(full=True)
+        others = repository.index.query(species_id=other_id)
+        other_rarities = [doc['effective_rarity'] for doc in others]
+        # would be overwritten if the other species was recomputed
+        for doc in others:
+            doc['effective_rarity'] = -1
+
+        played = repository.index.query(species_id=played_id)[0]
+        repository.update_set_appearance(played['_id'], 'match', datetime.utcnow() - MAX_COOLDOWN / 2)
+        repository.flush()
+        writes = len(db['pokesets'].bulk_writes)
+        repository.update_rarities(full=False)
+        self.assertEqual(len(db['pokesets'].bulk_writes), writes + 1)
+        written = [operation._filter['_id']['species'] for operation in db['pokesets'].bulk_writes[-1]]
+        self.assertEqual(written, [played_id] * len(by_species[played_id]))
+        self.assertEqual([doc['effective_rarity'] for doc in others], [-1] * len(others))
+        for doc, effective_rarity in zip(others, other_rarities):
+            doc['effective_rarity'] = effective_rarity
+
+        incremental = {make_pokeset_key(doc['_id']): doc['effective_rarity'] for doc in repository.find()}
+        repository.update_rarities(full=True)
+        full = {make_pokeset_key(doc['_id']): doc['effective_rarity'] for doc in repository.find()}
+        self.assertEqual(incremental.keys(), full.keys())
+        for key, effective_rarity in full.items():
+            self.assertAlmostEqual(incremental[key], effective_rarity, places=5)
+
+
+class PokemonDbJsonTests(unittest.TestCase):
+    def test_values_across_chunks(self):
+        values = [i * 1.5 if i % 3 else {'id': i, 'tags': ['x'] * (i % 5)} for i in range(2000)]
+        values += [True, None, 12345678901234, -1e-7]
+        for indent in (None, 1):
+            text = json.dumps(values, indent=indent)
+            for chunk_size in (1, 7, 997):
+                self.assertEqual(list(_iter_json_array(io.StringIO(text), chunk_size=chunk_size)), values)
+
+
+class AnalysisTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.event = 'standard'
+        cls.mm = setup_matchmaker(cls.event, equalize_rarities=True)
+
+    def test_analysis_is_json(self):
+        for _ in range(20):
+            match = self.mm.make(retries_max=0)
+            analysis = match.analysis
+            self.assertEqual(json.loads(json.dumps(analysis))['MatchPrediction'], analysis['MatchPrediction'])
+            self.assertEqual(len(analysis['MatchPrediction']), len(analysis['Deaths']))
+            self.assertTrue(all(isinstance(text, str) for text in analysis['MatchPrediction']))
+
+    def test_prediction_rendered_on_demand(self):
+        match = self.mm.make(retries_max=0)
+        analysis = matchanalyzer.analyze(match.teams[0], match.teams[1], match.effectiveness)
+        # only the chosen match's prediction is rendered
+        self.assertEqual(analysis['MatchPrediction'], [])
+        self.assertEqual(analysis['Deaths'], match.analysis['Deaths'])
+        self.assertEqual(matchanalyzer.render_match_prediction(analysis)['MatchPrediction'],
+                         match.analysis['MatchPrediction'])
+
+
+class PokedexSnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.saved = {name: getattr(pokedex, name)
+                      for name in ('_local_dir', '_pokedex_path', '_snapshot_path', '_write_snapshot')}
+        with open(pokedex._pokedex_path, encoding='utf-8') as f:
+            self.entries = json.load(f)
+        self.directory = tempfile.TemporaryDirectory()
+        pokedex._local_dir = self.directory.name
+        pokedex._pokedex_path = os.path.join(self.directory.name, 'pokedex.json')
+        pokedex._snapshot_path = os.path.join(self.directory.name, 'pokedex.snapshot')
+        self.write_pokedex(self.entries)
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            setattr(pokedex, name, value)
+        self.directory.cleanup()
+
+    def write_pokedex(self, entries):
+        with open(pokedex._pokedex_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+
+    def test_entries_match_pokedex_json(self):
+        for _ in range(2):
+            # built the first time, mapped from the file the second time
+            snapshot = pokedex._load_snapshot()
+            self.assertTrue(os.path.exists(pokedex._snapshot_path))
+            self.assertEqual(snapshot.entries(), self.entries)
+            for entry in self.entries[:20]:
+                self.assertEqual(snapshot.get_by_id(entry['id'].lower()), entry)
+
+    def test_stale_snapshot_is_rebuilt(self):
+        pokedex._load_snapshot()
+        changed = self.entries[:10]
+        self.write_pokedex(changed)
+        self.assertIsNone(pokedex._open_snapshot(pokedex._source_stamp()))
+        self.assertEqual(pokedex._load_snapshot().entries(), changed)
+        self.assertIsNotNone(pokedex._open_snapshot(pokedex._source_stamp()))
+
+    def test_read_only_fallback(self):
+        def write_snapshot(stamp):
+            raise PermissionError("read-only install")
+        pokedex._write_snapshot = write_snapshot
+        snapshot = pokedex._load_snapshot()
+        self.assertFalse(os.path.exists(pokedex._snapshot_path))
+        self.assertEqual(snapshot.entries(), self.entries)
+
+
+class FightCacheTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.event = 'standard'
+        cls.mm = setup_matchmaker(cls.event, equalize_rarities=True)
+
+    def test_cached_analysis_matches_uncached(self):
+        uncached = MatchMaker(fight_cache_size=0)
+        cached = MatchMaker(fight_cache_size=256)
+        for _ in range(200):
+            blue, red = self.mm.make(retries_max=0).teams
+            expected = uncached.analyze(blue, red)
+            # twice, so the second analysis is answered from the cache
+            for _ in range(2):
+                self.assertEqual(cached.analyze(blue, red), expected)
+        log.info("Fight cache: %s", cached.fight_cache.stats())
+        self.assertGreater(cached.fight_cache.hits, 0)
+
+    def test_repeated_sets_hit(self):
+        uncached = MatchMaker(fight_cache_size=0)
+        cached = MatchMaker(fight_cache_size=4096)
+        blue, red = self.mm.make(retries_max=0).teams
+        pool = (blue + red + list(self.mm.make(retries_max=0).teams[0]))[:8]
+        rng = random.Random(0)
+        for _ in range(200):
+            pokesets = rng.sample(pool, 6)
+            blue, red = pokesets[:3], pokesets[3:]
+            self.assertEqual(cached.analyze(blue, red), uncached.analyze(blue, red))
+        log.info("Fight cache: %s", cached.fight_cache.stats())
+        # the same sets meet again and again, whatever their value from earlier fights
+        self.assertGreater(cached.fight_cache.stats()['hitrate'], 0.2)
+
+
+class AnalyzeManyTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.event = 'standard'
+        cls.mm = setup_matchmaker(cls.event, equalize_rarities=True)
+
+    def tearDown(self):
+        matchanalyzer.batch.shutdown_pool()
+
+    def test_results_match_serial_analysis(self):
+        pairs = [self.mm.make(retries_max=0).teams[:2] for _ in range(40)]
+        expected = [matchanalyzer.analyze(blue, red) for blue, red in pairs]
+        self.assertEqual(matchanalyzer.analyze_many(pairs, processes=2), expected)
+        self.assertEqual(matchanalyzer.analyze_many(pairs, processes=0), expected)
+
+    def test_stops_after_first_acceptable_result(self):
+        pairs = [self.mm.make(retries_max=0).teams[:2] for _ in range(40)]
+        expected = [matchanalyzer.analyze(blue, red) for blue, red in pairs]
+        # a few results are acceptable, the first of them ends the search
+        threshold = sorted(analysis["WinPercentage"] for analysis in expected)[5]
+        first = next(i for i, analysis in enumerate(expected) if analysis["WinPercentage"] <= threshold)
+        results = matchanalyzer.analyze_many(
+            pairs, acceptable=lambda i, analysis: analysis["WinPercentage"] <= threshold, processes=2)
+        self.assertEqual(results[:first + 1], expected[:first + 1])
+        self.assertEqual(results[first + 1:], [None] * (len(pairs) - first - 1))
+
+    def test_takes_pairs_lazily(self):
+        pairs = [self.mm.make(retries_max=0).teams[:2] for _ in range(40)]
+        expected = [matchanalyzer.analyze(blue, red) for blue, red in pairs]
+        threshold = sorted(analysis["WinPercentage"] for analysis in expected)[5]
+        first = next(i for i, analysis in enumerate(expected) if analysis["WinPercentage"] <= threshold)
+        for processes in (0, 2):
+            taken = []
+
+            def make_pairs():
+                for pair in pairs:
+                    taken.append(pair)
+                    yield pair
+            results = matchanalyzer.analyze_many(
+                make_pairs(), acceptable=lambda i, analysis: analysis["WinPercentage"] <= threshold,
+                processes=processes)
+            self.assertEqual(results, expected[:first + 1])
+            if not processes:
+                self.assertEqual(len(taken), first + 1)
+
+    def test_other_greenlets_run_while_waiting(self):
+        pairs = [self.mm.make(retries_max=0).teams[:2] for _ in range(40)]
+        expected = [matchanalyzer.analyze(blue, red) for blue, red in pairs]
+        ticks = []
+
+        def tick():
+            while True:
+                ticks.append(time.time())
+                gevent.sleep(0.001)
+        ticker = gevent.spawn(tick)
+        try:
+            results = gevent.spawn(matchanalyzer.analyze_many, pairs, processes=2).get()
+        finally:
+            ticker.kill()
+        self.assertEqual(results, expected)
+        self.assertGreater(len(ticks), 1)
+
+
+class TieredEvaluationTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.event = 'standard'
+        cls.mm = setup_matchmaker(cls.event, equalize_rarities=True)
+
+    def test_estimate_range(self):
+        for _ in range(100):
+            blue, red = self.mm.make(retries_max=0).teams
+            self.assertTrue(50 <= matchanalyzer.estimate(blue, red) <= 100)
+
+    def test_pruned_matches_are_audited(self):
+        tiers = self.mm._cfg['tiered_evaluation']
+        self.mm._cfg['tiered_evaluation'] = {'enabled': True, 'prune_estimated_winchance': 80, 'audit_rate': 1}
+        try:
+            for _ in range(20):
+                self.assertIsNotNone(self.mm.make(retries_max=0).analysis)
+        finally:
+            self.mm._cfg['tiered_evaluation'] = tiers
+        stats = self.mm.tiered_evaluation_stats
+        log.info("Tiered evaluation: %s", dict(stats))
+        self.assertGreater(stats['estimated'], 0)
+        self.assertEqual(stats['audited'], stats['pruned'])
+
+
+class LocalSearchTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.event = 'standard'
+        cls.mm = setup_matchmaker(cls.event, equalize_rarities=True)
+
+    def test_local_search_makes_valid_matches(self):
+        local_search = self.mm._cfg['local_search']
+        self.mm._cfg['local_search'] = {'enabled': True, 'new_attempts': 1}
+        try:
+            for _ in range(20):
+                match = self.mm.make(retries_max=0)
+                self.assertIsNotNone(match.analysis)
+                self.assertEqual([len(team) for team in match.teams],
+                                 [len(team) for team in match.pre_alteration_teams])
+        finally:
+            self.mm._cfg['local_search'] = local_search
+        stats = self.mm.balancing_stats
+        log.info("Balancing: %s", dict(stats))
+        self.assertGreater(stats['matches'], 0)
+
+    def test_seeded_match_whatever_the_batch_size(self):
+        cfg = dict(self.mm._cfg)
+        self.mm._cfg['local_search'] = {'enabled': True, 'new_attempts': 3}
+        try:
+            made = {}
+            for batch_size in (1, 8):
+                self.mm._cfg['analysis_batch_size'] = batch_size
+                made[batch_size] = []
+                for seed in range(5):
+                    match = self.mm.make(seed=seed, retries_max=0)
+                    made[batch_size].append([(p['species']['id'], p['setname']) for p in chain(*match.teams)])
+        finally:
+            self.mm._cfg.update(cfg)
+        self.assertEqual(made[1], made[8])
+
+    def test_swaps_of_duplicated_sets(self):
+        pokeset = {'species': {'id': 1}, 'setname': 'Standard'}
+        other = {'species': {'id': 4}, 'setname': 'Standard'}
+        pre_alteration_teams = [[pokeset, deepcopy(pokeset)], [deepcopy(other), deepcopy(pokeset)]]
+        teams = [[dict(deepcopy(p), original_species=p['species']) for p in team] for team in pre_alteration_teams]
+        values = [10, 20, 30, 40]
+        match = SimpleNamespace(pre_alteration_teams=pre_alteration_teams, teams=teams, analysis={
+            'Winner': 'red',
+            'Pokemon': [{'Team': 'Blue' if i < 2 else 'Red', 'Value': value} for i, value in enumerate(values)]})
+        # every position once, the favored red team's most valuable Pokemon first
+        self.assertEqual(_get_swaps(match), [(1, 1), (1, 0), (0, 0), (0, 1)])
+
+
+class DeadlineTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.event = 'standard'
+        cls.mm = setup_matchmaker(cls.event, equalize_rarities=True)
+
+    def test_out_of_time_uses_best_valid_match(self):
+        for _ in range(10):
+            start = time.monotonic()
+            match = self.mm.make(retries_max=0, deadline_ms=1)
+            self.assertIsNotNone(match.analysis)
+            log.info("Made match with 1ms deadline in %.1fms", (time.monotonic() - start) * 1000)
+        match = self.mm.make_from_bid('clone pikachu', deadline_ms=1)
+        self.assertIsNotNone(match.analysis)
+
+    def test_retries_after_the_deadline(self):
+        select_modes = self.mm._select_modes
+        failures = []
+
+        def fail_first(from_rotation=False):
+            if not failures:
+                failures.append(True)
+                # out of time by the time the first modes fail
+                time.sleep(0.01)
+                raise InvalidMatch("no valid match for these modes")
+            return select_modes(from_rotation)
+        self.mm._select_modes = fail_first
+        try:
+            match = self.mm.make(retries_max=1, deadline_ms=1)
+        finally:
+            del self.mm._select_modes
+        self.assertEqual(failures, [True])
+        self.assertIsNotNone(match.analysis)
+
+
+class MatchBufferTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.event = 'standard'
+        cls.mm = setup_matchmaker(cls.event, equalize_rarities=True)
+
+    def tearDown(self):
+        self.mm.close()
+        self.mm.match_buffer.size = 0
+
+    def fill(self, size):
+        self.mm.match_buffer.size = size
+        self.assertIsNone(self.mm.match_buffer.pop())
+        with gevent.Timeout(60):
+            while len(self.mm.match_buffer) < size:
+                gevent.sleep(0.05)
+
+    def test_make_takes_buffered_matches(self):
+        self.fill(2)
+        buffered = [match for match, _ in self.mm.match_buffer._matches]
+        self.assertIs(self.mm.make(), buffered[0])
+        self.assertIs(self.mm.make(), buffered[1])
+        self.assertEqual(self.mm.match_buffer.stats['hits'], 2)
+
+    def test_invalidated_by_unselectable_modes(self):
+        self.fill(1)
+        self.mm.set_unselectable_modes(['doubles'])
+        try:
+            self.assertIsNone(self.mm.match_buffer.pop())
+        finally:
+            self.mm.set_unselectable_modes([])
+
+    def test_invalidated_by_appearances(self):
+        self.fill(1)
+        match, _ = self.mm.match_buffer._matches[0]
+        pokeset = match.pre_alteration_teams[0][0]
+        self.mm._set_repository.update_set_appearance(make_pokeset_db_id(pokeset), 'match', datetime.utcnow())
+        self.assertIsNot(self.mm.match_buffer.pop(), match)
+        self.assertEqual(self.mm.match_buffer.stats['invalidated'], 1)
+
+    def test_seeded_make_while_filling(self):
+        def make_seeded():
+            match = self.mm.make(seed=1234, retries_max=0)
+            return (match.metagame.base_ids + match.gimmick.base_ids +
+                    [(p['species']['id'], p['setname']) for p in chain(*match.pre_alteration_teams)])
+        expected = make_seeded()
+        self.mm.match_buffer.size = 2
+        self.mm.match_buffer.pop()
+        # let the filler start making a match, with random draws of its own
+        gevent.sleep(0.01)
+        self.assertEqual(make_seeded(), expected)
+
+    def test_buffer_is_bounded(self):
+        made = []
+        buffer = MatchBuffer(3, lambda: made.append(len(made)) or made[-1], lambda: None)
+        buffer.pop()
+        gevent.sleep(0.1)
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(len(made), 3)
+        self.assertEqual(buffer.pop(), 0)
+        buffer.close()
+
+    def test_fill_alongside_foreground_draws(self):
+        def draw():
+            draws = []
+            for _ in range(5):
+                draws.append(random.random())
+                gevent.sleep(0.001)
+            return draws
+
+        def draw_seeded():
+            random.seed(1234)
+            return draw()
+        expected = draw_seeded()
+        buffer = MatchBuffer(1, draw, lambda: None)
+        own_random = random.Random()
+        own_random.setstate(buffer._random.getstate())
+        buffer.pop()
+        # let the filler start drawing, then draw alongside it
+        gevent.sleep(0)
+        self.assertEqual(draw_seeded(), expected)
+        with gevent.Timeout(5):
+            while not buffer:
+                gevent.sleep(0.01)
+        self.assertEqual(buffer.pop(), [own_random.random() for _ in range(5)])
+        buffer.close()
+
+
+class AttemptBudgetsTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.event = 'standard'
+        cls.mm = setup_matchmaker(cls.event, equalize_rarities=True)
+
+    def make_budgets(self, path=None):
+        cfg = dict(self.mm._cfg['attempt_budgets'], enabled=True, explore_rate=0, path=path)
+        return AttemptBudgets(cfg)
+
+    def test_hopeless_combinations_give_up_early(self):
+        budgets = self.make_budgets()
+        for _ in range(budgets.min_matches):
+            budgets.record('hopeless', False, 20, 75)
+            budgets.record('easy', True, 2, 55)
+        self.assertEqual(budgets.get('hopeless', 20), budgets.min_attempts)
+        self.assertLess(budgets.get('easy', 20), 20)
+        self.assertEqual(budgets.get('unknown', 20), 20)
+
+    def test_statistics_persist(self):
+        with tempfile.TemporaryDirectory() as directory:
+            stats_path = os.path.join(directory, 'attempt_budgets.json')
+            budgets = self.make_budgets(stats_path)
+            budgets.record('combination', True, 4, 55)
+            budgets.save()
+            self.assertEqual(self.make_budgets(stats_path).stats, budgets.stats)
+
+    def test_matches_are_recorded(self):
+        self.mm.make(retries_max=0)
+        exported = self.mm.export_attempt_budgets()
+        self.assertTrue(exported)
+        for stats in exported.values():
+            self.assertGreater(stats['matches'], 0)
+            self.assertLessEqual(stats['budget'], self.mm._cfg['max_attempts'])
+
+    def test_budget_limits_the_first_batch(self):
+        attempt_budgets = self.mm.attempt_budgets
+        cfg = dict(self.mm._cfg)
+        budgets = self.make_budgets()
+        budgets.get = lambda key, max_attempts: 2
+        self.mm.attempt_budgets = budgets
+        # a batch of more attempts than the budget, none of them acceptable
+        self.mm._cfg.update(analysis_batch_size=10, acceptable_estimated_winchance=0)
+        try:
+            analyses = self.mm.balancing_stats['analyses']
+            self.mm.make(retries_max=0)
+            self.assertLessEqual(self.mm.balancing_stats['analyses'] - analyses, 2)
+        finally:
+            self.mm.attempt_budgets = attempt_budgets
+            self.mm._cfg.update(cfg)
+
+
+class EffectivenessTests(unittest.TestCase):
+    def test_derived_tables(self):
+        tables = effectiveness.TABLES
+        ice, bug, ghost = (effectiveness.TYPES[name] for name in ('ice', 'bug', 'ghost'))
+        self.assertEqual(tables['ice-se-on-bug'][ice][bug], 2)
+        self.assertEqual(tables['inverse-of-ice-se-on-bug'][ice][bug], 0.5)
+        self.assertEqual(tables['inverse'][ghost][effectiveness.TYPES['normal']], 2)
+        self.assertEqual(tables['normal'][ice][bug], 1)
+
+    def test_defender_rows_match_single_type_products(self):
+        abilities = sorted(effectiveness.ABILITIES) + ['none', 'moldbreaker', 'wonderguard']
+        for variant, table in effectiveness.TABLES.items():
+            for type1 in ('fire', 'water', 'flying', 'grounded'):
+                for type2 in ('bug', 'steel', 'none'):
+                    for ability in abilities:
+                        row = effectiveness.defender_row(variant, type1, type2, ability)
+                        for movetype, index in effectiveness.TYPES.items():
+                            self.assertEqual(row[index],
+                                             effectiveness.effectiveness(table, movetype, type1, ability) *
+                                             effectiveness.effectiveness(table, movetype, type2, ability))
+
+
+class MoveRegistryTests(unittest.TestCase):
+    def test_every_gen4_move_is_registered(self):
+        for move in pokecat.gen4data.MOVES:
+            if move:
+                self.assertIn(moves.move_key(move['name']), moves.MOVES)
+        self.assertEqual(moves.move_info('swordsdance').stages, (('atk', 2),))
+        self.assertTrue(moves.move_info('horndrill').flags & moves.OHKO)
+        self.assertIs(moves.move_info('notamove'), moves.NO_INFO)
+
+    def test_register_move(self):
+        old = moves.move_info('splash')
+        try:
+            moves.register_move('splash', moves.STAT_BOOST, stages=(('speed', 1),), setup_value=0.5)
+            self.assertEqual(moves.move_info('splash'),
+                             moves.MoveInfo(moves.STAT_BOOST, (('speed', 1),), None, 0.5, 0, 0))
+        finally:
+            moves.MOVES['splash'] = old
+
+
 class StandardTestsLong(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
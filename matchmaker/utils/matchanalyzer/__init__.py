@@ -1,6 +1,15 @@
 
-from .analyzer import MatchMaker
+from .analyzer import MatchMaker, AnalysisContext, FightCache, render_match_prediction
+from .estimate import estimate
+from . import batch
 
+# MatchMaker only holds constant tables, per-call state lives in an AnalysisContext,
+# so this shared instance may be used from several threads or greenlets at once.
 _MM = MatchMaker()
 
 analyze = _MM.analyze
+
+
+def analyze_many(pairs, effectiveness='normal', acceptable=None, processes=0):
+    """analyze() for a list of (BlueTeam, RedTeam) pairs, see batch.analyze_many."""
+    return batch.analyze_many(analyze, pairs, effectiveness, acceptable, processes)
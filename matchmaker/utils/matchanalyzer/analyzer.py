@@ -2,113 +2,174 @@ from __future__ import division
 import random
 import logging
 import os
+import threading
+from collections import OrderedDict
 import pokecat
-import copy
+
+from .effectiveness import TYPES, TABLES, defender_row, effectiveness as type_effectiveness
+from .moves import (STAT_BOOST, NOT_FOR_GHOSTS, HEAL, CHARGE, RECHARGE, RECOIL, OHKO, SOUND, HP_BASED, move_key,
+                    move_info)
 
 log = logging.getLogger("pbrmm")
 TurnLimit = 9  # this flags "cancer" matches, if a 1v1 lasts longer than TurnLimit, throw a flag (EX. Wobbuffet vs wynaut lasts 95 theoretical turns)
 
 
+def make_battler(pokemon):
+    """
+    Normalizes the names of a pokemon once, so the fight loops don't have to do it for every move of every turn.
+
+    Arguments:
+            pokemon:
+                pokemon data as passed to analyze
+
+    Returns a dict, structured like:
+        {
+            'item': lowercase item name without spaces and apostrophes, 'none' if there is no item
+            'ability': lowercase ability name without spaces, 'none' if there is no ability
+            'nature': lowercase nature name without spaces
+            'types': [first type, second type or 'none'], lowercase
+            'moves':
+                [
+                {
+                'key': lowercase move name without spaces and hyphens
+                'type': lowercase move type, '???' counts as ghost
+                'category': 'physical', 'special' or 'status'
+                'power': base power
+                'accuracy': accuracy, None if the move can't miss
+                'info': the analyzer's MoveInfo of the move, see moves.py
+                }
+                ]
+            'fingerprint': hashable copy of everything a fight reads from the pokemon data, for FightCache keys
+        }
+    """
+    types = pokemon['species']['types']
+    battler = {'item': 'none', 'ability': 'none', 'nature': pokemon['nature']['name'].lower().replace(' ', ''),
+               'types': [types[0].lower(), 'none'], 'moves': []}
+    if pokemon['item']['name'] is not None:
+        battler['item'] = pokemon['item']['name'].lower().replace(' ', '').replace("'", '')
+    if pokemon['ability']['name'] is not None:
+        battler['ability'] = pokemon['ability']['name'].lower().replace(' ', '')
+    if len(types) == 2:
+        battler['types'][1] = types[1].lower()
+    for move in pokemon['moves']:
+        movetype = move['type'].lower().replace(' ', '')
+        if movetype == '???':
+            movetype = 'ghost'
+        key = move_key(move['name'])
+        battler['moves'].append({'key': key,
+                                 'type': movetype,
+                                 'category': move['category'].lower().replace(' ', ''),
+                                 'power': move['power'],
+                                 'accuracy': move['accuracy'],
+                                 'info': move_info(key)})
+    stats = pokemon['stats']
+    battler['fingerprint'] = (pokemon['species']['id'], tuple(types), pokemon['item']['name'],
+                              pokemon['nature']['name'],
+                              (stats['hp'], stats['atk'], stats['def'], stats['spA'], stats['spD'], stats['spe']),
+                              tuple((move['name'], move['type'], move['category'], move['power'], move['accuracy'])
+                                    for move in pokemon['moves']))
+    return battler
+
+
+class FightCache(object):
+    """
+    Bounded LRU cache of Sub_Fight results, shared by all analyses of a MatchMaker.
+
+    The same 1v1s come up again and again across the attempts of a balanced match, so their outcome is kept
+    keyed on everything the fight depends on: both pokemon, their hp, stat stages and recharge state, the
+    effectiveness table and the few team positions the fight looks at. The values of the fighters are not part of
+    the key, the fight only adds to them, so the increments are kept instead. hits and misses count lookups.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._results)
+
+    def get(self, key):
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._results.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            if len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """dict with the hits, misses, hit rate and size of the cache"""
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hitrate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._results), 'maxsize': self.maxsize}
+
+
+def render_death(dead_team, killer, killer_move_index, killer_move, dead, dead_move_index, dead_move, turns,
+                 hp_left):
+    """The 'MatchPrediction' sentence of a death recorded by Core_Fight"""
+    return (dead_team + ' died: ' + killer.replace("\u2642", "m").replace("\u2640", "f") + ', ' +
+            str(killer_move_index) + '.' + str(killer_move) + ' has killed ' +
+            dead.replace("\u2642", "m").replace("\u2640", "f") + ', ' + str(dead_move_index) + '.' +
+            str(dead_move) + ' in ' + str(turns) + ' turns with {0:6.2f}'.format(hp_left * 100) + '% hp left')
+
+
+def render_match_prediction(analysis):
+    """
+    Fills the 'MatchPrediction' sentences of an analysis from its 'Deaths'
+
+    analyze() leaves them empty, most analyses belong to match attempts that are thrown away unread.
+    Returns the analysis.
+    """
+    analysis['MatchPrediction'] = [render_death(*death) for death in analysis['Deaths']]
+    return analysis
+
+
+class AnalysisContext(object):
+    """
+    State of a single analyze() call.
+
+    MatchMaker itself only holds constant tables, everything an analysis writes lives here,
+    so one MatchMaker can analyze several matches at once from threads or greenlets.
+    """
+    def __init__(self, effectiveness, NmbBlumons, PokemonData):
+        self.effectiveness = effectiveness
+        self.NmbBlumons = NmbBlumons
+        # make_battler() records, in the same order as PokemonData
+        self.battlers = [make_battler(pokemon) for pokemon in PokemonData]
+        self.badturns = False
+        self.matchdict = {'Pokemon': [], 'CancerChecks': {'1v1HighestTurns': 0, 'MatchTurns': 0, 'UnusedMons': False,
+                                                          'UselessMons': False, 'UseMatch': True, 'HealCancer': False},
+                          'MatchPrediction': [], 'Deaths': []}
+
+
 class MatchMaker(object):
-    def __init__(self):
+    def __init__(self, fight_cache_size=4096):
+        """
+        Arguments:
+                fight_cache_size:
+                    number of 1v1 results to keep in the FightCache, 0 disables the cache (e.g. to compare results)
+        """
         self.log = log
+        self.fight_cache = FightCache(fight_cache_size) if fight_cache_size else None
 
-        # Type dictionary, u is an attacking type only, grounded is a defending flying type with an iron ball
-        self._Types = {"normal": 0, "fire": 1, "water": 2, "electric": 3, "grass": 4,
-                       "ice": 5, "fighting": 6, "poison": 7, "ground": 8, "flying": 9,
-                       "psychic": 10, "bug": 11, "rock": 12, "ghost": 13, "dragon": 14,
-                       "dark": 15, "steel": 16, "u": 17, "grounded": 17, "fairy": 17}
-
-        self._typeEffectivenessTables = {
-            "normal": [  # Fe1k's Design
-                #                                     Defenders
-                # NOR  FIR  WAT  ELE  GRA  ICE  FIG  POI  GRO  FLY  PSY  BUG  ROC  GHO  DRA  DAR  STE GRD
-                [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0.5, 0, 1, 1, 0.5, 1],  # NOR
-                [1, 0.5, 0.5, 1, 2, 2, 1, 1, 1, 1, 1, 2, 0.5, 1, 0.5, 1, 2, 1],  # FIR
-                [1, 2, 0.5, 1, 0.5, 1, 1, 1, 2, 1, 1, 1, 2, 1, 0.5, 1, 1, 1],  # WAT
-                [1, 1, 2, 0.5, 0.5, 1, 1, 1, 0, 2, 1, 1, 1, 1, 0.5, 1, 1, 2],  # ELE
-                [1, 0.5, 2, 1, 0.5, 1, 1, 0.5, 2, 0.5, 1, 0.5, 2, 1, 0.5, 1, 0.5, 0.5],  # GRA
-                [1, 0.5, 0.5, 1, 2, 0.5, 1, 1, 2, 2, 1, 1, 1, 1, 2, 1, 0.5, 2],  # ICE
-                [2, 1, 1, 1, 1, 2, 1, 0.5, 1, 0.5, 0.5, 0.5, 2, 0, 1, 2, 2, 0.5],  # FIG
-                [1, 1, 1, 1, 2, 1, 1, 0.5, 0.5, 1, 1, 1, 0.5, 0.5, 1, 1, 0, 1],  # POI
-                [1, 2, 1, 2, 0.5, 1, 1, 2, 1, 0, 1, 0.5, 2, 1, 1, 1, 2, 1],  # GRO   Attackers
-                [1, 1, 1, 0.5, 2, 1, 2, 1, 1, 1, 1, 2, 0.5, 1, 1, 1, 0.5, 1],  # FLY
-                [1, 1, 1, 1, 1, 1, 2, 2, 1, 1, 0.5, 1, 1, 1, 1, 0, 0.5, 1],  # PSY
-                [1, 0.5, 1, 1, 2, 1, 0.5, 0.5, 1, 0.5, 2, 1, 1, 0.5, 1, 2, 0.5, 0.5],  # BUG
-                [1, 2, 1, 1, 1, 2, 0.5, 1, 0.5, 2, 1, 2, 1, 1, 1, 1, 0.5, 2],  # ROC
-                [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 1, 1, 2, 1, 0.5, 0.5, 1],  # GHO
-                [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 1, 0.5, 1],  # DRA
-                [1, 1, 1, 1, 1, 1, 0.5, 1, 1, 1, 2, 1, 1, 2, 1, 0.5, 0.5, 1],  # DAR
-                [1, 0.5, 0.5, 0.5, 1, 2, 1, 1, 1, 1, 1, 1, 2, 1, 1, 1, 0.5, 1],  # STE
-                [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],  # U
-            ],
-            "inverse": [  # Fe1k's Design
-                #                                     Defenders
-                # NOR  FIR  WAT  ELE  GRA  ICE  FIG  POI  GRO  FLY  PSY  BUG  ROC  GHO  DRA  DAR  STE GRD
-                [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 1, 1, 2, 1],  # NOR
-                [1, 2, 2, 1, 0.5, 0.5, 1, 1, 1, 1, 1, 0.5, 2, 1, 2, 1, 0.5, 1],  # FIR
-                [1, 0.5, 2, 1, 2, 1, 1, 1, 0.5, 1, 1, 1, 0.5, 1, 2, 1, 1, 1],  # WAT
-                [1, 1, 0.5, 2, 2, 1, 1, 1, 2, 0.5, 1, 1, 1, 1, 2, 1, 1, 0.5],  # ELE
-                [1, 2, 0.5, 1, 2, 1, 1, 2, 0.5, 2, 1, 2, 0.5, 1, 2, 1, 2, 2],  # GRA
-                [1, 2, 2, 1, 0.5, 2, 1, 1, 0.5, 0.5, 1, 1, 1, 1, 0.5, 1, 2, 0.5],  # ICE
-                [0.5, 1, 1, 1, 1, 0.5, 1, 2, 1, 2, 2, 2, 0.5, 2, 1, 0.5, 0.5, 2],  # FIG
-                [1, 1, 1, 1, 0.5, 1, 1, 2, 2, 1, 1, 1, 2, 2, 1, 1, 2, 1],  # POI
-                [1, 0.5, 1, 0.5, 2, 1, 1, 0.5, 1, 2, 1, 2, 0.5, 1, 1, 1, 0.5, 1],  # GRO   Attackers
-                [1, 1, 1, 2, 0.5, 1, 0.5, 1, 1, 1, 1, 0.5, 2, 1, 1, 1, 2, 1],  # FLY
-                [1, 1, 1, 1, 1, 1, 0.5, 0.5, 1, 1, 2, 1, 1, 1, 1, 2, 2, 1],  # PSY
-                [1, 2, 1, 1, 0.5, 1, 2, 2, 1, 2, 0.5, 1, 1, 2, 1, 0.5, 2, 2],  # BUG
-                [1, 0.5, 1, 1, 1, 0.5, 2, 1, 2, 0.5, 1, 0.5, 1, 1, 1, 1, 2, 0.5],  # ROC
-                [2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0.5, 1, 1, 0.5, 1, 2, 2, 1],  # GHO
-                [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0.5, 1, 2, 1],  # DRA
-                [1, 1, 1, 1, 1, 1, 2, 1, 1, 1, 0.5, 1, 1, 0.5, 1, 2, 2, 1],  # DAR
-                [1, 2, 2, 2, 1, 0.5, 1, 1, 1, 1, 1, 1, 0.5, 1, 1, 1, 2, 1],  # STE
-                [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],  # U
-            ],
-            "ice-se-on-bug": [  # Fe1k's Design
-                #                                     Defenders
-                # NOR  FIR  WAT  ELE  GRA  ICE  FIG  POI  GRO  FLY  PSY  BUG  ROC  GHO  DRA  DAR  STE GRD
-                [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0.5, 0, 1, 1, 0.5, 1],  # NOR
-                [1, 0.5, 0.5, 1, 2, 2, 1, 1, 1, 1, 1, 2, 0.5, 1, 0.5, 1, 2, 1],  # FIR
-                [1, 2, 0.5, 1, 0.5, 1, 1, 1, 2, 1, 1, 1, 2, 1, 0.5, 1, 1, 1],  # WAT
-                [1, 1, 2, 0.5, 0.5, 1, 1, 1, 0, 2, 1, 1, 1, 1, 0.5, 1, 1, 2],  # ELE
-                [1, 0.5, 2, 1, 0.5, 1, 1, 0.5, 2, 0.5, 1, 0.5, 2, 1, 0.5, 1, 0.5, 0.5],  # GRA
-                [1, 0.5, 0.5, 1, 2, 0.5, 1, 1, 2, 2, 1, 2, 1, 1, 2, 1, 0.5, 2],  # ICE
-                [2, 1, 1, 1, 1, 2, 1, 0.5, 1, 0.5, 0.5, 0.5, 2, 0, 1, 2, 2, 0.5],  # FIG
-                [1, 1, 1, 1, 2, 1, 1, 0.5, 0.5, 1, 1, 1, 0.5, 0.5, 1, 1, 0, 1],  # POI
-                [1, 2, 1, 2, 0.5, 1, 1, 2, 1, 0, 1, 0.5, 2, 1, 1, 1, 2, 1],  # GRO   Attackers
-                [1, 1, 1, 0.5, 2, 1, 2, 1, 1, 1, 1, 2, 0.5, 1, 1, 1, 0.5, 1],  # FLY
-                [1, 1, 1, 1, 1, 1, 2, 2, 1, 1, 0.5, 1, 1, 1, 1, 0, 0.5, 1],  # PSY
-                [1, 0.5, 1, 1, 2, 1, 0.5, 0.5, 1, 0.5, 2, 1, 1, 0.5, 1, 2, 0.5, 0.5],  # BUG
-                [1, 2, 1, 1, 1, 2, 0.5, 1, 0.5, 2, 1, 2, 1, 1, 1, 1, 0.5, 2],  # ROC
-                [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 1, 1, 2, 1, 0.5, 0.5, 1],  # GHO
-                [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 1, 0.5, 1],  # DRA
-                [1, 1, 1, 1, 1, 1, 0.5, 1, 1, 1, 2, 1, 1, 2, 1, 0.5, 0.5, 1],  # DAR
-                [1, 0.5, 0.5, 0.5, 1, 2, 1, 1, 1, 1, 1, 1, 2, 1, 1, 1, 0.5, 1],  # STE
-                [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],  # U
-            ],
-            "inverse-of-ice-se-on-bug": [  # Fe1k's Design
-                #                                     Defenders
-                # NOR  FIR  WAT  ELE  GRA  ICE  FIG  POI  GRO  FLY  PSY  BUG  ROC  GHO  DRA  DAR  STE GRD
-                [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 1, 1, 2, 1],  # NOR
-                [1, 2, 2, 1, 0.5, 0.5, 1, 1, 1, 1, 1, 0.5, 2, 1, 2, 1, 0.5, 1],  # FIR
-                [1, 0.5, 2, 1, 2, 1, 1, 1, 0.5, 1, 1, 1, 0.5, 1, 2, 1, 1, 1],  # WAT
-                [1, 1, 0.5, 2, 2, 1, 1, 1, 2, 0.5, 1, 1, 1, 1, 2, 1, 1, 0.5],  # ELE
-                [1, 2, 0.5, 1, 2, 1, 1, 2, 0.5, 2, 1, 2, 0.5, 1, 2, 1, 2, 2],  # GRA
-                [1, 2, 2, 1, 0.5, 2, 1, 1, 0.5, 0.5, 1, 0.5, 1, 1, 0.5, 1, 2, 0.5],  # ICE
-                [0.5, 1, 1, 1, 1, 0.5, 1, 2, 1, 2, 2, 2, 0.5, 2, 1, 0.5, 0.5, 2],  # FIG
-                [1, 1, 1, 1, 0.5, 1, 1, 2, 2, 1, 1, 1, 2, 2, 1, 1, 2, 1],  # POI
-                [1, 0.5, 1, 0.5, 2, 1, 1, 0.5, 1, 2, 1, 2, 0.5, 1, 1, 1, 0.5, 1],  # GRO   Attackers
-                [1, 1, 1, 2, 0.5, 1, 0.5, 1, 1, 1, 1, 0.5, 2, 1, 1, 1, 2, 1],  # FLY
-                [1, 1, 1, 1, 1, 1, 0.5, 0.5, 1, 1, 2, 1, 1, 1, 1, 2, 2, 1],  # PSY
-                [1, 2, 1, 1, 0.5, 1, 2, 2, 1, 2, 0.5, 1, 1, 2, 1, 0.5, 2, 2],  # BUG
-                [1, 0.5, 1, 1, 1, 0.5, 2, 1, 2, 0.5, 1, 0.5, 1, 1, 1, 1, 2, 0.5],  # ROC
-                [2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0.5, 1, 1, 0.5, 1, 2, 2, 1],  # GHO
-                [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0.5, 1, 2, 1],  # DRA
-                [1, 1, 1, 1, 1, 1, 2, 1, 1, 1, 0.5, 1, 1, 0.5, 1, 2, 2, 1],  # DAR
-                [1, 2, 2, 2, 1, 0.5, 1, 1, 1, 1, 1, 1, 0.5, 1, 1, 1, 2, 1],  # STE
-                [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],  # U
-            ],
-        }
+        self._Types = TYPES
+        self._typeEffectivenessTables = TABLES
         self._statmultipliers = [0.25, 0.28, 0.33, 0.40, 0.50, 0.66, 1, 1.5, 2, 2.5, 3, 3.5, 4]
         self._critmultipliers = [0.0625, 0.125, 0.25, 0.333, 0.5, 0.5, 0.5]
 
@@ -211,11 +272,13 @@ class MatchMaker(object):
                                340.0, 106.6, 26.6, 0.3, 0.3, 0.3, 0.3, 683.0, 336.0, 430.0, 420.0, 750.0, 85.6, 3.1,
                                1.4, 50.5, 2.1, 320.0]
 
-    def getEff(self, type1name, type2name, defenderability):
+    def getEff(self, ctx, type1name, type2name, defenderability):
         """
         Calculates the effectiveness of an attack
 
         Arguments:
+                ctx:
+                    AnalysisContext of the analysis in progress
                 type1name:
                     Attacking move type
                 type2name:
@@ -228,39 +291,17 @@ class MatchMaker(object):
                 tempx:
                     float, effectiveness of the attack (1 = neutral, 2 = super effective)
         """
+        return type_effectiveness(self._typeEffectivenessTables[ctx.effectiveness], type1name, type2name,
+                                  defenderability)
 
-        if type2name == 'none':
-            return (1)
-        type1 = self._Types[type1name]
-        type2 = self._Types[type2name]
-        tempx = self._typeEffectivenessTables[self._effectiveness][type1][type2]
-        if defenderability.lower() == 'waterabsorb' and type1name == 'water':
-            tempx = 0
-        elif defenderability.lower() in ('voltabsorb', 'motordrive') and type1name == 'electric':
-            tempx = 0
-        elif defenderability.lower() == 'levitate' and type1name == 'ground':
-            tempx = 0
-        elif defenderability.lower() == 'flashfire' and type1name == 'fire':
-            tempx = 0
-        elif defenderability.lower() == 'dryskin':
-            if type1name == 'water':
-                tempx = 0
-            if type1name == 'fire':
-                tempx = tempx * 1.25
-        if defenderability.lower() == 'thickfat' and type1name in ('ice', 'fire'):
-            tempx = tempx * 0.5
-        if defenderability.lower() == 'heatproof' and type1name == 'fire':
-            tempx = tempx * 0.5
-        if defenderability.lower() in ('filter', 'solidrock') and tempx > 1:
-            tempx = tempx * 0.75
-        return tempx
-
-    def DamageDealt(self, Attacker, Defender, moveset2, PokemonData, BattlerStats, dmg, AttackerCurrentHP,
+    def DamageDealt(self, ctx, Attacker, Defender, moveset2, PokemonData, BattlerStats, dmg, AttackerCurrentHP,
                     DefenderCurrentHP):
         """
         This calculates the damage a single move will do against a defending pokemon
 
         Arguments:
+                ctx:
+                    AnalysisContext of the analysis in progress
                 Attacker:
                     Position of Attacker in PokemonData
                 Defender:
@@ -284,23 +325,16 @@ class MatchMaker(object):
         """
 
         # set up items
-        BattlerStats[Attacker]['item'] = 'none'
-        if PokemonData[Attacker]['item']['name'] is not None:
-            BattlerStats[Attacker]['item'] = PokemonData[Attacker]['item']['name'].lower().replace(' ', '').replace("'",
-                                                                                                                    '')
-        BattlerStats[Defender]['item'] = 'none'
-        if PokemonData[Defender]['item']['name'] is not None:
-            BattlerStats[Defender]['item'] = PokemonData[Defender]['item']['name'].lower().replace(' ', '').replace("'",
-                                                                                                                    '')
+        BattlerStats[Attacker]['item'] = ctx.battlers[Attacker]['item']
+        BattlerStats[Defender]['item'] = ctx.battlers[Defender]['item']
         # Attacking move
-        AttackerMoveName = PokemonData[Attacker]['moves'][moveset2]['name'].lower().replace(' ', '').replace('-',
-                                                                                                             '')  # Name
-        AttackerMoveType = PokemonData[Attacker]['moves'][moveset2]['type'].lower().replace(' ', '')  # type
-        if AttackerMoveType == '???':
-            AttackerMoveType = 'ghost'
-        AttackerMoveCategory = PokemonData[Attacker]['moves'][moveset2]['category'].lower().replace(' ', '')  # category
-        AttackerMovePower = PokemonData[Attacker]['moves'][moveset2]['power']  # power
-        AttackerMoveAccuracy = PokemonData[Attacker]['moves'][moveset2]['accuracy']  # accuracy
+        AttackerMove = ctx.battlers[Attacker]['moves'][moveset2]
+        AttackerMoveName = AttackerMove['key']  # Name
+        AttackerMoveFlags = AttackerMove['info'].flags
+        AttackerMoveType = AttackerMove['type']  # type
+        AttackerMoveCategory = AttackerMove['category']  # category
+        AttackerMovePower = AttackerMove['power']  # power
+        AttackerMoveAccuracy = AttackerMove['accuracy']  # accuracy
         if AttackerMoveAccuracy is None:
             AttackerMoveAccuracy = 101
         else:
@@ -317,14 +351,8 @@ class MatchMaker(object):
                 AttackerMoveAccuracy *= 1.3
 
         # Mon types
-        AttackerType = ['', 'none']
-        DefenderType = ['', 'none']
-        AttackerType[0] = PokemonData[Attacker]['species']['types'][0].lower()
-        if len(PokemonData[Attacker]['species']['types']) == 2:
-            AttackerType[1] = PokemonData[Attacker]['species']['types'][1].lower()
-        DefenderType[0] = PokemonData[Defender]['species']['types'][0].lower()
-        if len(PokemonData[Defender]['species']['types']) == 2:
-            DefenderType[1] = PokemonData[Defender]['species']['types'][1].lower()
+        AttackerType = list(ctx.battlers[Attacker]['types'])
+        DefenderType = list(ctx.battlers[Defender]['types'])
         if DefenderType[0] == 'flying' and BattlerStats[Defender]['item']:
             DefenderType[0] = 'grounded'
         if DefenderType[1] == 'flying' and BattlerStats[Defender]['item']:
@@ -381,18 +409,15 @@ class MatchMaker(object):
             AttackerMovePower = 0
         elif AttackerMoveName == 'present':
             AttackerMovePower = 40
-        elif AttackerMoveName in ('skullbash', 'skyattack', 'razorwind', 'solarbeam', 'lastresort'):
+        elif AttackerMoveFlags & CHARGE or AttackerMoveName == 'lastresort':
             AttackerMovePower = AttackerMovePower * 0.5
-        elif AttackerMoveName in (
-        'hyperbeam', 'gigaimpact', 'rockwrecker', 'blastburn', 'hydrocannon', 'frenzyplant', 'roaroftime'):
+        elif AttackerMoveFlags & RECHARGE:
             AttackerMovePower = AttackerMovePower * 0.59
         elif AttackerMoveName in ('selfdestruct', 'explosion'):
             AttackerMovePower = AttackerMovePower * (1 - AttackerCurrentHP)
-            if Attacker in ((self._NmbBlumons - 1), (len(PokemonData) - 1)):
+            if Attacker in ((ctx.NmbBlumons - 1), (len(PokemonData) - 1)):
                 AttackerMovePower = 0
-        elif AttackerMoveName in (
-        'takedown', 'doubleedge', 'submission', 'volttackle', 'flareblitz', 'bravebird', 'woodhammer', 'headsmash',
-        'bravebird') and BattlerStats[Attacker]['ability'] == 'rockhead':
+        elif AttackerMoveFlags & RECOIL and BattlerStats[Attacker]['ability'] == 'rockhead':
             AttackerMovePower = AttackerMovePower / 1.2
         elif AttackerMoveName in ('leafstorm', 'overheat', 'psychoboost', 'dracometeor'):
             AttackerMovePower = AttackerMovePower * 0.611
@@ -511,9 +536,9 @@ class MatchMaker(object):
                 AttackerMovePower = PokemonData[Attacker]['moves'][moveset2]['power'] * 2
 
         # categories
-        if AttackerMoveCategory.lower() == 'status':
+        if AttackerMoveCategory == 'status':
             AttackerMovePower = 0
-        if AttackerMoveCategory.lower() == 'physical':
+        if AttackerMoveCategory == 'physical':
             DamageD = ((((0.84 * (
             BattlerStats[Attacker]['atk'] / BattlerStats[Defender]['def']) * AttackerMovePower) + 2) * 0.86) /
                        BattlerStats[Defender]['hp'])
@@ -527,9 +552,9 @@ class MatchMaker(object):
         TempDefenderAbility = BattlerStats[Defender]['ability']
         if BattlerStats[Attacker]['ability'] == 'moldbreaker':
             TempDefenderAbility = 'moldbreaker'
-        effmulti = self.getEff(AttackerMoveType, DefenderType[0], TempDefenderAbility) * self.getEff(AttackerMoveType,
-                                                                                                     DefenderType[1],
-                                                                                                     TempDefenderAbility)
+        # one precomputed row per defender covers both of its types and its ability
+        effmulti = defender_row(ctx.effectiveness, DefenderType[0], DefenderType[1],
+                                TempDefenderAbility)[self._Types[AttackerMoveType]]
 
         # special abilities/items based off effectiveness
         if TempDefenderAbility == 'wonderguard' and effmulti < 2:
@@ -555,7 +580,7 @@ class MatchMaker(object):
             DamageD *= 1.20
         if BattlerStats[Attacker]['item'] == 'lifeorb':
             DamageD *= 1.30
-        if AttackerMoveCategory.lower() == 'physical':
+        if AttackerMoveCategory == 'physical':
             if BattlerStats[Attacker]['item'] == 'muscleband':
                 DamageD *= 1.10
         else:
@@ -614,9 +639,9 @@ class MatchMaker(object):
                 BattlerStats[Attacker]['speed']:
             DamageD *= 0.9
         # bad berry return damage consideration
-        if BattlerStats[Defender]['item'] == 'jabocaberry' and AttackerMoveCategory.lower() == 'physical':
+        if BattlerStats[Defender]['item'] == 'jabocaberry' and AttackerMoveCategory == 'physical':
             DamageD *= 0.9
-        if BattlerStats[Defender]['item'] == 'rowapberry' and AttackerMoveCategory.lower() == 'special':
+        if BattlerStats[Defender]['item'] == 'rowapberry' and AttackerMoveCategory == 'special':
             DamageD *= 0.9
         if effmulti > 1 and BattlerStats[Defender]['item'] == 'enigmaberry':
             DamageD *= 0.9
@@ -624,12 +649,11 @@ class MatchMaker(object):
         DamageD *= effmulti
 
         # ohko
-        if AttackerMoveName in ('horndrill', 'sheercold', 'fissure', 'guillotine') and (
-            BattlerStats[Defender]['ability'] != 'sturdy'):
+        if AttackerMoveFlags & OHKO and BattlerStats[Defender]['ability'] != 'sturdy':
             DamageD = (DefenderCurrentHP / 3) + 0.01
         # no guard special cases
         if BattlerStats[Defender]['ability'] == 'noguard' or BattlerStats[Attacker]['ability'] == 'noguard':
-            if AttackerMoveName in ('horndrill', 'sheercold', 'fissure', 'guillotine'):
+            if AttackerMoveFlags & OHKO:
                 DamageD = 1
             # If no guard exists - turn the two turn invulnerable moves (dig,dive,fly,etc) into two turn vulnerable moves
             if AttackerMoveName in ('fly', 'dive', 'dig', 'bounce', 'shadowforce'):
@@ -641,9 +665,7 @@ class MatchMaker(object):
             BattlerStats[Defender]['hp'])
 
         # reckless
-        if AttackerMoveName in (
-        'takedown', 'doubleedge', 'submission', 'volttackle', 'flareblitz', 'bravebird', 'woodhammer', 'headsmash',
-        'bravebird') and BattlerStats[Attacker]['ability'] == 'reckless':
+        if AttackerMoveFlags & RECOIL and BattlerStats[Attacker]['ability'] == 'reckless':
             DamageD *= 1.2
 
         # static damage moves
@@ -709,30 +731,32 @@ class MatchMaker(object):
                     if BattlerStats[Attacker]['ability'] == 'effectspore':
                         DamageD = ((WonderCount[0] / (WonderCount[0] + WonderCount[1])) ** 2) * 0.1
 
-        if BattlerStats[Defender]['ability'] == 'soundproof' and AttackerMoveName in (
-        'hypervoice', 'bugbuzz', 'snore', 'chatter'):
+        if BattlerStats[Defender]['ability'] == 'soundproof' and AttackerMoveFlags & SOUND:
             DamageD = 0
 
         if DamageD == 1 and BattlerStats[Defender]['item'] == 'focussash':
             DamageD = 0.99
 
         # who am i doing this for?
-        if Attacker < self._NmbBlumons:
+        if Attacker < ctx.NmbBlumons:
             dmg[moveset2] = DamageD
-        if Attacker > self._NmbBlumons - 1:
+        if Attacker > ctx.NmbBlumons - 1:
             dmg[4 + moveset2] = DamageD
         return (dmg)
 
-    def Core_Fight(self, PokemonData):
+    def Core_Fight(self, ctx, PokemonData):
         """
         Arguments:
+                ctx:
+                    AnalysisContext of the analysis in progress
                 PokemonData:
-                    All the data for all pokemon in the match
+                    All the data for all pokemon in the match, may be modified (ditto transforms)
 
         Returns:
                 batper:
                     Value of the individual pokemon, used to calculate balance
         """
+        Battlers = ctx.battlers
         BattlerStats = {}
         CurrentHp = []
         StatBonus = []
@@ -747,890 +771,798 @@ class MatchMaker(object):
             # prevents dividing by 0
             batper.append(10)
             # intial item set up
-            BattlerStats[allmons]['item'] = 'none'
-            if PokemonData[allmons]['item']['name'] is not None:
-                BattlerStats[allmons]['item'] = PokemonData[allmons]['item']['name'].lower().replace(' ', '')
-            BattlerStats[allmons]['ability'] = 'none'
-            if PokemonData[allmons]['ability']['name'] is not None:
-                BattlerStats[allmons]['ability'] = PokemonData[allmons]['ability']['name'].lower().replace(' ', '')
-        CurrentRedMon = self._NmbBlumons
-        error = ''
-        self._badturns = False
-        RedIntimidated = False
-        BluIntimidated = False
+            BattlerStats[allmons]['item'] = Battlers[allmons]['item']
+            BattlerStats[allmons]['ability'] = Battlers[allmons]['ability']
+        CurrentRedMon = ctx.NmbBlumons
         RechargeBlu = False
         RechargeRed = False
-        for blumons in range(0, self._NmbBlumons):
+        for blumons in range(0, ctx.NmbBlumons):
             for redmons in range(CurrentRedMon, len(PokemonData)):
-                DeadMon = False
-                FightTurns = 0
-                # super ditto calc
-                for allmons in (blumons, redmons):
-                    if PokemonData[allmons]['species']['id'] == 132:
-                        if allmons == blumons:
-                            EnemyMon = redmons
-                        else:
-                            EnemyMon = blumons
-                        # figures out stats for all mons in the theoretical match
-                        for tempx in (blumons, redmons):
-                            BattlerStats[tempx]['hp'] = PokemonData[tempx]['stats']['hp']
-                            BattlerStats[tempx]['atk'] = PokemonData[tempx]['stats']['atk'] * self._statmultipliers[
-                                StatBonus[tempx]['atk'] + 6]
-                            BattlerStats[tempx]['def'] = PokemonData[tempx]['stats']['def'] * self._statmultipliers[
-                                StatBonus[tempx]['def'] + 6]
-                            BattlerStats[tempx]['satk'] = PokemonData[tempx]['stats']['spA'] * self._statmultipliers[
-                                StatBonus[tempx]['satk'] + 6]
-                            BattlerStats[tempx]['sdef'] = PokemonData[tempx]['stats']['spD'] * self._statmultipliers[
-                                StatBonus[tempx]['sdef'] + 6]
-                            BattlerStats[tempx]['speed'] = PokemonData[tempx]['stats']['spe'] * self._statmultipliers[
-                                StatBonus[tempx]['speed'] + 6]
-
-                            # "important" abilities that effect stats
-                            if BattlerStats[tempx]['ability'] == 'hugepower':
-                                BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 2)
-                            if BattlerStats[tempx]['ability'] == 'purepower':
-                                BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 2)
-                            if BattlerStats[tempx]['ability'] == 'hustle':
-                                BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 1.25)
-                            if BattlerStats[tempx]['ability'] == 'speedboost':
-                                BattlerStats[tempx]['speed'] = round(BattlerStats[tempx]['speed'] * 1.7)
-                            if BattlerStats[tempx]['ability'] == 'slowstart':
-                                BattlerStats[tempx]['speed'] = round(BattlerStats[tempx]['speed'] * 0.5)
-                                BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 0.5)
-                            if BattlerStats[tempx]['ability'] == 'truant':
-                                BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 0.5)
-                                BattlerStats[tempx]['satk'] = round(BattlerStats[tempx]['satk'] * 0.5)
-                        DittoAttacked = False
-                        if PokemonData[allmons]['stats']['spe'] < PokemonData[EnemyMon]['stats']['spe']:
-                            DittoAttacked = True
-                            dmg = [0, 0, 0, 0, 0, 0, 0, 0]
-                            move = ['', '', '', '', '', '', '', '']
-                            for moveset in range(0, len(PokemonData[EnemyMon]['moves'])):
-                                move[moveset] = PokemonData[EnemyMon]['moves'][moveset]['name'].lower().replace(' ',
-                                                                                                                '').replace(
-                                    '-', '')
-                                dmg = self.DamageDealt(EnemyMon, allmons, moveset, PokemonData, BattlerStats, dmg,
-                                                       CurrentHp[EnemyMon], CurrentHp[allmons])
-                            BestMoveDamage = []
-                            for tempx in range(0, len(PokemonData)):
-                                BestMoveDamage.append(-1)
-                            for moveset in range(0, len(PokemonData[EnemyMon]['moves'])):
-                                if dmg[moveset] > BestMoveDamage[EnemyMon]:
-                                    BestMoveDamage[EnemyMon] = dmg[moveset]
-                            CurrentHp[allmons] -= BestMoveDamage[EnemyMon]
-                        DittoItem = 'none'
-                        if PokemonData[allmons]['item']['name'] is not None:
-                            DittoItem = PokemonData[allmons]['item']['name'].lower().replace(' ', '').replace("'", '')
-                        PokemonData[allmons] = copy.deepcopy(PokemonData[EnemyMon])
-                        PokemonData[allmons]['item']['name'] = DittoItem
-                        PokemonData[allmons]['displayname'] = 'ditto(' + PokemonData[EnemyMon]['displayname'] + ')'
-                        if not DittoAttacked:
-                            dmg = [0, 0, 0, 0, 0, 0, 0, 0]
-                            move = ['', '', '', '', '', '', '', '']
-                            for moveset in range(0, len(PokemonData[EnemyMon]['moves'])):
-                                move[moveset] = PokemonData[EnemyMon]['moves'][moveset]['name'].lower().replace(' ',
-                                                                                                                '').replace(
-                                    '-', '')
-                                dmg = self.DamageDealt(EnemyMon, allmons, moveset, PokemonData, BattlerStats, dmg,
-                                                       CurrentHp[EnemyMon], CurrentHp[allmons])
-                            BestMoveDamage = []
-                            for tempx in range(0, len(PokemonData)):
-                                BestMoveDamage.append(-1)
-                            for moveset in range(0, len(PokemonData[EnemyMon]['moves'])):
-                                if dmg[moveset] > BestMoveDamage[EnemyMon]:
-                                    BestMoveDamage[EnemyMon] = dmg[moveset]
-                            CurrentHp[allmons] -= BestMoveDamage[EnemyMon]
-                # stats up calcs
-                for allmons in (blumons, redmons):
-                    if allmons == blumons:
-                        EnemyMon = redmons
-                    else:
-                        EnemyMon = blumons
-                    for moveset in range(0, len(PokemonData[allmons]['moves'])):
-                        TempType = ['', 'none']
-                        TempType[0] = PokemonData[allmons]['species']['types'][0].lower()
-                        if len(PokemonData[allmons]['species']['types']) == 2:
-                            TempType[1] = PokemonData[allmons]['species']['types'][1].lower()
-                        TempMoveName = PokemonData[allmons]['moves'][moveset]['name'].lower().replace(' ', '').replace(
-                            '-', '')
-                        if TempMoveName in (
-                        'howl', 'meditate', 'sharpen', 'growth', 'nastyplot', 'swordsdance', 'tailglow', 'defensecurl',
-                        'withdraw', 'harden', 'acidarmor', 'barrier', 'irondefense', 'defendorder', 'cosmicpower',
-                        'stockpile', 'amnesia', 'calmmind', 'bulkup', 'dragondance', 'rockpolish', 'agility',
-                        'heartswap') or (TempMoveName == 'curse' and 'ghost' not in TempType):
-                            for tempx in (blumons, redmons):
-                                BattlerStats[tempx]['hp'] = PokemonData[tempx]['stats']['hp']
-                                BattlerStats[tempx]['atk'] = PokemonData[tempx]['stats']['atk'] * self._statmultipliers[
-                                    StatBonus[tempx]['atk'] + 6]
-                                BattlerStats[tempx]['def'] = PokemonData[tempx]['stats']['def'] * self._statmultipliers[
-                                    StatBonus[tempx]['def'] + 6]
-                                BattlerStats[tempx]['satk'] = PokemonData[tempx]['stats']['spA'] * \
-                                                              self._statmultipliers[StatBonus[tempx]['satk'] + 6]
-                                BattlerStats[tempx]['sdef'] = PokemonData[tempx]['stats']['spD'] * \
-                                                              self._statmultipliers[StatBonus[tempx]['sdef'] + 6]
-                                BattlerStats[tempx]['speed'] = PokemonData[tempx]['stats']['spe'] * \
-                                                               self._statmultipliers[StatBonus[tempx]['speed'] + 6]
-
-                                # "important" abilities that effect stats
-                                if BattlerStats[tempx]['ability'] == 'hugepower':
-                                    BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 2)
-                                if BattlerStats[tempx]['ability'] == 'purepower':
-                                    BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 2)
-                                if BattlerStats[tempx]['ability'] == 'hustle':
-                                    BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 1.25)
-                                if BattlerStats[tempx]['ability'] == 'speedboost':
-                                    BattlerStats[tempx]['speed'] = round(BattlerStats[tempx]['speed'] * 1.7)
-                                if BattlerStats[tempx]['ability'] == 'slowstart':
-                                    BattlerStats[tempx]['speed'] = round(BattlerStats[tempx]['speed'] * 0.5)
-                                    BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 0.5)
-                                if BattlerStats[tempx]['ability'] == 'truant':
-                                    BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 0.5)
-                                    BattlerStats[tempx]['satk'] = round(BattlerStats[tempx]['satk'] * 0.5)
-                            dmg = [0, 0, 0, 0, 0, 0, 0, 0, 0]
-                            for i in range(0, len(PokemonData[EnemyMon]['moves'])):
-                                dmg = self.DamageDealt(EnemyMon, allmons, i, PokemonData, BattlerStats, dmg,
-                                                       CurrentHp[EnemyMon], CurrentHp[allmons])
-                            # [Blue move 1, 2, 3, 4, Red move 1, 2, 3, 4]
-                            BestMoveDamage = []
-                            for tempx in range(0, 8):
-                                if dmg[tempx] == 0:
-                                    dmg[tempx] = 0.01
-                            for tempx in range(0, len(PokemonData)):
-                                BestMoveDamage.append(-1)
-                            for i in range(0, len(PokemonData[EnemyMon]['moves'])):
-                                tempx = i
-                                if EnemyMon == redmons:
-                                    tempx = i + 4
-                                if dmg[tempx] > BestMoveDamage[EnemyMon]:
-                                    BestMoveDamage[EnemyMon] = dmg[tempx]
-                            HaveSwagger = False
-                            HaveFlatter = False
-                            for i in range(0, len(PokemonData[allmons]['moves'])):
-                                if PokemonData[allmons]['moves'][i]['name'].lower().replace(' ', '').replace('-',
-                                                                                                             '') == 'swagger':
-                                    HaveSwagger = True
-                                if PokemonData[allmons]['moves'][i]['name'].lower().replace(' ', '').replace('-',
-                                                                                                             '') == 'flatter':
-                                    HaveFlatter = True
-                            if (CurrentHp[allmons] / BestMoveDamage[EnemyMon]) > 4:
-                                if TempMoveName == 'stockpile':  # stockpile
-                                    StatBonus[allmons]['def'] += 1
-                                    StatBonus[allmons]['sdef'] += 1
-                                    if StatBonus[allmons]['def'] > 3:
-                                        StatBonus[allmons]['def'] = 3
-                                    if StatBonus[allmons]['sdef'] > 3:
-                                        StatBonus[allmons]['sdef'] = 3
-                                if TempMoveName == 'heartswap':
-                                    if HaveSwagger:
-                                        StatBonus[allmons]['atk'] += 1
-                                    if HaveFlatter:
-                                        StatBonus[allmons]['satk'] += 1
-                                if TempMoveName in ('howl', 'meditate', 'sharpen'):  # attack stats +1
-                                    StatBonus[allmons]['atk'] += 1
-                                if TempMoveName == 'swordsdance':  # swords dance
-                                    StatBonus[allmons]['atk'] += 2
-                                if TempMoveName == 'growth':  # growth
-                                    StatBonus[allmons]['satk'] += 1
-                                if TempMoveName in ('nastyplot', 'tailglow'):  # attack stats +2
-                                    StatBonus[allmons]['satk'] += 2
-                                if TempMoveName in ('defensecurl', 'withdraw', 'harden'):  # defense +1
-                                    StatBonus[allmons]['def'] += 1
-                                if TempMoveName in ('acidarmor', 'barrier', 'irondefense'):  # defense +2
-                                    StatBonus[allmons]['def'] += 2
-                                if TempMoveName in ('defendorder', 'cosmicpower'):  # Both defenses +1
-                                    StatBonus[allmons]['def'] += 1
-                                    StatBonus[allmons]['sdef'] += 1
-                                if TempMoveName == 'amnesia':  # special defense +2
-                                    StatBonus[allmons]['atk'] += 1
-                                if TempMoveName == 'calmmind':  # calmmind
-                                    StatBonus[allmons]['atk'] += 1
-                                    StatBonus[allmons]['sdef'] += 1
-                                if TempMoveName == 'bulkup':  # bulkup
-                                    StatBonus[allmons]['atk'] += 1
-                                    StatBonus[allmons]['def'] += 1
-                                if TempMoveName == 'dragondance':  # dragon dance
-                                    StatBonus[allmons]['atk'] += 1
-                                    StatBonus[allmons]['speed'] += 1
-                                if TempMoveName in ('rockpolish', 'agility'):  # speed +2
-                                    StatBonus[allmons]['speed'] += 2
-                                if TempMoveName == 'curse' and 'ghost' not in TempType:
-                                    StatBonus[allmons]['atk'] += 1
-                                    StatBonus[allmons]['def'] += 1
-                                    StatBonus[allmons]['speed'] -= 1
-                            for temptext in ('atk', 'def', 'satk', 'sdef', 'speed'):
-                                if StatBonus[allmons][temptext] > 6:
-                                    StatBonus[allmons][temptext] = 6
-                                if StatBonus[allmons][temptext] < -6:
-                                    StatBonus[allmons][temptext] = -6
-                # heal cancer check
-                for allmons in (blumons, redmons):
-                    if allmons == blumons:
-                        EnemyMon = redmons
-                    else:
-                        EnemyMon = blumons
-                    for moveset in range(0, len(PokemonData[allmons]['moves'])):
-                        TempType = ['', 'none']
-                        TempType[0] = PokemonData[allmons]['species']['types'][0].lower()
-                        if len(PokemonData[allmons]['species']['types']) == 2:
-                            TempType[1] = PokemonData[allmons]['species']['types'][1].lower()
-                        TempMoveName = PokemonData[allmons]['moves'][moveset]['name'].lower().replace(' ', '').replace(
-                            '-', '')
-                        if TempMoveName in ('ingrain', 'aquaring'):
-                            for moveset2 in range(0, len(PokemonData[allmons]['moves'])):
-                                if PokemonData[allmons]['moves'][moveset2]['name'].lower().replace(' ', '').replace('-',
-                                                                                                                    '') in (
-                                'detect', 'protect'):
-                                    TempMoveName = 'doubletime'
-                        if TempMoveName == 'rest':
-                            if BattlerStats[allmons]['ability'] == 'hydration':
-                                for moveset2 in range(0, len(PokemonData[allmons]['moves'])):
-                                    if PokemonData[allmons]['moves'][moveset2]['name'].lower().replace(' ', '').replace(
-                                            '-', '') in ('raindance'):
-                                        TempMoveName = 'oprest'
-                            if BattlerStats[allmons]['ability'] == 'shedskin' or BattlerStats[allmons]['item'] in (
-                            'lumberry', 'chestoberry'):
-                                TempMoveName = 'recover'
-                        if TempMoveName in (
-                        'recover', 'morningsun', 'softboiled', 'rest', 'slackoff', 'roost', 'synthesis', 'milkdrink',
-                        'healorder', 'ingrain', 'aquaring', 'moonlight', 'doubletime', 'oprest'):
-                            for tempx in (blumons, redmons):
-                                BattlerStats[tempx]['hp'] = PokemonData[tempx]['stats']['hp']
-                                BattlerStats[tempx]['atk'] = PokemonData[tempx]['stats']['atk'] * self._statmultipliers[
-                                    StatBonus[tempx]['atk'] + 6]
-                                BattlerStats[tempx]['def'] = PokemonData[tempx]['stats']['def'] * self._statmultipliers[
-                                    StatBonus[tempx]['def'] + 6]
-                                BattlerStats[tempx]['satk'] = PokemonData[tempx]['stats']['spA'] * \
-                                                              self._statmultipliers[StatBonus[tempx]['satk'] + 6]
-                                BattlerStats[tempx]['sdef'] = PokemonData[tempx]['stats']['spD'] * \
-                                                              self._statmultipliers[StatBonus[tempx]['sdef'] + 6]
-                                BattlerStats[tempx]['speed'] = PokemonData[tempx]['stats']['spe'] * \
-                                                               self._statmultipliers[StatBonus[tempx]['speed'] + 6]
-
-                                # "important" abilities that effect stats
-                                if BattlerStats[tempx]['ability'] == 'hugepower':
-                                    BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 2)
-                                if BattlerStats[tempx]['ability'] == 'purepower':
-                                    BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 2)
-                                if BattlerStats[tempx]['ability'] == 'hustle':
-                                    BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 1.25)
-                                if BattlerStats[tempx]['ability'] == 'speedboost':
-                                    BattlerStats[tempx]['speed'] = round(BattlerStats[tempx]['speed'] * 1.7)
-                                if BattlerStats[tempx]['ability'] == 'slowstart':
-                                    BattlerStats[tempx]['speed'] = round(BattlerStats[tempx]['speed'] * 0.5)
-                                    BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 0.5)
-                                if BattlerStats[tempx]['ability'] == 'truant':
-                                    BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 0.5)
-                                    BattlerStats[tempx]['satk'] = round(BattlerStats[tempx]['satk'] * 0.5)
-                            dmg = [0, 0, 0, 0, 0, 0, 0, 0, 0]
-                            for i in range(0, len(PokemonData[allmons]['moves'])):
-                                dmg = self.DamageDealt(allmons, EnemyMon, i, PokemonData, BattlerStats, dmg,
-                                                       CurrentHp[allmons], CurrentHp[EnemyMon])
-                            for i in range(0, len(PokemonData[EnemyMon]['moves'])):
-                                dmg = self.DamageDealt(EnemyMon, allmons, i, PokemonData, BattlerStats, dmg,
-                                                       CurrentHp[EnemyMon], CurrentHp[allmons])
-                            BestMoveDamage = []
-                            for tempx in range(0, 8):
-                                if dmg[tempx] == 0:
-                                    dmg[tempx] = 0.01
-                            for tempx in range(0, len(PokemonData)):
-                                BestMoveDamage.append(-1)
-                            # enemy best move
-                            for i in range(0, len(PokemonData[EnemyMon]['moves'])):
-                                tempx = i
-                                if EnemyMon == redmons:
-                                    tempx = i + 4
-                                if dmg[tempx] > BestMoveDamage[EnemyMon]:
-                                    BestMoveDamage[EnemyMon] = dmg[tempx]
-                            for i in range(0, len(PokemonData[EnemyMon]['moves'])):
-                                tempx = i
-                                if EnemyMon == redmons:
-                                    tempx = i + 4
-                                if dmg[tempx] > BestMoveDamage[EnemyMon]:
-                                    BestMoveDamage[EnemyMon] = dmg[tempx]
-                            # simplifies this section
-                            if TempMoveName in (
-                            'recover', 'morningsun', 'softboiled', 'slackoff', 'roost', 'synthesis', 'milkdrink',
-                            'healorder', 'moonlight'):
-                                HealingAmount = 0.51
-                            if TempMoveName in ('ingrain', 'aquaring'):
-                                HealingAmount = 0.07
-                            if TempMoveName == 'rest':
-                                HealingAmount = 0.34
-                            if TempMoveName == 'oprest':
-                                HealingAmount = 0.81
-                            if TempMoveName == 'doubletime':
-                                HealingAmount = 0.13
-                            # Double Healers
-                            for moveset2 in range(0, len(PokemonData[EnemyMon]['moves'])):
-                                NoDamage = False
-                                if PokemonData[EnemyMon]['moves'][moveset2]['name'].lower().replace(' ', '').replace(
-                                        '-', '') in (
-                                'recover', 'morningsun', 'softboiled', 'slackoff', 'roost', 'synthesis', 'milkdrink',
-                                'healorder', 'moonlight'):
-                                    if BestMoveDamage[allmons] < 0.51:
-                                        NoDamage = True
-                                if PokemonData[EnemyMon]['moves'][moveset2]['name'].lower().replace(' ', '').replace(
-                                        '-', '') == 'rest':
-                                    if BestMoveDamage[allmons] < 0.34:
-                                        NoDamage = True
-                                if PokemonData[EnemyMon]['moves'][moveset2]['name'].lower().replace(' ', '').replace(
-                                        '-', '') in ('ingrain', 'aquaring'):
-                                    if BestMoveDamage[allmons] < 0.07:
-                                        NoDamage = True
-                                if NoDamage is True:
-                                    if BestMoveDamage[EnemyMon] < HealingAmount:
-                                        self._matchdict['CancerChecks']['UseMatch'] = False
-                                        self._matchdict['CancerChecks']['HealCancer'] = True
-                                        # healer can't kill enemy non-healer quickly
-                            if CurrentHp[EnemyMon] / BestMoveDamage[allmons] > TurnLimit:
-                                tempx = (BestMoveDamage[EnemyMon] - HealingAmount)
-                                if tempx <= 0:
-                                    tempx = 0.001
-                                # and enemy can't kill healer quickly
-                                if CurrentHp[EnemyMon] / tempx > TurnLimit:
-                                    self._matchdict['CancerChecks']['UseMatch'] = False
-                                    self._matchdict['CancerChecks']['HealCancer'] = True
-                stillAliveIterations = 0
-                while DeadMon is False:
-                    stillAliveIterations += 1
-                    for allmons in range(0, len(PokemonData)):
-                        if allmons < self._NmbBlumons:
-                            EnemyMon = redmons
-                        else:
-                            EnemyMon = blumons
-                        # figures out stats for all mons in the theoretical match
-                        BattlerStats[allmons]['hp'] = PokemonData[allmons]['stats']['hp']
-                        BattlerStats[allmons]['atk'] = PokemonData[allmons]['stats']['atk'] * self._statmultipliers[
-                            StatBonus[allmons]['atk'] + 6]
-                        BattlerStats[allmons]['def'] = PokemonData[allmons]['stats']['def'] * self._statmultipliers[
-                            StatBonus[allmons]['def'] + 6]
-                        BattlerStats[allmons]['satk'] = PokemonData[allmons]['stats']['spA'] * self._statmultipliers[
-                            StatBonus[allmons]['satk'] + 6]
-                        BattlerStats[allmons]['sdef'] = PokemonData[allmons]['stats']['spD'] * self._statmultipliers[
-                            StatBonus[allmons]['sdef'] + 6]
-                        BattlerStats[allmons]['speed'] = PokemonData[allmons]['stats']['spe'] * self._statmultipliers[
-                            StatBonus[allmons]['speed'] + 6]
+                FightKey = None
+                Result = None
+                # a ditto transforms into its enemy during the fight, leave those to Sub_Fight
+                if self.fight_cache is not None and 132 not in (PokemonData[blumons]['species']['id'],
+                                                                PokemonData[redmons]['species']['id']):
+                    FightKey = (ctx.effectiveness,
+                                # the only places Sub_Fight cares about the positions of the fighters
+                                blumons == ctx.NmbBlumons - 1, redmons == len(PokemonData) - 1, blumons == 2,
+                                redmons == 5,
+                                Battlers[blumons]['fingerprint'], BattlerStats[blumons]['ability'],
+                                Battlers[redmons]['fingerprint'], BattlerStats[redmons]['ability'],
+                                CurrentHp[blumons], CurrentHp[redmons],
+                                tuple(StatBonus[blumons].values()), tuple(StatBonus[redmons].values()),
+                                RechargeBlu, RechargeRed)
+                    Result = self.fight_cache.get(FightKey)
+                if Result is None:
+                    batgains = {blumons: [], redmons: []}
+                    Outcome = self.Sub_Fight(ctx, blumons, redmons, PokemonData, BattlerStats, CurrentHp, StatBonus,
+                                             batgains, RechargeBlu, RechargeRed)
+                    Result = (CurrentHp[blumons], CurrentHp[redmons], dict(StatBonus[blumons]),
+                              dict(StatBonus[redmons]), tuple(batgains[blumons]), tuple(batgains[redmons]), Outcome)
+                    if FightKey is not None:
+                        self.fight_cache.put(FightKey, Result)
+                else:
+                    CurrentHp[blumons], CurrentHp[redmons] = Result[0], Result[1]
+                    StatBonus[blumons], StatBonus[redmons] = dict(Result[2]), dict(Result[3])
+                # the value of the fighters depends on the fight only through these increments, added one by one
+                # so the sums come out the same as without the cache
+                for gain in Result[4]:
+                    batper[blumons] += gain
+                for gain in Result[5]:
+                    batper[redmons] += gain
+                FightTurns, bestblui, bestredi, BestBluMove, BestRedMove, HealCancer, RechargeBlu, RechargeRed = \
+                    Result[6]
+                if HealCancer:
+                    ctx.matchdict['CancerChecks']['UseMatch'] = False
+                    ctx.matchdict['CancerChecks']['HealCancer'] = True
+                if CurrentHp[redmons] <= 0:
+                    CurrentRedMon = CurrentRedMon + 1
+                ctx.matchdict['CancerChecks']['MatchTurns'] += FightTurns
+                if FightTurns > ctx.matchdict['CancerChecks']['1v1HighestTurns']:
+                    ctx.matchdict['CancerChecks']['1v1HighestTurns'] = FightTurns
+                if CurrentHp[redmons] <= 0:
+                    ctx.matchdict['Deaths'].append(
+                        ('red', PokemonData[blumons]['displayname'], bestblui, BestBluMove,
+                         PokemonData[redmons]['displayname'], bestredi - 4, BestRedMove, FightTurns, CurrentHp[blumons]))
+                if CurrentHp[blumons] <= 0:
+                    ctx.matchdict['Deaths'].append(
+                        ('blue', PokemonData[redmons]['displayname'], bestredi - 4, BestRedMove,
+                         PokemonData[blumons]['displayname'], bestblui, BestBluMove, FightTurns, CurrentHp[redmons]))
+                # if blue lost, increase the for loop
+                if CurrentHp[blumons] <= 0:
+                    break
+        return (batper)
 
-                        # "important" abilities that effect stats
-                        if BattlerStats[allmons]['ability'] == 'hugepower':
-                            BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 2)
-                        if BattlerStats[allmons]['ability'] == 'purepower':
-                            BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 2)
-                        if BattlerStats[allmons]['ability'] == 'hustle':
-                            BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 1.25)
-                        if BattlerStats[allmons]['ability'] == 'speedboost':
-                            BattlerStats[allmons]['speed'] = round(BattlerStats[allmons]['speed'] * 1.7)
-                        if BattlerStats[allmons]['ability'] == 'slowstart':
-                            BattlerStats[allmons]['speed'] = round(BattlerStats[allmons]['speed'] * 0.5)
-                            BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 0.5)
-                        if BattlerStats[allmons]['ability'] == 'truant':
-                            BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 0.5)
-                            BattlerStats[allmons]['satk'] = round(BattlerStats[allmons]['satk'] * 0.5)
-
-                        # items that effect stats
-                        if BattlerStats[allmons]['item'] == 'ironball':
-                            HasFling = False
-                            for moveset in range(0, len(PokemonData[allmons]['moves'])):
-                                if PokemonData[allmons]['moves'][moveset]['name'].lower().replace(' ', '').replace('-',
-                                                                                                                   '') == 'fling':
-                                    HasFling = True
-                            if not HasFling:
-                                BattlerStats[allmons]['speed'] = round(BattlerStats[allmons]['speed'] * 0.5)
-                        if BattlerStats[allmons]['item'] == 'stickybarb' and BattlerStats[allmons][
-                            'ability'] != 'magicguard':
-                            BattlerStats[allmons]['hp'] = round(BattlerStats[allmons]['hp'] * 0.8)
-
-                        # if klutz, items dont count, cept for iron ball for some reason
-                        if BattlerStats[allmons]['ability'] != 'klutz':
-                            if BattlerStats[allmons]['item'] == 'choiceband':
-                                BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 1.5)
-                            if BattlerStats[allmons]['item'] == 'choicespecs':
-                                BattlerStats[allmons]['satk'] = round(BattlerStats[allmons]['satk'] * 1.5)
-                            if BattlerStats[allmons]['item'] == 'choicescarf':
-                                BattlerStats[allmons]['speed'] = round(BattlerStats[allmons]['speed'] * 1.5)
-                            if BattlerStats[allmons]['item'] in (
-                            'machobrace', 'powerweight', 'powerbracer', 'powerbelt', 'powerlens', 'powerband',
-                            'poweranklet'):
-                                BattlerStats[allmons]['speed'] = round(BattlerStats[allmons]['speed'] * 0.5)
-
-                            # pokemon Specific
-                            if BattlerStats[allmons]['item'] == 'lightball' and PokemonData[allmons]['species'][
-                                'id'] == 25:
-                                BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 2)
-                                BattlerStats[allmons]['satk'] = round(BattlerStats[allmons]['satk'] * 2)
-                            if BattlerStats[allmons]['item'] == 'deepseascale' and PokemonData[allmons]['species'][
-                                'id'] == 366:
-                                BattlerStats[allmons]['sdef'] = round(BattlerStats[allmons]['sdef'] * 2)
-                            if BattlerStats[allmons]['item'] == 'deepseatooth' and PokemonData[allmons]['species'][
-                                'id'] == 366:
-                                BattlerStats[allmons]['satk'] = round(BattlerStats[allmons]['satk'] * 2)
-                            if BattlerStats[allmons]['item'] == 'metalpowder' and PokemonData[allmons]['species'][
-                                'id'] == 132:
-                                BattlerStats[allmons]['def'] = round(BattlerStats[allmons]['def'] * 2)
-                                BattlerStats[allmons]['sdef'] = round(BattlerStats[allmons]['sdef'] * 2)
-                            if BattlerStats[allmons]['item'] == 'quickpowder' and PokemonData[allmons]['species'][
-                                'id'] == 132:
-                                BattlerStats[allmons]['speed'] = round(BattlerStats[allmons]['speed'] * 2)
-                            if BattlerStats[allmons]['item'] == 'thickclub' and PokemonData[allmons]['species'][
-                                'id'] in (104, 105):
-                                BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 2)
-                            if BattlerStats[allmons]['item'] == 'souldew' and PokemonData[allmons]['species']['id'] in (
-                            380, 381):
-                                BattlerStats[allmons]['satk'] = round(BattlerStats[allmons]['satk'] * 2)
-                                BattlerStats[allmons]['sdef'] = round(BattlerStats[allmons]['sdef'] * 2)
-
-                            # Flame orb
-                            FireCheck = False
-                            ItemGone = False
-                            PoisonSteelCheck = False
-                            if PokemonData[allmons]['species']['types'][0].lower() != 'fire':
-                                FireCheck = True
-                            if len(PokemonData[allmons]['species']['types']) == 2:
-                                if PokemonData[allmons]['species']['types'][1].lower() != 'fire':
-                                    FireCheck = True
-                            if PokemonData[allmons]['species']['types'][0].lower() in ('poison', 'steel'):
-                                PoisonSteelCheck = True
-                            if len(PokemonData[allmons]['species']['types']) == 2:
-                                if PokemonData[allmons]['species']['types'][1].lower() in ('poison', 'steel'):
-                                    PoisonSteelCheck = True
-                            for moveset in range(0, len(PokemonData[allmons]['moves'])):
-                                if PokemonData[allmons]['moves'][moveset]['name'] == 'fling' or (
-                                            PokemonData[allmons]['moves'][moveset]['name'] in (
-                                        'trick', 'switcheroo') and BattlerStats[EnemyMon]['ability'] not in (
-                                    'stickyhold', 'multitype') and BattlerStats[EnemyMon]['item'] != 'griseousorb'):
-                                    ItemGone = True
-                            if BattlerStats[allmons]['item'] == 'flameorb' and BattlerStats[allmons][
-                                'ability'] != 'waterveil' and FireCheck is False and ItemGone is False:
-                                if BattlerStats[allmons]['ability'] == 'guts':
-                                    BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 1.5)
-                                else:
-                                    BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 0.5)
-                                if BattlerStats[allmons]['ability'] == 'quickfeet':
-                                    BattlerStats[allmons]['speed'] = round(BattlerStats[allmons]['speed'] * 1.5)
-                                elif BattlerStats[allmons]['ability'] == 'marvelscale':
-                                    BattlerStats[allmons]['def'] = round(BattlerStats[allmons]['def'] * 1.5)
-                            if BattlerStats[allmons][
-                                'item'] == 'toxicorb' and PoisonSteelCheck is False and ItemGone is False:
-                                if BattlerStats[allmons]['ability'] == 'guts':
-                                    BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 1.5)
-                                elif BattlerStats[allmons]['ability'] == 'quickfeet':
-                                    BattlerStats[allmons]['speed'] = round(BattlerStats[allmons]['speed'] * 1.5)
-                                elif BattlerStats[allmons]['ability'] == 'marvelscale':
-                                    BattlerStats[allmons]['def'] = round(BattlerStats[allmons]['def'] * 1.5)
-
-                            # Berries
-                            if BattlerStats[allmons]['item'] == 'oranberry':
-                                BattlerStats[allmons]['hp'] += 10
-                            if BattlerStats[allmons]['item'] == 'sitrusberry':
-                                BattlerStats[allmons]['hp'] = round(BattlerStats[allmons]['hp'] * 1.25)
-                            if BattlerStats[allmons]['item'] == 'figyberry' and PokemonData[allmons]['nature'][
-                                'name'].lower().replace(' ', '') not in ('bold', 'calm', 'modest', 'timid'):
-                                BattlerStats[allmons]['hp'] = round(BattlerStats[allmons]['hp'] * 1.125)
-                            if BattlerStats[allmons]['item'] == 'wikiberry' and PokemonData[allmons]['nature'][
-                                'name'].lower().replace(' ', '') not in ('adamant', 'careful', 'impish', 'jolly'):
-                                BattlerStats[allmons]['hp'] = round(BattlerStats[allmons]['hp'] * 1.125)
-                            if BattlerStats[allmons]['item'] == 'magoberry' and PokemonData[allmons]['nature'][
-                                'name'].lower().replace(' ', '') not in ('brave', 'quiet', 'relaxed', 'sassy'):
-                                BattlerStats[allmons]['hp'] = round(BattlerStats[allmons]['hp'] * 1.125)
-                            if BattlerStats[allmons]['item'] == 'aguavberry' and PokemonData[allmons]['nature'][
-                                'name'].lower().replace(' ', '') not in ('lax', 'naive', 'naughty', 'rash'):
-                                BattlerStats[allmons]['hp'] = round(BattlerStats[allmons]['hp'] * 1.125)
-                            if BattlerStats[allmons]['item'] == 'iapapaberry' and PokemonData[allmons]['nature'][
-                                'name'].lower().replace(' ', '') not in ('lonely', 'hasty', 'mild', 'gentle'):
-                                BattlerStats[allmons]['hp'] = round(BattlerStats[allmons]['hp'] * 1.125)
-
-                    # intimidate
-                    if (BattlerStats[blumons]['ability'] == 'intimidate' and CurrentHp[blumons] == 1 and
-                                BattlerStats[redmons]['ability'] not in (
-                            'clearbody', 'hypercutter', 'whitesmoke')) or RedIntimidated is True:
-                        RedIntimidated = True
-                        BattlerStats[redmons]['atk'] = round(BattlerStats[redmons]['atk'] * 0.66)
-                    if (BattlerStats[redmons]['ability'] == 'intimidate' and CurrentHp[redmons] == 1 and
-                                BattlerStats[blumons]['ability'] not in (
-                            'clearbody', 'hypercutter', 'whitesmoke')) or BluIntimidated is True:
-                        BluIntimidated = True
-                        BattlerStats[blumons]['atk'] = round(BattlerStats[blumons]['atk'] * 0.66)
-
-                    # used for charging attacks [Blue move 1, 2, 3, 4, Red move 1, 2, 3, 4]
+    def Sub_Fight(self, ctx, blumons, redmons, PokemonData, BattlerStats, CurrentHp, StatBonus, batgains, RechargeBlu,
+                  RechargeRed):
+        """
+        Fights one blue pokemon against one red pokemon until one of them dies
+
+        Arguments:
+                ctx:
+                    AnalysisContext of the analysis in progress
+                blumons:
+                    Position of the blue pokemon in PokemonData
+                redmons:
+                    Position of the red pokemon in PokemonData
+                PokemonData:
+                    All the data for all pokemon in the match, may be modified (ditto transforms)
+                BattlerStats:
+                    Stats for all pokemon in the match AFTER they go through abilities
+                CurrentHp:
+                    HP of all pokemon, float, 0-1, updated in place
+                StatBonus:
+                    stat stages of all pokemon, updated in place
+                batgains:
+                    dict of blumons and redmons to a list the increments of their value are appended to, in order
+                RechargeBlu, RechargeRed:
+                    whether blue/red still has to recharge from an earlier fight
+
+        Returns:
+                (FightTurns, bestblui, bestredi, name of the best blue move, name of the best red move,
+                 HealCancer, RechargeBlu, RechargeRed)
+        """
+        RedIntimidated = False
+        BluIntimidated = False
+        HealCancer = False
+        Battlers = ctx.battlers
+        DeadMon = False
+        FightTurns = 0
+        # super ditto calc
+        for allmons in (blumons, redmons):
+            if PokemonData[allmons]['species']['id'] == 132:
+                if allmons == blumons:
+                    EnemyMon = redmons
+                else:
+                    EnemyMon = blumons
+                # figures out stats for all mons in the theoretical match
+                for tempx in (blumons, redmons):
+                    BattlerStats[tempx]['hp'] = PokemonData[tempx]['stats']['hp']
+                    BattlerStats[tempx]['atk'] = PokemonData[tempx]['stats']['atk'] * self._statmultipliers[
+                        StatBonus[tempx]['atk'] + 6]
+                    BattlerStats[tempx]['def'] = PokemonData[tempx]['stats']['def'] * self._statmultipliers[
+                        StatBonus[tempx]['def'] + 6]
+                    BattlerStats[tempx]['satk'] = PokemonData[tempx]['stats']['spA'] * self._statmultipliers[
+                        StatBonus[tempx]['satk'] + 6]
+                    BattlerStats[tempx]['sdef'] = PokemonData[tempx]['stats']['spD'] * self._statmultipliers[
+                        StatBonus[tempx]['sdef'] + 6]
+                    BattlerStats[tempx]['speed'] = PokemonData[tempx]['stats']['spe'] * self._statmultipliers[
+                        StatBonus[tempx]['speed'] + 6]
+
+                    # "important" abilities that effect stats
+                    if BattlerStats[tempx]['ability'] == 'hugepower':
+                        BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 2)
+                    if BattlerStats[tempx]['ability'] == 'purepower':
+                        BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 2)
+                    if BattlerStats[tempx]['ability'] == 'hustle':
+                        BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 1.25)
+                    if BattlerStats[tempx]['ability'] == 'speedboost':
+                        BattlerStats[tempx]['speed'] = round(BattlerStats[tempx]['speed'] * 1.7)
+                    if BattlerStats[tempx]['ability'] == 'slowstart':
+                        BattlerStats[tempx]['speed'] = round(BattlerStats[tempx]['speed'] * 0.5)
+                        BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 0.5)
+                    if BattlerStats[tempx]['ability'] == 'truant':
+                        BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 0.5)
+                        BattlerStats[tempx]['satk'] = round(BattlerStats[tempx]['satk'] * 0.5)
+                DittoAttacked = False
+                if PokemonData[allmons]['stats']['spe'] < PokemonData[EnemyMon]['stats']['spe']:
+                    DittoAttacked = True
+                    dmg = [0, 0, 0, 0, 0, 0, 0, 0]
+                    move = ['', '', '', '', '', '', '', '']
+                    for moveset in range(0, len(PokemonData[EnemyMon]['moves'])):
+                        move[moveset] = Battlers[EnemyMon]['moves'][moveset]['key']
+                        dmg = self.DamageDealt(ctx, EnemyMon, allmons, moveset, PokemonData, BattlerStats, dmg,
+                                               CurrentHp[EnemyMon], CurrentHp[allmons])
+                    BestMoveDamage = []
+                    for tempx in range(0, len(PokemonData)):
+                        BestMoveDamage.append(-1)
+                    for moveset in range(0, len(PokemonData[EnemyMon]['moves'])):
+                        if dmg[moveset] > BestMoveDamage[EnemyMon]:
+                            BestMoveDamage[EnemyMon] = dmg[moveset]
+                    CurrentHp[allmons] -= BestMoveDamage[EnemyMon]
+                DittoItem = Battlers[allmons]['item']
+                # transform into a shallow copy, the enemy's nested data is only ever read
+                PokemonData[allmons] = dict(PokemonData[EnemyMon],
+                                            item=dict(PokemonData[EnemyMon]['item'], name=DittoItem),
+                                            displayname='ditto(' + PokemonData[EnemyMon]['displayname'] + ')')
+                Battlers[allmons] = make_battler(PokemonData[allmons])
+                if not DittoAttacked:
                     dmg = [0, 0, 0, 0, 0, 0, 0, 0]
                     move = ['', '', '', '', '', '', '', '']
-                    for moveset in range(0, len(PokemonData[blumons]['moves'])):
-                        move[moveset] = PokemonData[blumons]['moves'][moveset]['name'].lower().replace(' ', '').replace(
-                            '-', '')
-                        dmg = self.DamageDealt(blumons, redmons, moveset, PokemonData, BattlerStats, dmg,
-                                               CurrentHp[blumons], CurrentHp[redmons])
-
-                    for moveset in range(0, len(PokemonData[redmons]['moves'])):
-                        move[moveset + 4] = PokemonData[redmons]['moves'][moveset]['name'].lower().replace(' ',
-                                                                                                           '').replace(
-                            '-', '')
-                        dmg = self.DamageDealt(redmons, blumons, moveset, PokemonData, BattlerStats, dmg,
-                                               CurrentHp[redmons], CurrentHp[blumons])
+                    for moveset in range(0, len(PokemonData[EnemyMon]['moves'])):
+                        move[moveset] = Battlers[EnemyMon]['moves'][moveset]['key']
+                        dmg = self.DamageDealt(ctx, EnemyMon, allmons, moveset, PokemonData, BattlerStats, dmg,
+                                               CurrentHp[EnemyMon], CurrentHp[allmons])
+                    BestMoveDamage = []
+                    for tempx in range(0, len(PokemonData)):
+                        BestMoveDamage.append(-1)
+                    for moveset in range(0, len(PokemonData[EnemyMon]['moves'])):
+                        if dmg[moveset] > BestMoveDamage[EnemyMon]:
+                            BestMoveDamage[EnemyMon] = dmg[moveset]
+                    CurrentHp[allmons] -= BestMoveDamage[EnemyMon]
+        # stats up calcs
+        for allmons in (blumons, redmons):
+            if allmons == blumons:
+                EnemyMon = redmons
+            else:
+                EnemyMon = blumons
+            for moveset in range(0, len(PokemonData[allmons]['moves'])):
+                TempType = Battlers[allmons]['types']
+                TempMoveName = Battlers[allmons]['moves'][moveset]['key']
+                TempMoveInfo = Battlers[allmons]['moves'][moveset]['info']
+                if TempMoveInfo.flags & STAT_BOOST and not (
+                        TempMoveInfo.flags & NOT_FOR_GHOSTS and 'ghost' in TempType):
+                    for tempx in (blumons, redmons):
+                        BattlerStats[tempx]['hp'] = PokemonData[tempx]['stats']['hp']
+                        BattlerStats[tempx]['atk'] = PokemonData[tempx]['stats']['atk'] * self._statmultipliers[
+                            StatBonus[tempx]['atk'] + 6]
+                        BattlerStats[tempx]['def'] = PokemonData[tempx]['stats']['def'] * self._statmultipliers[
+                            StatBonus[tempx]['def'] + 6]
+                        BattlerStats[tempx]['satk'] = PokemonData[tempx]['stats']['spA'] * \
+                                                      self._statmultipliers[StatBonus[tempx]['satk'] + 6]
+                        BattlerStats[tempx]['sdef'] = PokemonData[tempx]['stats']['spD'] * \
+                                                      self._statmultipliers[StatBonus[tempx]['sdef'] + 6]
+                        BattlerStats[tempx]['speed'] = PokemonData[tempx]['stats']['spe'] * \
+                                                       self._statmultipliers[StatBonus[tempx]['speed'] + 6]
+
+                        # "important" abilities that effect stats
+                        if BattlerStats[tempx]['ability'] == 'hugepower':
+                            BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 2)
+                        if BattlerStats[tempx]['ability'] == 'purepower':
+                            BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 2)
+                        if BattlerStats[tempx]['ability'] == 'hustle':
+                            BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 1.25)
+                        if BattlerStats[tempx]['ability'] == 'speedboost':
+                            BattlerStats[tempx]['speed'] = round(BattlerStats[tempx]['speed'] * 1.7)
+                        if BattlerStats[tempx]['ability'] == 'slowstart':
+                            BattlerStats[tempx]['speed'] = round(BattlerStats[tempx]['speed'] * 0.5)
+                            BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 0.5)
+                        if BattlerStats[tempx]['ability'] == 'truant':
+                            BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 0.5)
+                            BattlerStats[tempx]['satk'] = round(BattlerStats[tempx]['satk'] * 0.5)
+                    dmg = [0, 0, 0, 0, 0, 0, 0, 0, 0]
+                    for i in range(0, len(PokemonData[EnemyMon]['moves'])):
+                        dmg = self.DamageDealt(ctx, EnemyMon, allmons, i, PokemonData, BattlerStats, dmg,
+                                               CurrentHp[EnemyMon], CurrentHp[allmons])
                     # [Blue move 1, 2, 3, 4, Red move 1, 2, 3, 4]
                     BestMoveDamage = []
-                    for allmons in range(len(PokemonData)):
+                    for tempx in range(0, 8):
+                        if dmg[tempx] == 0:
+                            dmg[tempx] = 0.01
+                    for tempx in range(0, len(PokemonData)):
                         BestMoveDamage.append(-1)
-                    bestblui = 0
-                    bestredi = 0
-                    for moveset in range(0, len(PokemonData[blumons]['moves'])):
-                        if dmg[moveset] > BestMoveDamage[blumons]:
-                            BestMoveDamage[blumons] = dmg[moveset]
-                            bestblui = moveset
-                            move[moveset] = PokemonData[blumons]['moves'][moveset]['name'].lower().replace(' ',
-                                                                                                           '').replace(
-                                '-', '')
-                    for moveset in range(0, len(PokemonData[redmons]['moves'])):
-                        if dmg[4 + moveset] > BestMoveDamage[redmons]:
-                            BestMoveDamage[redmons] = dmg[4 + moveset]
-                            bestredi = 4 + moveset
-                            move[4 + moveset] = PokemonData[redmons]['moves'][moveset]['name'].lower().replace(' ',
-                                                                                                               '').replace(
-                                '-', '')
-
-                    # if any move deals more than 100% damage, make it deal only 100%
-                    if redmons != 5:
-                        if BestMoveDamage[blumons] > 1:
-                            BestMoveDamage[blumons] = 1
-                        if BestMoveDamage[blumons] > CurrentHp[redmons]:
-                            BestMoveDamage[blumons] = CurrentHp[redmons] + (
-                            (BestMoveDamage[blumons] - CurrentHp[redmons]) / 2)
-                    if blumons != 2:
-                        if BestMoveDamage[redmons] > 1:
-                            BestMoveDamage[redmons] = 1
-                        if BestMoveDamage[redmons] > CurrentHp[blumons]:
-                            BestMoveDamage[redmons] = CurrentHp[blumons] + (
-                            (BestMoveDamage[redmons] - CurrentHp[blumons]) / 2)
-
-                    # if a pokemon would be killed before they could use a charging move, use a different move, foo
-                    if move[bestblui] in (
-                    'hyperbeam', 'gigaimpact', 'rockwrecker', 'blastburn', 'hydrocannon', 'frenzyplant', 'roaroftime',
-                    'skullbash', 'skyattack', 'razorwind', 'solarbeam'):
-                        if BattlerStats[blumons]['speed'] > BattlerStats[redmons]['speed'] and BestMoveDamage[
-                            redmons] == 1:
-                            BestMoveDamage[blumons] = 0
-                            tempx = bestblui
-                            for moveset in range(0, 4):
-                                if dmg[moveset] > BestMoveDamage[blumons] and moveset != tempx:
-                                    BestMoveDamage[blumons] = dmg[moveset]
-                                    bestblui = moveset
-                        if BattlerStats[blumons]['speed'] <= BattlerStats[redmons]['speed'] and BestMoveDamage[
-                            redmons] >= 0.5:
-                            BestMoveDamage[blumons] = 0
-                            tempx = bestblui
-                            for moveset in range(0, 4):
-                                if dmg[moveset] > BestMoveDamage[blumons] and moveset != tempx:
-                                    BestMoveDamage[blumons] = dmg[moveset]
-                                    bestblui = moveset
-
-                    if move[bestredi] in (
-                    'hyperbeam', 'gigaimpact', 'rockwrecker', 'blastburn', 'hydrocannon', 'frenzyplant', 'roaroftime',
-                    'skullbash', 'skyattack', 'razorwind', 'solarbeam'):
-                        if BattlerStats[blumons]['speed'] < BattlerStats[redmons]['speed'] and BestMoveDamage[
-                            blumons] == 1:
-                            BestMoveDamage[redmons] = 0
-                            tempx = bestredi
-                            for moveset in range(0, 4):
-                                if dmg[4 + moveset] > BestMoveDamage[redmons] and moveset != tempx:
-                                    BestMoveDamage[redmons] = dmg[4 + moveset]
-                                    bestredi = 4 + moveset
-                        if BattlerStats[blumons]['speed'] >= BattlerStats[redmons]['speed'] and BestMoveDamage[
-                            blumons] >= 0.5:
-                            BestMoveDamage[redmons] = 0
-                            tempx = bestredi
-                            for moveset in range(0, 4):
-                                if dmg[4 + moveset] > BestMoveDamage[redmons] and moveset != tempx:
-                                    BestMoveDamage[redmons] = dmg[4 + moveset]
-                                    bestredi = 4 + moveset
-
-                    # Damage corrections
-                    TwoTurnCheck = 1
-
-                    # recharge turn moves (predamage)
-                    if move[bestblui] in (
-                    'hyperbeam', 'gigaimpact', 'rockwrecker', 'blastburn', 'hydrocannon', 'frenzyplant', 'roaroftime'):
-                        BestMoveDamage[blumons] /= 0.59
-                        TwoTurnCheck = 2
-                    elif RechargeBlu:
-                        RechargeBlu = False
-                        BestMoveDamage[blumons]
-                    if move[bestredi] in (
-                    'hyperbeam', 'gigaimpact', 'rockwrecker', 'blastburn', 'hydrocannon', 'frenzyplant', 'roaroftime'):
-                        BestMoveDamage[redmons] /= 0.59
-                        TwoTurnCheck = 2
-                        RechargeBlu = True
-                        RechargeRed = True
-                    elif RechargeRed:
-                        RechargeRed = False
-                        BestMoveDamage[redmons]
-
-                    # Charging turn moves
-                    if move[bestblui] in ('skullbash', 'skyattack', 'razorwind', 'solarbeam'):
-                        BestMoveDamage[blumons] *= 2
-                        CurrentHp[blumons] = CurrentHp[blumons] - BestMoveDamage[redmons]
-                        batper[redmons] = batper[redmons] + BestMoveDamage[redmons] * 100
-                        TwoTurnCheck = 2
-                    if move[bestredi] in ('skullbash', 'skyattack', 'razorwind', 'solarbeam'):
-                        BestMoveDamage[redmons] *= 2
-                        CurrentHp[redmons] = CurrentHp[redmons] - BestMoveDamage[blumons]
-                        batper[blumons] = batper[blumons] + BestMoveDamage[blumons] * 100
-                        TwoTurnCheck = 2
-
-                        # recoil moves
-                    if move[bestblui] in (
-                    'takedown', 'doubleedge', 'submission', 'volttackle', 'flareblitz', 'bravebird', 'woodhammer',
-                    'headsmash') and BattlerStats[blumons]['ability'] != 'rockhead':
-                        BestMoveDamage[blumons] *= 1.2
-                    if move[bestredi] in (
-                    'takedown', 'doubleedge', 'submission', 'volttackle', 'flareblitz', 'bravebird', 'woodhammer',
-                    'headsmash') and BattlerStats[redmons]['ability'] != 'rockhead':
-                        BestMoveDamage[redmons] *= 1.2
-
-                    if BattlerStats[blumons]['item'] in ('laggingtail', 'fullincense'):
-                        BattlerStats[blumons]['speed'] = BattlerStats[blumons]['speed'] / 100
-                    if BattlerStats[redmons]['item'] in ('laggingtail', 'fullincense'):
-                        BattlerStats[redmons]['speed'] = BattlerStats[redmons]['speed'] / 100
-
-                    # code to figure out who wins in ideal conditions, blue faster
-                    if BattlerStats[blumons]['speed'] > BattlerStats[redmons]['speed'] or (
-                            BattlerStats[blumons]['item'] == 'quickclaw' and CurrentHp[blumons] == 1):
-                        if CurrentHp[blumons] > 0:
-                            CurrentHp[redmons] = CurrentHp[redmons] - BestMoveDamage[blumons]
-                            batper[blumons] = batper[blumons] + BestMoveDamage[blumons] * 100
-                        if CurrentHp[redmons] > 0:
-                            CurrentHp[blumons] = CurrentHp[blumons] - BestMoveDamage[redmons]
-                            batper[redmons] = batper[redmons] + BestMoveDamage[redmons] * 100
-                    # same as above, just red is faster, and attacks first
-                    if BattlerStats[blumons]['speed'] < BattlerStats[redmons]['speed'] or (
-                            BattlerStats[redmons]['item'] == 'quickclaw' and CurrentHp[redmons] == 1):
-                        if CurrentHp[redmons] > 0:
-                            CurrentHp[blumons] = CurrentHp[blumons] - BestMoveDamage[redmons]
-                            batper[redmons] = batper[redmons] + BestMoveDamage[redmons] * 100
-                        if CurrentHp[blumons] > 0:
-                            CurrentHp[redmons] = CurrentHp[redmons] - BestMoveDamage[blumons]
-                            batper[blumons] = batper[blumons] + BestMoveDamage[blumons] * 100
-                    # Speed tie
-                    if BattlerStats[blumons]['speed'] == BattlerStats[redmons]['speed']:
-                        CurrentHp[blumons] = CurrentHp[blumons] - BestMoveDamage[redmons]
-                        CurrentHp[redmons] = CurrentHp[redmons] - BestMoveDamage[blumons]
-                        batper[blumons] = batper[blumons] + BestMoveDamage[blumons] * 100
-                        batper[redmons] = batper[redmons] + BestMoveDamage[redmons] * 100
-
-                    if move[bestblui] not in ('horndrill', 'sheercold', 'fissure', 'guillotine') and move[
-                        bestredi] not in ('horndrill', 'sheercold', 'fissure', 'guillotine'):
-                        FightTurns += 1
-
-                        # End of turn
-                    for allmons in (blumons, redmons):
-                        if allmons < self._NmbBlumons:
-                            EnemyMon = redmons
-                            BestTemp = bestblui
-                        else:
-                            BestTemp = bestredi - 4
-                            EnemyMon = blumons
-                        # item factor checks
-                        PoisonSteelCheck = False
-                        PoisonCheck = False
+                    for i in range(0, len(PokemonData[EnemyMon]['moves'])):
+                        tempx = i
+                        if EnemyMon == redmons:
+                            tempx = i + 4
+                        if dmg[tempx] > BestMoveDamage[EnemyMon]:
+                            BestMoveDamage[EnemyMon] = dmg[tempx]
+                    HaveSwagger = False
+                    HaveFlatter = False
+                    for i in range(0, len(PokemonData[allmons]['moves'])):
+                        if Battlers[allmons]['moves'][i]['key'] == 'swagger':
+                            HaveSwagger = True
+                        if Battlers[allmons]['moves'][i]['key'] == 'flatter':
+                            HaveFlatter = True
+                    if (CurrentHp[allmons] / BestMoveDamage[EnemyMon]) > 4:
+                        for temptext, tempx in TempMoveInfo.stages:
+                            StatBonus[allmons][temptext] += tempx
+                            if TempMoveInfo.stage_cap is not None and StatBonus[allmons][temptext] > \
+                                    TempMoveInfo.stage_cap:
+                                StatBonus[allmons][temptext] = TempMoveInfo.stage_cap
+                        if TempMoveName == 'heartswap':
+                            if HaveSwagger:
+                                StatBonus[allmons]['atk'] += 1
+                            if HaveFlatter:
+                                StatBonus[allmons]['satk'] += 1
+                    for temptext in ('atk', 'def', 'satk', 'sdef', 'speed'):
+                        if StatBonus[allmons][temptext] > 6:
+                            StatBonus[allmons][temptext] = 6
+                        if StatBonus[allmons][temptext] < -6:
+                            StatBonus[allmons][temptext] = -6
+        # heal cancer check
+        for allmons in (blumons, redmons):
+            if allmons == blumons:
+                EnemyMon = redmons
+            else:
+                EnemyMon = blumons
+            for moveset in range(0, len(PokemonData[allmons]['moves'])):
+                TempType = Battlers[allmons]['types']
+                TempMoveName = Battlers[allmons]['moves'][moveset]['key']
+                if TempMoveName in ('ingrain', 'aquaring'):
+                    for moveset2 in range(0, len(PokemonData[allmons]['moves'])):
+                        if Battlers[allmons]['moves'][moveset2]['key'] in ('detect', 'protect'):
+                            TempMoveName = 'doubletime'
+                if TempMoveName == 'rest':
+                    if BattlerStats[allmons]['ability'] == 'hydration':
+                        for moveset2 in range(0, len(PokemonData[allmons]['moves'])):
+                            if Battlers[allmons]['moves'][moveset2]['key'] in ('raindance'):
+                                TempMoveName = 'oprest'
+                    if BattlerStats[allmons]['ability'] == 'shedskin' or BattlerStats[allmons]['item'] in (
+                    'lumberry', 'chestoberry'):
+                        TempMoveName = 'recover'
+                TempMoveInfo = move_info(TempMoveName)
+                if TempMoveInfo.flags & HEAL:
+                    for tempx in (blumons, redmons):
+                        BattlerStats[tempx]['hp'] = PokemonData[tempx]['stats']['hp']
+                        BattlerStats[tempx]['atk'] = PokemonData[tempx]['stats']['atk'] * self._statmultipliers[
+                            StatBonus[tempx]['atk'] + 6]
+                        BattlerStats[tempx]['def'] = PokemonData[tempx]['stats']['def'] * self._statmultipliers[
+                            StatBonus[tempx]['def'] + 6]
+                        BattlerStats[tempx]['satk'] = PokemonData[tempx]['stats']['spA'] * \
+                                                      self._statmultipliers[StatBonus[tempx]['satk'] + 6]
+                        BattlerStats[tempx]['sdef'] = PokemonData[tempx]['stats']['spD'] * \
+                                                      self._statmultipliers[StatBonus[tempx]['sdef'] + 6]
+                        BattlerStats[tempx]['speed'] = PokemonData[tempx]['stats']['spe'] * \
+                                                       self._statmultipliers[StatBonus[tempx]['speed'] + 6]
+
+                        # "important" abilities that effect stats
+                        if BattlerStats[tempx]['ability'] == 'hugepower':
+                            BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 2)
+                        if BattlerStats[tempx]['ability'] == 'purepower':
+                            BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 2)
+                        if BattlerStats[tempx]['ability'] == 'hustle':
+                            BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 1.25)
+                        if BattlerStats[tempx]['ability'] == 'speedboost':
+                            BattlerStats[tempx]['speed'] = round(BattlerStats[tempx]['speed'] * 1.7)
+                        if BattlerStats[tempx]['ability'] == 'slowstart':
+                            BattlerStats[tempx]['speed'] = round(BattlerStats[tempx]['speed'] * 0.5)
+                            BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 0.5)
+                        if BattlerStats[tempx]['ability'] == 'truant':
+                            BattlerStats[tempx]['atk'] = round(BattlerStats[tempx]['atk'] * 0.5)
+                            BattlerStats[tempx]['satk'] = round(BattlerStats[tempx]['satk'] * 0.5)
+                    dmg = [0, 0, 0, 0, 0, 0, 0, 0, 0]
+                    for i in range(0, len(PokemonData[allmons]['moves'])):
+                        dmg = self.DamageDealt(ctx, allmons, EnemyMon, i, PokemonData, BattlerStats, dmg,
+                                               CurrentHp[allmons], CurrentHp[EnemyMon])
+                    for i in range(0, len(PokemonData[EnemyMon]['moves'])):
+                        dmg = self.DamageDealt(ctx, EnemyMon, allmons, i, PokemonData, BattlerStats, dmg,
+                                               CurrentHp[EnemyMon], CurrentHp[allmons])
+                    BestMoveDamage = []
+                    for tempx in range(0, 8):
+                        if dmg[tempx] == 0:
+                            dmg[tempx] = 0.01
+                    for tempx in range(0, len(PokemonData)):
+                        BestMoveDamage.append(-1)
+                    # enemy best move
+                    for i in range(0, len(PokemonData[EnemyMon]['moves'])):
+                        tempx = i
+                        if EnemyMon == redmons:
+                            tempx = i + 4
+                        if dmg[tempx] > BestMoveDamage[EnemyMon]:
+                            BestMoveDamage[EnemyMon] = dmg[tempx]
+                    for i in range(0, len(PokemonData[EnemyMon]['moves'])):
+                        tempx = i
+                        if EnemyMon == redmons:
+                            tempx = i + 4
+                        if dmg[tempx] > BestMoveDamage[EnemyMon]:
+                            BestMoveDamage[EnemyMon] = dmg[tempx]
+                    HealingAmount = TempMoveInfo.heal
+                    # Double Healers
+                    for moveset2 in range(0, len(PokemonData[EnemyMon]['moves'])):
+                        NoDamage = False
+                        EnemyMoveInfo = Battlers[EnemyMon]['moves'][moveset2]['info']
+                        if EnemyMoveInfo.flags & HEAL and BestMoveDamage[allmons] < EnemyMoveInfo.heal:
+                            NoDamage = True
+                        if NoDamage is True:
+                            if BestMoveDamage[EnemyMon] < HealingAmount:
+                                HealCancer = True
+                                # healer can't kill enemy non-healer quickly
+                    if CurrentHp[EnemyMon] / BestMoveDamage[allmons] > TurnLimit:
+                        tempx = (BestMoveDamage[EnemyMon] - HealingAmount)
+                        if tempx <= 0:
+                            tempx = 0.001
+                        # and enemy can't kill healer quickly
+                        if CurrentHp[EnemyMon] / tempx > TurnLimit:
+                            HealCancer = True
+        # Nothing in the turn loop changes stat stages, items or abilities, so every turn has the stats of the
+        # first one (for the other mons too, they are only recalculated once). The moves only deal different
+        # damage once intimidate kicks in or, for HP based moves, after HP changed, until then the damage of
+        # the last turn is reused.
+        SteadyStats = None
+        DamageKey = None
+        HpDependent = False
+        for allmons in (blumons, redmons):
+            for moveset in range(0, len(PokemonData[allmons]['moves'])):
+                if Battlers[allmons]['moves'][moveset]['info'].flags & HP_BASED:
+                    HpDependent = True
+        stillAliveIterations = 0
+        while DeadMon is False:
+            stillAliveIterations += 1
+            if SteadyStats is None:
+                for allmons in range(0, len(PokemonData)):
+                    if allmons < ctx.NmbBlumons:
+                        EnemyMon = redmons
+                    else:
+                        EnemyMon = blumons
+                    # figures out stats for all mons in the theoretical match
+                    BattlerStats[allmons]['hp'] = PokemonData[allmons]['stats']['hp']
+                    BattlerStats[allmons]['atk'] = PokemonData[allmons]['stats']['atk'] * self._statmultipliers[
+                        StatBonus[allmons]['atk'] + 6]
+                    BattlerStats[allmons]['def'] = PokemonData[allmons]['stats']['def'] * self._statmultipliers[
+                        StatBonus[allmons]['def'] + 6]
+                    BattlerStats[allmons]['satk'] = PokemonData[allmons]['stats']['spA'] * self._statmultipliers[
+                        StatBonus[allmons]['satk'] + 6]
+                    BattlerStats[allmons]['sdef'] = PokemonData[allmons]['stats']['spD'] * self._statmultipliers[
+                        StatBonus[allmons]['sdef'] + 6]
+                    BattlerStats[allmons]['speed'] = PokemonData[allmons]['stats']['spe'] * self._statmultipliers[
+                        StatBonus[allmons]['speed'] + 6]
+
+                    # "important" abilities that effect stats
+                    if BattlerStats[allmons]['ability'] == 'hugepower':
+                        BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 2)
+                    if BattlerStats[allmons]['ability'] == 'purepower':
+                        BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 2)
+                    if BattlerStats[allmons]['ability'] == 'hustle':
+                        BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 1.25)
+                    if BattlerStats[allmons]['ability'] == 'speedboost':
+                        BattlerStats[allmons]['speed'] = round(BattlerStats[allmons]['speed'] * 1.7)
+                    if BattlerStats[allmons]['ability'] == 'slowstart':
+                        BattlerStats[allmons]['speed'] = round(BattlerStats[allmons]['speed'] * 0.5)
+                        BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 0.5)
+                    if BattlerStats[allmons]['ability'] == 'truant':
+                        BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 0.5)
+                        BattlerStats[allmons]['satk'] = round(BattlerStats[allmons]['satk'] * 0.5)
+
+                    # items that effect stats
+                    if BattlerStats[allmons]['item'] == 'ironball':
+                        HasFling = False
+                        for moveset in range(0, len(PokemonData[allmons]['moves'])):
+                            if Battlers[allmons]['moves'][moveset]['key'] == 'fling':
+                                HasFling = True
+                        if not HasFling:
+                            BattlerStats[allmons]['speed'] = round(BattlerStats[allmons]['speed'] * 0.5)
+                    if BattlerStats[allmons]['item'] == 'stickybarb' and BattlerStats[allmons][
+                        'ability'] != 'magicguard':
+                        BattlerStats[allmons]['hp'] = round(BattlerStats[allmons]['hp'] * 0.8)
+
+                    # if klutz, items dont count, cept for iron ball for some reason
+                    if BattlerStats[allmons]['ability'] != 'klutz':
+                        if BattlerStats[allmons]['item'] == 'choiceband':
+                            BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 1.5)
+                        if BattlerStats[allmons]['item'] == 'choicespecs':
+                            BattlerStats[allmons]['satk'] = round(BattlerStats[allmons]['satk'] * 1.5)
+                        if BattlerStats[allmons]['item'] == 'choicescarf':
+                            BattlerStats[allmons]['speed'] = round(BattlerStats[allmons]['speed'] * 1.5)
+                        if BattlerStats[allmons]['item'] in (
+                        'machobrace', 'powerweight', 'powerbracer', 'powerbelt', 'powerlens', 'powerband',
+                        'poweranklet'):
+                            BattlerStats[allmons]['speed'] = round(BattlerStats[allmons]['speed'] * 0.5)
+
+                        # pokemon Specific
+                        if BattlerStats[allmons]['item'] == 'lightball' and PokemonData[allmons]['species'][
+                            'id'] == 25:
+                            BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 2)
+                            BattlerStats[allmons]['satk'] = round(BattlerStats[allmons]['satk'] * 2)
+                        if BattlerStats[allmons]['item'] == 'deepseascale' and PokemonData[allmons]['species'][
+                            'id'] == 366:
+                            BattlerStats[allmons]['sdef'] = round(BattlerStats[allmons]['sdef'] * 2)
+                        if BattlerStats[allmons]['item'] == 'deepseatooth' and PokemonData[allmons]['species'][
+                            'id'] == 366:
+                            BattlerStats[allmons]['satk'] = round(BattlerStats[allmons]['satk'] * 2)
+                        if BattlerStats[allmons]['item'] == 'metalpowder' and PokemonData[allmons]['species'][
+                            'id'] == 132:
+                            BattlerStats[allmons]['def'] = round(BattlerStats[allmons]['def'] * 2)
+                            BattlerStats[allmons]['sdef'] = round(BattlerStats[allmons]['sdef'] * 2)
+                        if BattlerStats[allmons]['item'] == 'quickpowder' and PokemonData[allmons]['species'][
+                            'id'] == 132:
+                            BattlerStats[allmons]['speed'] = round(BattlerStats[allmons]['speed'] * 2)
+                        if BattlerStats[allmons]['item'] == 'thickclub' and PokemonData[allmons]['species'][
+                            'id'] in (104, 105):
+                            BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 2)
+                        if BattlerStats[allmons]['item'] == 'souldew' and PokemonData[allmons]['species']['id'] in (
+                        380, 381):
+                            BattlerStats[allmons]['satk'] = round(BattlerStats[allmons]['satk'] * 2)
+                            BattlerStats[allmons]['sdef'] = round(BattlerStats[allmons]['sdef'] * 2)
+
+                        # Flame orb
                         FireCheck = False
                         ItemGone = False
-                        if PokemonData[allmons]['species']['types'][0].lower() == 'fire':
+                        PoisonSteelCheck = False
+                        if Battlers[allmons]['types'][0] != 'fire':
                             FireCheck = True
                         if len(PokemonData[allmons]['species']['types']) == 2:
-                            if PokemonData[allmons]['species']['types'][1].lower() == 'fire':
+                            if Battlers[allmons]['types'][1] != 'fire':
                                 FireCheck = True
-                        if PokemonData[allmons]['species']['types'][0].lower() in ('poison', 'steel'):
+                        if Battlers[allmons]['types'][0] in ('poison', 'steel'):
+                            PoisonSteelCheck = True
+                        if Battlers[allmons]['types'][1] in ('poison', 'steel'):
                             PoisonSteelCheck = True
-                        if len(PokemonData[allmons]['species']['types']) == 2:
-                            if PokemonData[allmons]['species']['types'][1].lower() in ('poison', 'steel'):
-                                PoisonSteelCheck = True
-                        if PokemonData[allmons]['species']['types'][0].lower() == 'poison':
-                            PoisonCheck = True
-                        if len(PokemonData[allmons]['species']['types']) == 2:
-                            if PokemonData[allmons]['species']['types'][1].lower() == 'poison':
-                                PoisonCheck = True
                         for moveset in range(0, len(PokemonData[allmons]['moves'])):
                             if PokemonData[allmons]['moves'][moveset]['name'] == 'fling' or (
-                                        PokemonData[allmons]['moves'][moveset]['name'] in ('trick', 'switcheroo') and
-                                        BattlerStats[EnemyMon]['ability'] not in ('stickyhold', 'multitype') and
-                                    BattlerStats[EnemyMon]['item'] != 'griseousorb') or BattlerStats[allmons][
-                                'ability'] != 'klutz':
+                                        PokemonData[allmons]['moves'][moveset]['name'] in (
+                                    'trick', 'switcheroo') and BattlerStats[EnemyMon]['ability'] not in (
+                                'stickyhold', 'multitype') and BattlerStats[EnemyMon]['item'] != 'griseousorb'):
                                 ItemGone = True
-                        # end of turn items
-                        if FightTurns > 1:
-                            if BattlerStats[allmons]['item'] == 'flameorb' and BattlerStats[allmons][
-                                'ability'] != 'waterveil' and FireCheck is False and ItemGone is False:
-                                CurrentHp[allmons] -= 0.125 * TwoTurnCheck
-                            if BattlerStats[allmons][
-                                'item'] == 'toxicorb' and PoisonSteelCheck is False and ItemGone is False:
-                                if BattlerStats[allmons]['ability'] == 'poisonheal' and CurrentHp[allmons] > 0:
-                                    CurrentHp[allmons] += 0.125 * TwoTurnCheck
-                                if BattlerStats[allmons]['ability'] == 'shedskin':
-                                    CurrentHp[allmons] -= 0.10 * TwoTurnCheck
-                                if BattlerStats[allmons]['ability'] != 'immunity':
-                                    CurrentHp[allmons] -= (0.0625 * (FightTurns - 1)) + (
-                                    (0.0625 * (FightTurns - 1)) * (TwoTurnCheck - 1))
-                        if BattlerStats[allmons]['item'] == 'shellbell' and CurrentHp[allmons] > 0:
-                            CurrentHp[allmons] = ((BattlerStats[allmons]['hp'] * CurrentHp[allmons]) + (
-                            (0.125 * (BestMoveDamage[allmons] * BattlerStats[EnemyMon]['hp'])) * TwoTurnCheck)) / \
-                                                 BattlerStats[allmons]['hp']
-                        if BattlerStats[allmons]['item'] == 'lifeorb' and BattlerStats[allmons][
-                            'ability'] != 'magicguard':
+                        if BattlerStats[allmons]['item'] == 'flameorb' and BattlerStats[allmons][
+                            'ability'] != 'waterveil' and FireCheck is False and ItemGone is False:
+                            if BattlerStats[allmons]['ability'] == 'guts':
+                                BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 1.5)
+                            else:
+                                BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 0.5)
+                            if BattlerStats[allmons]['ability'] == 'quickfeet':
+                                BattlerStats[allmons]['speed'] = round(BattlerStats[allmons]['speed'] * 1.5)
+                            elif BattlerStats[allmons]['ability'] == 'marvelscale':
+                                BattlerStats[allmons]['def'] = round(BattlerStats[allmons]['def'] * 1.5)
+                        if BattlerStats[allmons][
+                            'item'] == 'toxicorb' and PoisonSteelCheck is False and ItemGone is False:
+                            if BattlerStats[allmons]['ability'] == 'guts':
+                                BattlerStats[allmons]['atk'] = round(BattlerStats[allmons]['atk'] * 1.5)
+                            elif BattlerStats[allmons]['ability'] == 'quickfeet':
+                                BattlerStats[allmons]['speed'] = round(BattlerStats[allmons]['speed'] * 1.5)
+                            elif BattlerStats[allmons]['ability'] == 'marvelscale':
+                                BattlerStats[allmons]['def'] = round(BattlerStats[allmons]['def'] * 1.5)
+
+                        # Berries
+                        if BattlerStats[allmons]['item'] == 'oranberry':
+                            BattlerStats[allmons]['hp'] += 10
+                        if BattlerStats[allmons]['item'] == 'sitrusberry':
+                            BattlerStats[allmons]['hp'] = round(BattlerStats[allmons]['hp'] * 1.25)
+                        if BattlerStats[allmons]['item'] == 'figyberry' and Battlers[allmons][
+                            'nature'] not in ('bold', 'calm', 'modest', 'timid'):
+                            BattlerStats[allmons]['hp'] = round(BattlerStats[allmons]['hp'] * 1.125)
+                        if BattlerStats[allmons]['item'] == 'wikiberry' and Battlers[allmons][
+                            'nature'] not in ('adamant', 'careful', 'impish', 'jolly'):
+                            BattlerStats[allmons]['hp'] = round(BattlerStats[allmons]['hp'] * 1.125)
+                        if BattlerStats[allmons]['item'] == 'magoberry' and Battlers[allmons][
+                            'nature'] not in ('brave', 'quiet', 'relaxed', 'sassy'):
+                            BattlerStats[allmons]['hp'] = round(BattlerStats[allmons]['hp'] * 1.125)
+                        if BattlerStats[allmons]['item'] == 'aguavberry' and Battlers[allmons][
+                            'nature'] not in ('lax', 'naive', 'naughty', 'rash'):
+                            BattlerStats[allmons]['hp'] = round(BattlerStats[allmons]['hp'] * 1.125)
+                        if BattlerStats[allmons]['item'] == 'iapapaberry' and Battlers[allmons][
+                            'nature'] not in ('lonely', 'hasty', 'mild', 'gentle'):
+                            BattlerStats[allmons]['hp'] = round(BattlerStats[allmons]['hp'] * 1.125)
+                SteadyStats = (dict(BattlerStats[blumons]), dict(BattlerStats[redmons]))
+            else:
+                BattlerStats[blumons].update(SteadyStats[0])
+                BattlerStats[redmons].update(SteadyStats[1])
+
+            # intimidate
+            if (BattlerStats[blumons]['ability'] == 'intimidate' and CurrentHp[blumons] == 1 and
+                        BattlerStats[redmons]['ability'] not in (
+                    'clearbody', 'hypercutter', 'whitesmoke')) or RedIntimidated is True:
+                RedIntimidated = True
+                BattlerStats[redmons]['atk'] = round(BattlerStats[redmons]['atk'] * 0.66)
+            if (BattlerStats[redmons]['ability'] == 'intimidate' and CurrentHp[redmons] == 1 and
+                        BattlerStats[blumons]['ability'] not in (
+                    'clearbody', 'hypercutter', 'whitesmoke')) or BluIntimidated is True:
+                BluIntimidated = True
+                BattlerStats[blumons]['atk'] = round(BattlerStats[blumons]['atk'] * 0.66)
+
+            TurnKey = (RedIntimidated, BluIntimidated)
+            if HpDependent:
+                TurnKey += (CurrentHp[blumons], CurrentHp[redmons])
+            if TurnKey != DamageKey:
+                DamageKey = TurnKey
+                # used for charging attacks [Blue move 1, 2, 3, 4, Red move 1, 2, 3, 4]
+                dmg = [0, 0, 0, 0, 0, 0, 0, 0]
+                move = ['', '', '', '', '', '', '', '']
+                for moveset in range(0, len(PokemonData[blumons]['moves'])):
+                    move[moveset] = Battlers[blumons]['moves'][moveset]['key']
+                    dmg = self.DamageDealt(ctx, blumons, redmons, moveset, PokemonData, BattlerStats, dmg,
+                                           CurrentHp[blumons], CurrentHp[redmons])
+
+                for moveset in range(0, len(PokemonData[redmons]['moves'])):
+                    move[moveset + 4] = Battlers[redmons]['moves'][moveset]['key']
+                    dmg = self.DamageDealt(ctx, redmons, blumons, moveset, PokemonData, BattlerStats, dmg,
+                                           CurrentHp[redmons], CurrentHp[blumons])
+            # [Blue move 1, 2, 3, 4, Red move 1, 2, 3, 4]
+            BestMoveDamage = []
+            for allmons in range(len(PokemonData)):
+                BestMoveDamage.append(-1)
+            bestblui = 0
+            bestredi = 0
+            for moveset in range(0, len(PokemonData[blumons]['moves'])):
+                if dmg[moveset] > BestMoveDamage[blumons]:
+                    BestMoveDamage[blumons] = dmg[moveset]
+                    bestblui = moveset
+                    move[moveset] = Battlers[blumons]['moves'][moveset]['key']
+            for moveset in range(0, len(PokemonData[redmons]['moves'])):
+                if dmg[4 + moveset] > BestMoveDamage[redmons]:
+                    BestMoveDamage[redmons] = dmg[4 + moveset]
+                    bestredi = 4 + moveset
+                    move[4 + moveset] = Battlers[redmons]['moves'][moveset]['key']
+
+            # if any move deals more than 100% damage, make it deal only 100%
+            if redmons != 5:
+                if BestMoveDamage[blumons] > 1:
+                    BestMoveDamage[blumons] = 1
+                if BestMoveDamage[blumons] > CurrentHp[redmons]:
+                    BestMoveDamage[blumons] = CurrentHp[redmons] + (
+                    (BestMoveDamage[blumons] - CurrentHp[redmons]) / 2)
+            if blumons != 2:
+                if BestMoveDamage[redmons] > 1:
+                    BestMoveDamage[redmons] = 1
+                if BestMoveDamage[redmons] > CurrentHp[blumons]:
+                    BestMoveDamage[redmons] = CurrentHp[blumons] + (
+                    (BestMoveDamage[redmons] - CurrentHp[blumons]) / 2)
+
+            # if a pokemon would be killed before they could use a charging move, use a different move, foo
+            if move_info(move[bestblui]).flags & (CHARGE | RECHARGE):
+                if BattlerStats[blumons]['speed'] > BattlerStats[redmons]['speed'] and BestMoveDamage[
+                    redmons] == 1:
+                    BestMoveDamage[blumons] = 0
+                    tempx = bestblui
+                    for moveset in range(0, 4):
+                        if dmg[moveset] > BestMoveDamage[blumons] and moveset != tempx:
+                            BestMoveDamage[blumons] = dmg[moveset]
+                            bestblui = moveset
+                if BattlerStats[blumons]['speed'] <= BattlerStats[redmons]['speed'] and BestMoveDamage[
+                    redmons] >= 0.5:
+                    BestMoveDamage[blumons] = 0
+                    tempx = bestblui
+                    for moveset in range(0, 4):
+                        if dmg[moveset] > BestMoveDamage[blumons] and moveset != tempx:
+                            BestMoveDamage[blumons] = dmg[moveset]
+                            bestblui = moveset
+
+            if move_info(move[bestredi]).flags & (CHARGE | RECHARGE):
+                if BattlerStats[blumons]['speed'] < BattlerStats[redmons]['speed'] and BestMoveDamage[
+                    blumons] == 1:
+                    BestMoveDamage[redmons] = 0
+                    tempx = bestredi
+                    for moveset in range(0, 4):
+                        if dmg[4 + moveset] > BestMoveDamage[redmons] and moveset != tempx:
+                            BestMoveDamage[redmons] = dmg[4 + moveset]
+                            bestredi = 4 + moveset
+                if BattlerStats[blumons]['speed'] >= BattlerStats[redmons]['speed'] and BestMoveDamage[
+                    blumons] >= 0.5:
+                    BestMoveDamage[redmons] = 0
+                    tempx = bestredi
+                    for moveset in range(0, 4):
+                        if dmg[4 + moveset] > BestMoveDamage[redmons] and moveset != tempx:
+                            BestMoveDamage[redmons] = dmg[4 + moveset]
+                            bestredi = 4 + moveset
+
+            # Damage corrections
+            TwoTurnCheck = 1
+            BluMoveFlags = move_info(move[bestblui]).flags
+            RedMoveFlags = move_info(move[bestredi]).flags
+
+            # recharge turn moves (predamage)
+            if BluMoveFlags & RECHARGE:
+                BestMoveDamage[blumons] /= 0.59
+                TwoTurnCheck = 2
+            elif RechargeBlu:
+                RechargeBlu = False
+                BestMoveDamage[blumons]
+            if RedMoveFlags & RECHARGE:
+                BestMoveDamage[redmons] /= 0.59
+                TwoTurnCheck = 2
+                RechargeBlu = True
+                RechargeRed = True
+            elif RechargeRed:
+                RechargeRed = False
+                BestMoveDamage[redmons]
+
+            # Charging turn moves
+            if BluMoveFlags & CHARGE:
+                BestMoveDamage[blumons] *= 2
+                CurrentHp[blumons] = CurrentHp[blumons] - BestMoveDamage[redmons]
+                batgains[redmons].append(BestMoveDamage[redmons] * 100)
+                TwoTurnCheck = 2
+            if RedMoveFlags & CHARGE:
+                BestMoveDamage[redmons] *= 2
+                CurrentHp[redmons] = CurrentHp[redmons] - BestMoveDamage[blumons]
+                batgains[blumons].append(BestMoveDamage[blumons] * 100)
+                TwoTurnCheck = 2
+
+                # recoil moves
+            if BluMoveFlags & RECOIL and BattlerStats[blumons]['ability'] != 'rockhead':
+                BestMoveDamage[blumons] *= 1.2
+            if RedMoveFlags & RECOIL and BattlerStats[redmons]['ability'] != 'rockhead':
+                BestMoveDamage[redmons] *= 1.2
+
+            if BattlerStats[blumons]['item'] in ('laggingtail', 'fullincense'):
+                BattlerStats[blumons]['speed'] = BattlerStats[blumons]['speed'] / 100
+            if BattlerStats[redmons]['item'] in ('laggingtail', 'fullincense'):
+                BattlerStats[redmons]['speed'] = BattlerStats[redmons]['speed'] / 100
+
+            # code to figure out who wins in ideal conditions, blue faster
+            if BattlerStats[blumons]['speed'] > BattlerStats[redmons]['speed'] or (
+                    BattlerStats[blumons]['item'] == 'quickclaw' and CurrentHp[blumons] == 1):
+                if CurrentHp[blumons] > 0:
+                    CurrentHp[redmons] = CurrentHp[redmons] - BestMoveDamage[blumons]
+                    batgains[blumons].append(BestMoveDamage[blumons] * 100)
+                if CurrentHp[redmons] > 0:
+                    CurrentHp[blumons] = CurrentHp[blumons] - BestMoveDamage[redmons]
+                    batgains[redmons].append(BestMoveDamage[redmons] * 100)
+            # same as above, just red is faster, and attacks first
+            if BattlerStats[blumons]['speed'] < BattlerStats[redmons]['speed'] or (
+                    BattlerStats[redmons]['item'] == 'quickclaw' and CurrentHp[redmons] == 1):
+                if CurrentHp[redmons] > 0:
+                    CurrentHp[blumons] = CurrentHp[blumons] - BestMoveDamage[redmons]
+                    batgains[redmons].append(BestMoveDamage[redmons] * 100)
+                if CurrentHp[blumons] > 0:
+                    CurrentHp[redmons] = CurrentHp[redmons] - BestMoveDamage[blumons]
+                    batgains[blumons].append(BestMoveDamage[blumons] * 100)
+            # Speed tie
+            if BattlerStats[blumons]['speed'] == BattlerStats[redmons]['speed']:
+                CurrentHp[blumons] = CurrentHp[blumons] - BestMoveDamage[redmons]
+                CurrentHp[redmons] = CurrentHp[redmons] - BestMoveDamage[blumons]
+                batgains[blumons].append(BestMoveDamage[blumons] * 100)
+                batgains[redmons].append(BestMoveDamage[redmons] * 100)
+
+            if not (BluMoveFlags | RedMoveFlags) & OHKO:
+                FightTurns += 1
+
+                # End of turn
+            for allmons in (blumons, redmons):
+                if allmons < ctx.NmbBlumons:
+                    EnemyMon = redmons
+                    BestTemp = bestblui
+                else:
+                    BestTemp = bestredi - 4
+                    EnemyMon = blumons
+                # item factor checks
+                PoisonSteelCheck = False
+                PoisonCheck = False
+                FireCheck = False
+                ItemGone = False
+                if 'fire' in Battlers[allmons]['types']:
+                    FireCheck = True
+                if Battlers[allmons]['types'][0] in ('poison', 'steel') or Battlers[allmons]['types'][1] in (
+                        'poison', 'steel'):
+                    PoisonSteelCheck = True
+                if 'poison' in Battlers[allmons]['types']:
+                    PoisonCheck = True
+                for moveset in range(0, len(PokemonData[allmons]['moves'])):
+                    if PokemonData[allmons]['moves'][moveset]['name'] == 'fling' or (
+                                PokemonData[allmons]['moves'][moveset]['name'] in ('trick', 'switcheroo') and
+                                BattlerStats[EnemyMon]['ability'] not in ('stickyhold', 'multitype') and
+                            BattlerStats[EnemyMon]['item'] != 'griseousorb') or BattlerStats[allmons][
+                        'ability'] != 'klutz':
+                        ItemGone = True
+                # end of turn items
+                if FightTurns > 1:
+                    if BattlerStats[allmons]['item'] == 'flameorb' and BattlerStats[allmons][
+                        'ability'] != 'waterveil' and FireCheck is False and ItemGone is False:
+                        CurrentHp[allmons] -= 0.125 * TwoTurnCheck
+                    if BattlerStats[allmons][
+                        'item'] == 'toxicorb' and PoisonSteelCheck is False and ItemGone is False:
+                        if BattlerStats[allmons]['ability'] == 'poisonheal' and CurrentHp[allmons] > 0:
+                            CurrentHp[allmons] += 0.125 * TwoTurnCheck
+                        if BattlerStats[allmons]['ability'] == 'shedskin':
                             CurrentHp[allmons] -= 0.10 * TwoTurnCheck
-                        if BattlerStats[allmons]['item'] == 'leftovers' or (
-                                PoisonCheck is True and BattlerStats[allmons]['item'] == 'blacksludge') and CurrentHp[
-                            allmons] > 0:
-                            CurrentHp[allmons] += 0.0625 * TwoTurnCheck
-                        if PoisonCheck is False and BattlerStats[allmons]['item'] == 'blacksludge':
-                            CurrentHp[allmons] -= 0.125 * TwoTurnCheck
-                        if PokemonData[allmons]['moves'][moveset]['name'] in (
-                        'absorb', 'megadrain', 'gigadrain', 'drainpunch', 'leechlife'):
-                            HPDrainHeal = ((BattlerStats[allmons]['hp'] * CurrentHp[allmons]) + (
-                            (0.5 * (BestMoveDamage[allmons] * BattlerStats[EnemyMon]['hp'])) * TwoTurnCheck)) / \
-                                          BattlerStats[allmons]['hp']
-                            if BattlerStats[allmons]['item'] == 'bigroot':
-                                HPDrainHeal = ((BattlerStats[allmons]['hp'] * CurrentHp[allmons]) + ((0.5 * (
-                                BestMoveDamage[allmons] * BattlerStats[EnemyMon]['hp'])) * TwoTurnCheck * 1.3)) / \
+                        if BattlerStats[allmons]['ability'] != 'immunity':
+                            CurrentHp[allmons] -= (0.0625 * (FightTurns - 1)) + (
+                            (0.0625 * (FightTurns - 1)) * (TwoTurnCheck - 1))
+                if BattlerStats[allmons]['item'] == 'shellbell' and CurrentHp[allmons] > 0:
+                    CurrentHp[allmons] = ((BattlerStats[allmons]['hp'] * CurrentHp[allmons]) + (
+                    (0.125 * (BestMoveDamage[allmons] * BattlerStats[EnemyMon]['hp'])) * TwoTurnCheck)) / \
+                                         BattlerStats[allmons]['hp']
+                if BattlerStats[allmons]['item'] == 'lifeorb' and BattlerStats[allmons][
+                    'ability'] != 'magicguard':
+                    CurrentHp[allmons] -= 0.10 * TwoTurnCheck
+                if BattlerStats[allmons]['item'] == 'leftovers' or (
+                        PoisonCheck is True and BattlerStats[allmons]['item'] == 'blacksludge') and CurrentHp[
+                    allmons] > 0:
+                    CurrentHp[allmons] += 0.0625 * TwoTurnCheck
+                if PoisonCheck is False and BattlerStats[allmons]['item'] == 'blacksludge':
+                    CurrentHp[allmons] -= 0.125 * TwoTurnCheck
+                if PokemonData[allmons]['moves'][moveset]['name'] in (
+                'absorb', 'megadrain', 'gigadrain', 'drainpunch', 'leechlife'):
+                    HPDrainHeal = ((BattlerStats[allmons]['hp'] * CurrentHp[allmons]) + (
+                    (0.5 * (BestMoveDamage[allmons] * BattlerStats[EnemyMon]['hp'])) * TwoTurnCheck)) / \
+                                  BattlerStats[allmons]['hp']
+                    if BattlerStats[allmons]['item'] == 'bigroot':
+                        HPDrainHeal = ((BattlerStats[allmons]['hp'] * CurrentHp[allmons]) + ((0.5 * (
+                        BestMoveDamage[allmons] * BattlerStats[EnemyMon]['hp'])) * TwoTurnCheck * 1.3)) / \
+                                      BattlerStats[allmons]['hp']
+                    if BattlerStats[EnemyMon]['ability'] != 'liquidooze' and CurrentHp[allmons] > 0:
+                        CurrentHp[allmons] += HPDrainHeal
+                    if BattlerStats[EnemyMon]['ability'] == 'liquidooze':
+                        CurrentHp[allmons] -= HPDrainHeal
+                if BattlerStats[EnemyMon]['ability'] == 'roughskin' and PokemonData[allmons]['moves'][BestTemp][
+                    'category'] == 'physical':
+                    CurrentHp[redmons] -= 0.125
+
+                if BattlerStats[allmons]['ability'] != 'rockhead':
+                    MoveRecoil = move_info(move[BestTemp]).recoil
+                    if MoveRecoil:
+                        CurrentHp[redmons] -= ((BattlerStats[allmons]['hp'] * CurrentHp[allmons]) + (
+                        (MoveRecoil * (BestMoveDamage[allmons] * BattlerStats[EnemyMon]['hp'])) * TwoTurnCheck)) / \
                                               BattlerStats[allmons]['hp']
-                            if BattlerStats[EnemyMon]['ability'] != 'liquidooze' and CurrentHp[allmons] > 0:
-                                CurrentHp[allmons] += HPDrainHeal
-                            if BattlerStats[EnemyMon]['ability'] == 'liquidooze':
-                                CurrentHp[allmons] -= HPDrainHeal
-                        if BattlerStats[EnemyMon]['ability'] == 'roughskin' and PokemonData[allmons]['moves'][BestTemp][
-                            'category'] == 'physical':
-                            CurrentHp[redmons] -= 0.125
-
-                        if BattlerStats[allmons]['ability'] != 'rockhead':
-                            if move[BestTemp] == 'headsmash':
-                                CurrentHp[redmons] -= ((BattlerStats[allmons]['hp'] * CurrentHp[allmons]) + (
-                                (0.5 * (BestMoveDamage[allmons] * BattlerStats[EnemyMon]['hp'])) * TwoTurnCheck)) / \
-                                                      BattlerStats[allmons]['hp']
-                            if move[BestTemp] in ('doubleedge', 'volttackle', 'flareblitz', 'bravebird', 'woodhammer'):
-                                CurrentHp[redmons] -= ((BattlerStats[allmons]['hp'] * CurrentHp[allmons]) + (
-                                (0.33 * (BestMoveDamage[allmons] * BattlerStats[EnemyMon]['hp'])) * TwoTurnCheck)) / \
-                                                      BattlerStats[allmons]['hp']
-                            if move[BestTemp] in ('takedown', 'submission'):
-                                CurrentHp[redmons] -= ((BattlerStats[allmons]['hp'] * CurrentHp[allmons]) + (
-                                (0.25 * (BestMoveDamage[allmons] * BattlerStats[EnemyMon]['hp'])) * TwoTurnCheck)) / \
-                                                      BattlerStats[allmons]['hp']
-                        if CurrentHp[allmons] > 1:
-                            CurrentHp[allmons] = 1
-                    BoostBonus = 1
-                    # anti-infinity
-                    # Kill the Pokemon instantly if this loops too many times.
-                    # For ubers matches, which have a higher potential for cancer due to stall sets, the iterations
-                    # typically range from 1-10.  In rare cases (~1%) extremely cancerous matches will iterate
-                    # indefinitely, even with a decrease of 1% HP per iteration.
-                    if stillAliveIterations < 50:
-                        CurrentHp[blumons] -= 0.001
-                        CurrentHp[redmons] -= 0.001
-                    else:
-                        CurrentHp[blumons] = 0
-                        CurrentHp[redmons] = 0
+                if CurrentHp[allmons] > 1:
+                    CurrentHp[allmons] = 1
+            BoostBonus = 1
+            # anti-infinity
+            # Kill the Pokemon instantly if this loops too many times.
+            # For ubers matches, which have a higher potential for cancer due to stall sets, the iterations
+            # typically range from 1-10.  In rare cases (~1%) extremely cancerous matches will iterate
+            # indefinitely, even with a decrease of 1% HP per iteration.
+            if stillAliveIterations < 50:
+                CurrentHp[blumons] -= 0.001
+                CurrentHp[redmons] -= 0.001
+            else:
+                CurrentHp[blumons] = 0
+                CurrentHp[redmons] = 0
 
-                    if CurrentHp[blumons] <= 0:
-                        RechargeBlu = False
-                        DeadMon = True
-                        batper[blumons] -= 0.0001
-                    else:
-                        TempType = ['', 'none']
-                        TempType[0] = PokemonData[blumons]['species']['types'][0].lower()
-                        if len(PokemonData[blumons]['species']['types']) == 2:
-                            TempType[1] = PokemonData[blumons]['species']['types'][1].lower()
-                        for moveset in range(0, len(PokemonData[blumons]['moves'])):
-                            TempMoveName = PokemonData[blumons]['moves'][moveset]['name'].lower().replace(' ',
-                                                                                                          '').replace(
-                                '-', '')
-                            if TempMoveName in ('howl', 'meditate', 'sharpen', 'growth'):  # attack stats +1
-                                batper[blumons] += BoostBonus * 1
-                            if TempMoveName in ('nastyplot', 'swordsdance', 'tailglow'):  # attack stats +2
-                                batper[blumons] += BoostBonus * 7.5
-                            if TempMoveName in ('defensecurl', 'withdraw', 'harden'):  # defense +1
-                                batper[blumons] += BoostBonus * 1.2
-                            if TempMoveName in ('acidarmor', 'barrier', 'irondefense'):  # defense +2
-                                batper[blumons] += BoostBonus * 4
-                            if TempMoveName in ('defendorder', 'cosmicpower'):  # Both defenses +1
-                                batper[blumons] += BoostBonus * 3
-                            if TempMoveName == 'stockpile':  # stockpile
-                                batper[blumons] += BoostBonus * 1.2
-                            if TempMoveName == 'amnesia':  # special defense +2
-                                batper[blumons] += BoostBonus * 5
-                            if TempMoveName == 'calmmind':  # calmmind
-                                batper[blumons] += BoostBonus * 3
-                            if TempMoveName == 'bulkup':  # bulkup
-                                batper[blumons] += BoostBonus * 2.5
-                            if TempMoveName == 'dragondance':  # dragon dance
-                                batper[blumons] += BoostBonus * 4
-                            if TempMoveName == 'acupressure':  # acupressure
-                                batper[blumons] += BoostBonus * 9
-                            if TempMoveName in ('rockpolish', 'agility'):  # speed +2
-                                batper[blumons] += BoostBonus * 0.75
-                            if TempMoveName == 'curse' and 'ghost' not in TempType:
-                                batper[blumons] += BoostBonus * 3.25
-
-                    if CurrentHp[redmons] <= 0:
-                        RechargeRed = False
-                        CurrentRedMon = CurrentRedMon + 1
-                        DeadMon = True
-                        batper[redmons] -= 0.0001
-                    else:
-                        TempType = ['', 'none']
-                        TempType[0] = PokemonData[redmons]['species']['types'][0].lower()
-                        if len(PokemonData[redmons]['species']['types']) == 2:
-                            TempType[1] = PokemonData[redmons]['species']['types'][1].lower()
-                        for moveset in range(0, len(PokemonData[redmons]['moves'])):
-                            TempMoveName = PokemonData[redmons]['moves'][moveset]['name'].lower().replace(' ',
-                                                                                                          '').replace(
-                                '-', '')
-                            if TempMoveName in ('howl', 'meditate', 'sharpen', 'growth'):  # attack stats +1
-                                batper[redmons] += BoostBonus * 1
-                            if TempMoveName in ('nastyplot', 'swordsdance', 'tailglow'):  # attack stats +2
-                                batper[redmons] += BoostBonus * 7.5
-                            if TempMoveName in ('defensecurl', 'withdraw', 'harden'):  # defense +1
-                                batper[redmons] += BoostBonus * 1.2
-                            if TempMoveName in ('acidarmor', 'barrier', 'irondefense'):  # defense +2
-                                batper[redmons] += BoostBonus * 4
-                            if TempMoveName in ('defendorder', 'cosmicpower'):  # Both defenses +1
-                                batper[redmons] += BoostBonus * 3
-                            if TempMoveName == 'stockpile':  # stockpile
-                                batper[redmons] += BoostBonus * 1.2
-                            if TempMoveName == 'amnesia':  # special defense +2
-                                batper[redmons] += BoostBonus * 5
-                            if TempMoveName == 'calmmind':  # calmmind
-                                batper[redmons] += BoostBonus * 3
-                            if TempMoveName == 'bulkup':  # bulkup
-                                batper[redmons] += BoostBonus * 2.5
-                            if TempMoveName == 'dragondance':  # dragon dance
-                                batper[redmons] += BoostBonus * 4
-                            if TempMoveName == 'acupressure':  # acupressure
-                                batper[redmons] += BoostBonus * 9
-                            if TempMoveName in ('rockpolish', 'agility'):  # speed +2
-                                batper[redmons] += BoostBonus * 0.75
-                            if TempMoveName == 'curse' and 'ghost' not in TempType:
-                                batper[redmons] += BoostBonus * 3.25
-
-                # End while
-                RedIntimidated = False
-                BluIntimidated = False
-                self._matchdict['CancerChecks']['MatchTurns'] += FightTurns
-                if FightTurns > self._matchdict['CancerChecks']['1v1HighestTurns']:
-                    self._matchdict['CancerChecks']['1v1HighestTurns'] = FightTurns
-                if CurrentHp[redmons] <= 0:
-                    self._matchdict['MatchPrediction'].append('red died: ' + str(
-                        PokemonData[blumons]['displayname'].replace("\u2642", "m").replace("\u2640", "f")) + ', ' + str(
-                        bestblui) + '.' + str(move[bestblui]) + ' has killed ' + str(
-                        PokemonData[redmons]['displayname'].replace("\u2642", "m").replace("\u2640", "f")) + ', ' + str(
-                        bestredi - 4) + '.' + str(move[bestredi]) + ' in ' + str(
-                        FightTurns) + ' turns with {0:6.2f}'.format(CurrentHp[blumons] * 100) + '% hp left')
-                if CurrentHp[blumons] <= 0:
-                    self._matchdict['MatchPrediction'].append('blue died: ' + str(
-                        PokemonData[redmons]['displayname'].replace("\u2642", "m").replace("\u2640", "f")) + ', ' + str(
-                        bestredi - 4) + '.' + str(move[bestredi]) + ' has killed ' + str(
-                        PokemonData[blumons]['displayname'].replace("\u2642", "m").replace("\u2640", "f")) + ', ' + str(
-                        bestblui) + '.' + str(move[bestblui]) + ' in ' + str(
-                        FightTurns) + ' turns with {0:6.2f}'.format(CurrentHp[redmons] * 100) + '% hp left')
-                # if blue lost, increase the for loop
-                if CurrentHp[blumons] <= 0:
-                    break
-        return (batper)
+            if CurrentHp[blumons] <= 0:
+                RechargeBlu = False
+                DeadMon = True
+                batgains[blumons].append(-0.0001)
+            else:
+                TempType = Battlers[blumons]['types']
+                for moveset in range(0, len(PokemonData[blumons]['moves'])):
+                    TempMoveInfo = Battlers[blumons]['moves'][moveset]['info']
+                    if TempMoveInfo.setup_value and not (
+                            TempMoveInfo.flags & NOT_FOR_GHOSTS and 'ghost' in TempType):
+                        batgains[blumons].append(BoostBonus * TempMoveInfo.setup_value)
+
+            if CurrentHp[redmons] <= 0:
+                RechargeRed = False
+                DeadMon = True
+                batgains[redmons].append(-0.0001)
+            else:
+                TempType = Battlers[redmons]['types']
+                for moveset in range(0, len(PokemonData[redmons]['moves'])):
+                    TempMoveInfo = Battlers[redmons]['moves'][moveset]['info']
+                    if TempMoveInfo.setup_value and not (
+                            TempMoveInfo.flags & NOT_FOR_GHOSTS and 'ghost' in TempType):
+                        batgains[redmons].append(BoostBonus * TempMoveInfo.setup_value)
+        return (FightTurns, bestblui, bestredi, move[bestblui], move[bestredi], HealCancer, RechargeBlu, RechargeRed)
 
     def analyze(self, BlueTeam, RedTeam, effectiveness='normal'):
         """
@@ -1682,6 +1614,12 @@ class MatchMaker(object):
                     Text indexed based on specific pokemon combinations, on what the analyzer thinks will happen, roughly
                     Example: '`team_of_killed_pokemon` died: `winner_pokemon_name`, `winner_best_move_index`.`winner_best_move_name` has killed `loser_pokemon_name`, `loser_best_move_index`.`loser_best_move_name` in  `length_of_1v1` turns with  `winner_percent_hp`% hp left'
                     ]
+                    Empty until render_match_prediction()
+                'Deaths':
+                    [
+                    (team of the dead pokemon, killer name, killer move index, killer move, dead name, dead move index,
+                     dead move, turns, killer hp left) per death, the 'MatchPrediction' sentences are made from these
+                    ]
                 'Winner':
                     Predicted Winner of the match, 'Red' or 'Blue'
             }
@@ -1692,47 +1630,44 @@ class MatchMaker(object):
         passes = 0
         batnumber = []
         position = []
-        self._effectiveness = effectiveness
-        self._matchdict = {'Pokemon': [], 'CancerChecks': {'1v1HighestTurns': 0, 'MatchTurns': 0, 'UnusedMons': False,
-                                                           'UselessMons': False, 'UseMatch': True, 'HealCancer': False},
-                           'MatchPrediction': []}
+        ctx = AnalysisContext(effectiveness, len(BlueTeam), BlueTeam + RedTeam)
         '''
         for i in range(random.randint(1,1)):
             BlueTeam.append(pokecat.generate_random_pokemon())
         for i in range(random.randint(1,1)):
             RedTeam.append(pokecat.generate_random_pokemon())'''
-        self._NmbBlumons = len(BlueTeam)
+        # a fresh list, so ditto transforms don't replace the caller's team members
         PokemonData = BlueTeam + RedTeam
         for i in range(len(PokemonData)):
-            self._matchdict['Pokemon'].append({})
-            self._matchdict['Pokemon'][i]['Notes'] = 'none'
+            ctx.matchdict['Pokemon'].append({})
+            ctx.matchdict['Pokemon'][i]['Notes'] = 'none'
             batnumber.append(-1)
 
         # match math
         UnusedMonError = 0
         # self.log.debug(PokemonData)
-        batper = self.Core_Fight(PokemonData)
+        batper = self.Core_Fight(ctx, PokemonData)
 
         # if any mon has a rating less than 0, make it 0.01 (this shouldn't happen, but a division by 0 could happen if it does)
         for allmons in range(len(PokemonData)):
             if batper[allmons] < 0:
                 batper[allmons] = 0.01
             if batper[allmons] == 9.999:
-                self._matchdict['CancerChecks']['UselessMons'] = True
-                self._matchdict['Pokemon'][allmons]['Notes'] = 'Useless'
+                ctx.matchdict['CancerChecks']['UselessMons'] = True
+                ctx.matchdict['Pokemon'][allmons]['Notes'] = 'Useless'
             if batper[allmons] == 10:
-                self._matchdict['CancerChecks']['UnusedMons'] = True
-                self._matchdict['Pokemon'][allmons]['Notes'] = 'Unused'
-                self._matchdict['CancerChecks']['UseMatch'] = False
+                ctx.matchdict['CancerChecks']['UnusedMons'] = True
+                ctx.matchdict['Pokemon'][allmons]['Notes'] = 'Unused'
+                ctx.matchdict['CancerChecks']['UseMatch'] = False
                 batper[allmons] = 150
-        if self._matchdict['CancerChecks']['1v1HighestTurns'] > TurnLimit:
-            self._matchdict['CancerChecks']['UseMatch'] = False
+        if ctx.matchdict['CancerChecks']['1v1HighestTurns'] > TurnLimit:
+            ctx.matchdict['CancerChecks']['UseMatch'] = False
         # figure out the average
         blueper = 0.00
-        for allmons in range(0, self._NmbBlumons):
+        for allmons in range(0, ctx.NmbBlumons):
             blueper += batper[allmons]
         redper = 0.00
-        for allmons in range(self._NmbBlumons, len(PokemonData)):
+        for allmons in range(ctx.NmbBlumons, len(PokemonData)):
             redper += batper[allmons]
 
         if blueper > redper:
@@ -1743,52 +1678,60 @@ class MatchMaker(object):
             winper = 50
 
         goodmatch = False
-        if self._badturns is True:
+        if ctx.badturns is True:
             goodmatch = False
 
         self.log.debug(winper)
 
+        # the debug texts are only worth building if they get logged
+        debug = self.log.isEnabledFor(logging.DEBUG)
         temptext = ''
-        for allmons in range(0, len(PokemonData)):
-            temptext = temptext + str(batper[allmons]) + ' '
-            if allmons == len(BlueTeam) - 1:
-                temptext = temptext + 'vs '
-        self.log.debug(temptext)
-        temptext = ''
+        if debug:
+            for allmons in range(0, len(PokemonData)):
+                temptext = temptext + str(batper[allmons]) + ' '
+                if allmons == len(BlueTeam) - 1:
+                    temptext = temptext + 'vs '
+            self.log.debug(temptext)
+            temptext = ''
+
+            for allmons in range(0, len(PokemonData)):
+                temptext = temptext + PokemonData[allmons]['displayname'] + ' '
+                if allmons == len(BlueTeam) - 1:
+                    temptext = temptext + 'vs '
 
         for allmons in range(0, len(PokemonData)):
-            temptext = temptext + PokemonData[allmons]['displayname'] + ' '
-            if allmons == len(BlueTeam) - 1:
-                temptext = temptext + 'vs '
-
-        for allmons in range(0, len(PokemonData)):
-            self._matchdict['Pokemon'][allmons]['Team'] = 'Blue'
+            ctx.matchdict['Pokemon'][allmons]['Team'] = 'Blue'
             tempx = allmons + 1
-            if allmons >= self._NmbBlumons:
-                tempx = allmons + 1 - self._NmbBlumons
-                self._matchdict['Pokemon'][allmons]['Team'] = 'Red'
-            self._matchdict['Pokemon'][allmons]['Position'] = tempx
-            self._matchdict['Pokemon'][allmons]['Name'] = PokemonData[allmons]['displayname']
-            self._matchdict['Pokemon'][allmons]['Value'] = batper[allmons]
+            if allmons >= ctx.NmbBlumons:
+                tempx = allmons + 1 - ctx.NmbBlumons
+                ctx.matchdict['Pokemon'][allmons]['Team'] = 'Red'
+            ctx.matchdict['Pokemon'][allmons]['Position'] = tempx
+            ctx.matchdict['Pokemon'][allmons]['Name'] = PokemonData[allmons]['displayname']
+            ctx.matchdict['Pokemon'][allmons]['Value'] = batper[allmons]
 
         if blueper > redper:
             winper = blueper / (blueper + redper) * 100
-            self.log.debug(temptext + '---' + str(winper) + '% blue wins')
-            self._matchdict['Winner'] = 'blue'
+            if debug:
+                self.log.debug(temptext + '---' + str(winper) + '% blue wins')
+            ctx.matchdict['Winner'] = 'blue'
 
         if blueper < redper:
             winper = redper / (blueper + redper) * 100
-            self.log.debug(temptext + '---' + str(winper) + '% red wins')
-            self._matchdict['Winner'] = 'red'
+            if debug:
+                self.log.debug(temptext + '---' + str(winper) + '% red wins')
+            ctx.matchdict['Winner'] = 'red'
 
         if blueper == redper:
             winper = blueper / (blueper + redper) * 100
-            self.log.debug(temptext + '---' + str(winper) + '% either wins')
-            self._matchdict['Winner'] = 'either'
-
-        self._matchdict['WinPercentage'] = winper
-        self.log.debug(self._matchdict)
-        return self._matchdict
+            if debug:
+                self.log.debug(temptext + '---' + str(winper) + '% either wins')
+            ctx.matchdict['Winner'] = 'either'
+
+        ctx.matchdict['WinPercentage'] = winper
+        if debug:
+            # a rendered copy, so the result doesn't depend on the logging configuration
+            self.log.debug(render_match_prediction(dict(ctx.matchdict)))
+        return ctx.matchdict
 
 
 def main():
@@ -0,0 +1,191 @@
+"""
+Analysis of several candidate matches at once.
+
+analyze_many() hands the team pairs to a pool of worker processes, each with a
+warm analyzer of its own, as soon as they are made. When no pool can be used, or
+it breaks, the pairs are analyzed one after another in this process instead.
+Either way the results are the ones a serial run would have produced. While the
+workers are busy, other greenlets keep running.
+"""
+import importlib
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import gevent
+
+log = logging.getLogger("pbrmm")
+
+_pool = None
+_pool_processes = 0
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    # importing the package builds the worker's shared MatchMaker before the first pair arrives
+    importlib.import_module(__package__)
+
+
+def _analyze_in_worker(blue, red, effectiveness):
+    return importlib.import_module(__package__).analyze(blue, red, effectiveness)
+
+
+def _get_pool(processes):
+    global _pool, _pool_processes
+    with _pool_lock:
+        if _pool is not None and _pool_processes != processes:
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            try:
+                _pool = ProcessPoolExecutor(processes, initializer=_init_worker)
+            except (OSError, ImportError, NotImplementedError, ValueError) as e:
+                log.warning("Analysis process pool unavailable, analyzing serially: {}".format(e))
+                return None
+            _pool_processes = processes
+        return _pool
+
+
+def _discard_pool(pool, error):
+    global _pool
+    log.warning("Analysis process pool failed, analyzing serially: {}".format(error))
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def shutdown_pool():
+    """Stops the worker processes of analyze_many(), they are started again when needed."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def _wait_first(pending):
+    """
+    wait(pending, return_when=FIRST_COMPLETED) that lets other greenlets run in the meantime
+
+    wait() blocks on a lock of the threading module, which stops the whole gevent hub unless
+    threading is monkey-patched, so the futures are polled instead.
+    """
+    while True:
+        done, pending = wait(pending, timeout=0)
+        if done:
+            return done, pending
+        gevent.sleep(0.002)
+
+
+def _analyze_serially(analyze, pairs, effectiveness, acceptable):
+    results = []
+    for i, (blue, red) in enumerate(pairs):
+        results.append(analyze(blue, red, effectiveness))
+        if acceptable is not None and acceptable(i, results[i]):
+            break
+    return results
+
+
+def analyze_many(analyze, pairs, effectiveness='normal', acceptable=None, processes=0):
+    """
+    Analyzes several matches, in worker processes if possible
+
+    Arguments:
+            analyze:
+                analyze function used when analyzing in this process
+            pairs:
+                list or iterable of (BlueTeam, RedTeam). An iterable is consumed lazily, each pair
+                is handed to the workers as soon as it is made, so making the next pair overlaps
+                with analyzing the previous ones
+            effectiveness:
+                type effectiveness variant used for every pair
+            acceptable:
+                optional callable(index, result) -> bool. The first acceptable result
+                ends the search, outstanding work for the pairs after it is cancelled
+                and no more pairs are taken
+            processes:
+                number of worker processes, 0 analyzes everything in this process
+
+    Returns:
+            results:
+                list of analysis results in the order of pairs, None for pairs after the
+                first acceptable one. For an iterable, one result per pair taken from it
+    """
+    pool = _get_pool(processes) if processes and (not hasattr(pairs, '__len__') or len(pairs) > 1) else None
+    if pool is None:
+        results = _analyze_serially(analyze, pairs, effectiveness, acceptable)
+    else:
+        results = _analyze_in_pool(pool, analyze, pairs, effectiveness, acceptable)
+    if hasattr(pairs, '__len__'):
+        results += [None] * (len(pairs) - len(results))
+    return results
+
+
+def _analyze_in_pool(pool, analyze, pairs, effectiveness, acceptable):
+    taken = []
+    results = []
+    futures = {}
+    pending = set()
+    errors = {}
+    end = None  # index of the first acceptable result known so far
+
+    def collect(done):
+        nonlocal pool, end
+        for future in done:
+            i = futures[future]
+            if (end is not None and i >= end) or future.cancelled():
+                continue
+            try:
+                results[i] = future.result()
+            except BrokenProcessPool as e:
+                if pool is not None:
+                    _discard_pool(pool, e)
+                    pool = None
+                continue
+            except Exception as e:
+                errors[i] = e
+                continue
+            if acceptable is not None and acceptable(i, results[i]):
+                # only earlier pairs may still replace this one, as in a serial run
+                end = i
+                for other, j in futures.items():
+                    if j > i:
+                        other.cancel()
+
+    for blue, red in pairs:
+        taken.append((blue, red))
+        results.append(None)
+        if pool is not None:
+            try:
+                future = pool.submit(_analyze_in_worker, blue, red, effectiveness)
+            except (BrokenProcessPool, OSError, RuntimeError) as e:
+                _discard_pool(pool, e)
+                pool = None
+            else:
+                futures[future] = len(taken) - 1
+                pending.add(future)
+                done, pending = wait(pending, timeout=0)
+                collect(done)
+        if end is not None:
+            break
+    while pending:
+        done, pending = _wait_first(pending)
+        collect(done)
+        # running analyses of pairs after end can't be cancelled, stop waiting for them
+        if end is not None:
+            pending = {future for future in pending if futures[future] < end}
+    if end is not None:
+        del taken[end + 1:]
+        del results[end + 1:]
+    # serially: what a broken pool left behind
+    for i, (blue, red) in enumerate(taken):
+        if i in errors:
+            raise errors[i]
+        if results[i] is None:
+            results[i] = analyze(blue, red, effectiveness)
+            if acceptable is not None and acceptable(i, results[i]):
+                del results[i + 1:]
+                break
+    return results
@@ -0,0 +1,140 @@
+"""
+Type effectiveness tables of the match analyzer.
+
+The effectiveness variants selectable with analyze(effectiveness=...) are derived
+from BASE_TABLE by transforms instead of being written out one by one. A new
+variant is one more entry in TABLES, e.g.
+    TABLES['inverse-of-x'] = inverted(with_override(BASE_TABLE, 'x', 'y', 2))
+
+defender_row() combines a defender's two types and its ability into a single
+row indexed by the attacking type, so the damage calculation needs one lookup
+per move instead of two table lookups plus the ability checks.
+"""
+
+# Type dictionary, u is an attacking type only, grounded is a defending flying type with an iron ball
+TYPES = {"normal": 0, "fire": 1, "water": 2, "electric": 3, "grass": 4,
+         "ice": 5, "fighting": 6, "poison": 7, "ground": 8, "flying": 9,
+         "psychic": 10, "bug": 11, "rock": 12, "ghost": 13, "dragon": 14,
+         "dark": 15, "steel": 16, "u": 17, "grounded": 17, "fairy": 17}
+
+BASE_TABLE = [  # Fe1k's Design
+    #                                     Defenders
+    # NOR  FIR  WAT  ELE  GRA  ICE  FIG  POI  GRO  FLY  PSY  BUG  ROC  GHO  DRA  DAR  STE GRD
+    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0.5, 0, 1, 1, 0.5, 1],  # NOR
+    [1, 0.5, 0.5, 1, 2, 2, 1, 1, 1, 1, 1, 2, 0.5, 1, 0.5, 1, 2, 1],  # FIR
+    [1, 2, 0.5, 1, 0.5, 1, 1, 1, 2, 1, 1, 1, 2, 1, 0.5, 1, 1, 1],  # WAT
+    [1, 1, 2, 0.5, 0.5, 1, 1, 1, 0, 2, 1, 1, 1, 1, 0.5, 1, 1, 2],  # ELE
+    [1, 0.5, 2, 1, 0.5, 1, 1, 0.5, 2, 0.5, 1, 0.5, 2, 1, 0.5, 1, 0.5, 0.5],  # GRA
+    [1, 0.5, 0.5, 1, 2, 0.5, 1, 1, 2, 2, 1, 1, 1, 1, 2, 1, 0.5, 2],  # ICE
+    [2, 1, 1, 1, 1, 2, 1, 0.5, 1, 0.5, 0.5, 0.5, 2, 0, 1, 2, 2, 0.5],  # FIG
+    [1, 1, 1, 1, 2, 1, 1, 0.5, 0.5, 1, 1, 1, 0.5, 0.5, 1, 1, 0, 1],  # POI
+    [1, 2, 1, 2, 0.5, 1, 1, 2, 1, 0, 1, 0.5, 2, 1, 1, 1, 2, 1],  # GRO   Attackers
+    [1, 1, 1, 0.5, 2, 1, 2, 1, 1, 1, 1, 2, 0.5, 1, 1, 1, 0.5, 1],  # FLY
+    [1, 1, 1, 1, 1, 1, 2, 2, 1, 1, 0.5, 1, 1, 1, 1, 0, 0.5, 1],  # PSY
+    [1, 0.5, 1, 1, 2, 1, 0.5, 0.5, 1, 0.5, 2, 1, 1, 0.5, 1, 2, 0.5, 0.5],  # BUG
+    [1, 2, 1, 1, 1, 2, 0.5, 1, 0.5, 2, 1, 2, 1, 1, 1, 1, 0.5, 2],  # ROC
+    [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 1, 1, 2, 1, 0.5, 0.5, 1],  # GHO
+    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 1, 0.5, 1],  # DRA
+    [1, 1, 1, 1, 1, 1, 0.5, 1, 1, 1, 2, 1, 1, 2, 1, 0.5, 0.5, 1],  # DAR
+    [1, 0.5, 0.5, 0.5, 1, 2, 1, 1, 1, 1, 1, 1, 2, 1, 1, 1, 0.5, 1],  # STE
+    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],  # U
+]
+
+# inverse battles: immunities and resistances become super effective and the other way around
+_INVERSE = {0: 2, 0.5: 2, 1: 1, 2: 0.5}
+
+
+def inverted(table):
+    """Copy of an effectiveness table for inverse battles."""
+    return [[_INVERSE[value] for value in row] for row in table]
+
+
+def with_override(table, attacker, defender, value):
+    """Copy of an effectiveness table where attacker type vs defender type is value."""
+    table = [list(row) for row in table]
+    table[TYPES[attacker]][TYPES[defender]] = value
+    return table
+
+
+TABLES = {
+    "normal": BASE_TABLE,
+    "inverse": inverted(BASE_TABLE),
+    "ice-se-on-bug": with_override(BASE_TABLE, "ice", "bug", 2),
+    "inverse-of-ice-se-on-bug": inverted(with_override(BASE_TABLE, "ice", "bug", 2)),
+}
+
+# defending abilities that change type effectiveness, every other ability acts like 'none'
+ABILITIES = frozenset(('waterabsorb', 'voltabsorb', 'motordrive', 'levitate', 'flashfire', 'dryskin', 'thickfat',
+                       'heatproof', 'filter', 'solidrock'))
+
+# one attacking type name per type index, for building defender rows
+_ATTACK_TYPE_NAMES = []
+for _name, _index in TYPES.items():
+    if _index == len(_ATTACK_TYPE_NAMES):
+        _ATTACK_TYPE_NAMES.append(_name)
+
+_defender_rows = {}
+
+
+def effectiveness(table, type1name, type2name, defenderability):
+    """
+    Calculates the effectiveness of an attack
+
+    Arguments:
+            table:
+                effectiveness table, one of TABLES
+            type1name:
+                Attacking move type
+            type2name:
+                One of the Defending pokemon's types
+            defenderability:
+                Ability of the Defender, lowercase without spaces
+
+    Returns:
+            tempx:
+                float, effectiveness of the attack (1 = neutral, 2 = super effective)
+    """
+    if type2name == 'none':
+        return (1)
+    type1 = TYPES[type1name]
+    type2 = TYPES[type2name]
+    tempx = table[type1][type2]
+    if defenderability == 'waterabsorb' and type1name == 'water':
+        tempx = 0
+    elif defenderability in ('voltabsorb', 'motordrive') and type1name == 'electric':
+        tempx = 0
+    elif defenderability == 'levitate' and type1name == 'ground':
+        tempx = 0
+    elif defenderability == 'flashfire' and type1name == 'fire':
+        tempx = 0
+    elif defenderability == 'dryskin':
+        if type1name == 'water':
+            tempx = 0
+        if type1name == 'fire':
+            tempx = tempx * 1.25
+    if defenderability == 'thickfat' and type1name in ('ice', 'fire'):
+        tempx = tempx * 0.5
+    if defenderability == 'heatproof' and type1name == 'fire':
+        tempx = tempx * 0.5
+    if defenderability in ('filter', 'solidrock') and tempx > 1:
+        tempx = tempx * 0.75
+    return tempx
+
+
+def defender_row(variant, type1name, type2name, defenderability):
+    """
+    Effectiveness of every attacking type against a defender, indexed like TYPES.
+
+    row[TYPES[movetype]] equals effectiveness(type1name) * effectiveness(type2name) for that move type.
+    Rows are built on first use and kept.
+    """
+    if defenderability not in ABILITIES:
+        defenderability = 'none'
+    key = (variant, type1name, type2name, defenderability)
+    row = _defender_rows.get(key)
+    if row is None:
+        table = TABLES[variant]
+        row = [effectiveness(table, attacker, type1name, defenderability) *
+               effectiveness(table, attacker, type2name, defenderability) for attacker in _ATTACK_TYPE_NAMES]
+        _defender_rows[key] = row
+    return row
@@ -0,0 +1,102 @@
+"""
+Quick estimate of how balanced a match is, without simulating the fights turn by turn.
+
+estimate() lets the teams fight in order like analyze() does, but each 1v1 is
+decided by how many hits both pokemon need to knock the other out with their
+strongest attack, the faster one hitting first. It knows nothing of items,
+status moves, boosts or switching, so it only tells clearly lopsided matches
+apart from the rest. The matchmaker uses it to skip the full analysis of such
+matches, see tiered_evaluation in settings.yaml.
+"""
+import math
+from collections import namedtuple
+
+from .analyzer import make_battler
+from .effectiveness import TYPES, defender_row
+
+Features = namedtuple('Features', 'types ability hp atk defense spatk spdef speed attacks')
+"""
+Everything estimate() needs of a pokemon.
+attacks: ((move type index, base power including STAB, physical), ...) of its damaging moves
+"""
+
+# 2 * level / 5 + 2 of the damage formula, for level 100
+_LEVEL_FACTOR = 42
+
+
+def features(pokemon):
+    battler = make_battler(pokemon)
+    stats = pokemon['stats']
+    attacks = []
+    for move in battler['moves']:
+        if move['category'] == 'status' or not move['power']:
+            continue
+        power = move['power']
+        if move['type'] in battler['types']:
+            power *= 1.5
+        attacks.append((TYPES[move['type']], power, move['category'] == 'physical'))
+    return Features(battler['types'], battler['ability'], stats['hp'], stats['atk'], stats['def'], stats['spA'],
+                    stats['spD'], stats['spe'], tuple(attacks))
+
+
+def hit_damage(attacker, defender, effectiveness='normal'):
+    """Part of the defender's max hp the attacker's strongest attack takes, both Features."""
+    row = defender_row(effectiveness, defender.types[0], defender.types[1], defender.ability)
+    best = 0
+    for movetype, power, physical in attacker.attacks:
+        if physical:
+            ratio = attacker.atk / defender.defense
+        else:
+            ratio = attacker.spatk / defender.spdef
+        damage = (_LEVEL_FACTOR * power * ratio / 50 + 2) * row[movetype]
+        if damage > best:
+            best = damage
+    return best / defender.hp
+
+
+def estimate(BlueTeam, RedTeam, effectiveness='normal'):
+    """
+    Estimates the winchance of the favored team
+
+    Arguments:
+            BlueTeam:
+                a list of pokemon data on the blue team
+            RedTeam:
+                a list of pokemon data on the red team
+            effectiveness:
+                type effectiveness variant, as for analyze
+
+    Returns:
+            winchance:
+                float between 50 and 100, the favored team's share of all damage dealt like the
+                WinPercentage of analyze. Lower = more balanced
+    """
+    blue = [features(pokemon) for pokemon in BlueTeam]
+    red = [features(pokemon) for pokemon in RedTeam]
+    bluehp = [1.0] * len(blue)
+    redhp = [1.0] * len(red)
+    bluemon = redmon = 0
+    while bluemon < len(blue) and redmon < len(red):
+        bluedamage = hit_damage(blue[bluemon], red[redmon], effectiveness)
+        reddamage = hit_damage(red[redmon], blue[bluemon], effectiveness)
+        if bluedamage <= 0 and reddamage <= 0:
+            # neither can hurt the other, both are as good as gone
+            bluemon += 1
+            redmon += 1
+            continue
+        bluehits = math.ceil(redhp[redmon] / bluedamage) if bluedamage > 0 else math.inf
+        redhits = math.ceil(bluehp[bluemon] / reddamage) if reddamage > 0 else math.inf
+        bluefirst = blue[bluemon].speed >= red[redmon].speed
+        if bluehits < redhits or (bluehits == redhits and bluefirst):
+            bluehp[bluemon] -= reddamage * (bluehits - 1 if bluefirst else bluehits)
+            redhp[redmon] = 0
+            redmon += 1
+        else:
+            redhp[redmon] -= bluedamage * (redhits if bluefirst else redhits - 1)
+            bluehp[bluemon] = 0
+            bluemon += 1
+    bluedealt = sum(1 - max(0, hp) for hp in redhp)
+    reddealt = sum(1 - max(0, hp) for hp in bluehp)
+    if bluedealt + reddealt == 0:
+        return 50
+    return max(bluedealt, reddealt) / (bluedealt + reddealt) * 100
@@ -0,0 +1,114 @@
+"""
+Move metadata of the match analyzer.
+
+MOVES maps a move key (lowercase without spaces or hyphens, like the move keys
+of make_battler) to a MoveInfo telling what the analyzer's rules make of the
+move, so Sub_Fight tests a flag instead of comparing the name against a list.
+It starts out with an empty MoveInfo for every move of pokecat's gen4 move
+data, the rules below are applied on top. register_move() adds or changes a
+rule, e.g.
+    register_move('shellsmash', STAT_BOOST, stages=(('atk', 2), ('satk', 2), ('speed', 2)), setup_value=7.5)
+"""
+from collections import namedtuple
+
+import pokecat
+
+STAT_BOOST = 1 << 0  # worth setting up with before the 1v1, raises the stat stages in MoveInfo.stages
+NOT_FOR_GHOSTS = 1 << 1  # the STAT_BOOST and setup_value don't apply if the user is a ghost type (curse)
+HEAL = 1 << 2  # heals MoveInfo.heal of the user's hp per use, checked for heal cancer
+CHARGE = 1 << 3  # needs a turn to charge before hitting
+RECHARGE = 1 << 4  # needs a turn to recharge after hitting
+RECOIL = 1 << 5  # the user takes MoveInfo.recoil of the damage dealt
+OHKO = 1 << 6
+SOUND = 1 << 7  # blocked by soundproof
+HP_BASED = 1 << 8  # damage depends on the current hp of the user or the target
+
+MoveInfo = namedtuple('MoveInfo', 'flags stages stage_cap setup_value heal recoil')
+"""
+flags: the flags above
+stages: ((stat, stage change), ...) of a STAT_BOOST, stats named like the StatBonus keys
+stage_cap: highest stage the stages can raise a stat to, None for the usual 6
+setup_value: how much a boosting move adds to the value of its user per turn alive
+heal: part of the max hp healed per use
+recoil: part of the damage dealt that hits the user
+"""
+
+NO_INFO = MoveInfo(0, (), None, 0, 0, 0)
+
+MOVES = {}
+
+
+def move_key(name):
+    return name.lower().replace(' ', '').replace('-', '')
+
+
+def register_move(key, flags=0, stages=(), stage_cap=None, setup_value=0, heal=0, recoil=0):
+    """Sets the analyzer's rules for a move, replacing earlier ones."""
+    MOVES[key] = MoveInfo(flags, tuple(stages), stage_cap, setup_value, heal, recoil)
+
+
+def move_info(key):
+    return MOVES.get(key, NO_INFO)
+
+
+for _move in pokecat.gen4data.MOVES:
+    if _move:
+        MOVES[move_key(_move['name'])] = NO_INFO
+
+# stat boosts
+for _key in ('howl', 'meditate', 'sharpen'):
+    register_move(_key, STAT_BOOST, stages=(('atk', 1),), setup_value=1)
+register_move('growth', STAT_BOOST, stages=(('satk', 1),), setup_value=1)
+register_move('swordsdance', STAT_BOOST, stages=(('atk', 2),), setup_value=7.5)
+for _key in ('nastyplot', 'tailglow'):
+    register_move(_key, STAT_BOOST, stages=(('satk', 2),), setup_value=7.5)
+for _key in ('defensecurl', 'withdraw', 'harden'):
+    register_move(_key, STAT_BOOST, stages=(('def', 1),), setup_value=1.2)
+for _key in ('acidarmor', 'barrier', 'irondefense'):
+    register_move(_key, STAT_BOOST, stages=(('def', 2),), setup_value=4)
+for _key in ('defendorder', 'cosmicpower'):
+    register_move(_key, STAT_BOOST, stages=(('def', 1), ('sdef', 1)), setup_value=3)
+register_move('stockpile', STAT_BOOST, stages=(('def', 1), ('sdef', 1)), stage_cap=3, setup_value=1.2)
+# amnesia and calm mind have always counted as attack boosts here
+register_move('amnesia', STAT_BOOST, stages=(('atk', 1),), setup_value=5)
+register_move('calmmind', STAT_BOOST, stages=(('atk', 1), ('sdef', 1)), setup_value=3)
+register_move('bulkup', STAT_BOOST, stages=(('atk', 1), ('def', 1)), setup_value=2.5)
+register_move('dragondance', STAT_BOOST, stages=(('atk', 1), ('speed', 1)), setup_value=4)
+for _key in ('rockpolish', 'agility'):
+    register_move(_key, STAT_BOOST, stages=(('speed', 2),), setup_value=0.75)
+register_move('curse', STAT_BOOST | NOT_FOR_GHOSTS, stages=(('atk', 1), ('def', 1), ('speed', -1)), setup_value=3.25)
+# its boosts depend on the user's swagger and flatter, see Sub_Fight
+register_move('heartswap', STAT_BOOST)
+register_move('acupressure', setup_value=9)
+
+# heals, doubletime (ingrain or aqua ring with protect or detect) and oprest (rest with hydration and rain dance)
+# are what Sub_Fight makes of those combinations
+for _key in ('recover', 'morningsun', 'softboiled', 'slackoff', 'roost', 'synthesis', 'milkdrink', 'healorder',
+             'moonlight'):
+    register_move(_key, HEAL, heal=0.51)
+for _key in ('ingrain', 'aquaring'):
+    register_move(_key, HEAL, heal=0.07)
+register_move('rest', HEAL, heal=0.34)
+register_move('doubletime', HEAL, heal=0.13)
+register_move('oprest', HEAL, heal=0.81)
+
+# two turn moves
+for _key in ('skullbash', 'skyattack', 'razorwind', 'solarbeam'):
+    register_move(_key, CHARGE)
+for _key in ('hyperbeam', 'gigaimpact', 'rockwrecker', 'blastburn', 'hydrocannon', 'frenzyplant', 'roaroftime'):
+    register_move(_key, RECHARGE)
+
+register_move('headsmash', RECOIL, recoil=0.5)
+for _key in ('doubleedge', 'volttackle', 'flareblitz', 'bravebird', 'woodhammer'):
+    register_move(_key, RECOIL, recoil=0.33)
+for _key in ('takedown', 'submission'):
+    register_move(_key, RECOIL, recoil=0.25)
+
+for _key in ('horndrill', 'sheercold', 'fissure', 'guillotine'):
+    register_move(_key, OHKO | HP_BASED)
+for _key in ('selfdestruct', 'explosion', 'reversal', 'flail', 'waterspout', 'eruption', 'crushgrip', 'wringout',
+             'brine', 'endeavor', 'superfang'):
+    register_move(_key, HP_BASED)
+
+for _key in ('hypervoice', 'bugbuzz', 'snore', 'chatter'):
+    register_move(_key, SOUND)
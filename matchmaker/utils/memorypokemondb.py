@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+# source code owned by Twitch Plays Pokemon AUTHORIZED USE ONLY see LICENSE.MD
+import logging
+from copy import deepcopy
+from datetime import timedelta
+
+from .pokemondb import PokemonSetRepository, default_dir_path, make_pokeset_db_id
+
+log = logging.getLogger(__name__)
+
+
+class MemoryPokemonSetRepository(PokemonSetRepository):
+    """PokemonSetRepository kept entirely in process memory.
+
+    Loads the pokesets straight from the pokemon db json instead of syncing
+    them into mongodb, so tests and benchmarks can run without a database.
+    Appearances and rarities live only as long as the object does.
+    """
+
+    def __init__(self, game_id, dir_path=default_dir_path,
+                 full_rarity_update_interval=timedelta(hours=1)):
+        # There is nothing to write appearances to, so each one is flushed,
+        # which drops it, right away.
+        self._init_state(game_id, dir_path, appearance_flush_interval=None, max_pending_appearances=1,
+                         full_rarity_update_interval=full_rarity_update_interval)
+        self.sets = None
+        self.refresh_index()
+
+    def refresh_index(self):
+        """(Re)load the set index from the pokemon db, resetting appearances."""
+        self.index.load({
+            "_id": make_pokeset_db_id(pokeset),
+            "last_match": None,
+            "last_match_at": None,
+            "appearances": 0,
+            "data": pokeset,
+            "enabled": True,
+        } for pokeset in self._load_pokemon_db())
+
+    def verify_index(self):
+        return True
+
+    def ensure_indexes(self):
+        pass
+
+    def flush(self):
+        self._pending_appearances.clear()
+
+    def _store_effective_rarities(self, pokesets):
+        pass
+
+    def find(self, query=None, projection=None, sort=None):
+        """Find enabled set documents matching a mongo style query.
+
+        Supports field equality, dotted paths into subdocuments and arrays,
+        $and/$or/$nor and the $eq, $ne, $in, $nin, $all, $exists, $gt, $gte,
+        $lt and $lte operators. The projection is ignored, full copies of the
+        documents are returned.
+        """
+        if query is None:
+            query = {}
+        results = [deepcopy(doc) for doc in self.index.documents() if _matches(doc, query)]
+        for key, direction in reversed(sort or []):
+            results.sort(key=lambda doc: _sort_key(_values(doc, key.split("."))),
+                         reverse=direction < 0)
+        return results
+
+
+def _values(value, parts):
+    """All values found at a dotted path, descending into arrays like mongodb."""
+    if not parts:
+        return [value] + (value if isinstance(value, list) else [])
+    if isinstance(value, dict):
+        if parts[0] not in value:
+            return []
+        return _values(value[parts[0]], parts[1:])
+    if isinstance(value, list):
+        return [v for element in value for v in _values(element, parts)]
+    return []
+
+
+def _sort_key(values):
+    value = values[0] if values else None
+    return value is not None, value
+
+
+def _compare(values, arg, compare):
+    for value in values:
+        try:
+            if value is not None and compare(value, arg):
+                return True
+        except TypeError:
+            pass
+    return False
+
+
+_OPERATORS = {
+    "$eq": lambda values, arg: _match_value(values, arg),
+    "$ne": lambda values, arg: not _match_value(values, arg),
+    "$in": lambda values, arg: any(_match_value(values, a) for a in arg),
+    "$nin": lambda values, arg: not any(_match_value(values, a) for a in arg),
+    "$all": lambda values, arg: all(_match_value(values, a) for a in arg),
+    "$exists": lambda values, arg: bool(values) == bool(arg),
+    "$gt": lambda values, arg: _compare(values, arg, lambda v, a: v > a),
+    "$gte": lambda values, arg: _compare(values, arg, lambda v, a: v >= a),
+    "$lt": lambda values, arg: _compare(values, arg, lambda v, a: v < a),
+    "$lte": lambda values, arg: _compare(values, arg, lambda v, a: v <= a),
+}
+
+
+def _match_value(values, expected):
+    if expected is None:
+        return not values or None in values
+    return expected in values
+
+
+def _match_condition(values, condition):
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        for operator, arg in condition.items():
+            if operator not in _OPERATORS:
+                raise ValueError("unsupported query operator: {}".format(operator))
+            if not _OPERATORS[operator](values, arg):
+                return False
+        return True
+    return _match_value(values, condition)
+
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(_matches(doc, q) for q in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(doc, q) for q in condition):
+                return False
+        elif key == "$nor":
+            if any(_matches(doc, q) for q in condition):
+                return False
+        elif key.startswith("$"):
+            raise ValueError("unsupported query operator: {}".format(key))
+        elif not _match_condition(_values(doc, key.split(".")), condition):
+            return False
+    return True
@@ -6,20 +6,96 @@ from os import path
 
 log = logging.getLogger(__name__)
 
+_CHUNK_SIZE = 64 * 1024
+
 
 @lru_cache(maxsize=1)
 def get_pbr_pokemon_db(dir_path):
+    """All pokesets of pbrpokemondb.json as a list, cached.
+
+    The list stays in memory for as long as it is cached, so only the
+    decoding and deduplication are incremental here.  Iterate
+    iter_pbr_pokemon_db to keep memory flat.
+    """
+    return list(iter_pbr_pokemon_db(dir_path))
+
+
+def iter_pbr_pokemon_db(dir_path):
+    """Yield the pokesets of pbrpokemondb.json one at a time.
+
+    The file is decoded incrementally, so besides the species+setname keys
+    used for deduplication only the set being decoded is held in memory.
+    Sets whose species+setname already appeared are dropped.
+    """
     file = path.join(dir_path, "pbrpokemondb.json")
-    with open(file, "rt", encoding="utf-8") as f:
-        result = list(json.load(f))
-    # check uniqueness of species and setname
     existing = set()
-    for i, pokeset in enumerate(result[:]):
-        id_ = (pokeset["species"]["id"], pokeset["setname"])
-        if id_ in existing:
-            log.error("pokeset species+setname is not unique and therefore removed: %s %s", pokeset["species"]["name"],
-                      pokeset["setname"])
-            result.remove(pokeset)
-        existing.add(id_)
-    del existing
-    return result
+    duplicates = 0
+    with open(file, "rt", encoding="utf-8") as f:
+        for pokeset in _iter_json_array(f):
+            id_ = (pokeset["species"]["id"], pokeset["setname"])
+            if id_ in existing:
+                log.error("pokeset species+setname is not unique and therefore removed: %s %s",
+                          pokeset["species"]["name"], pokeset["setname"])
+                duplicates += 1
+                continue
+            existing.add(id_)
+            yield pokeset
+    if duplicates:
+        log.error("removed %d duplicate pokesets from %s", duplicates, file)
+
+
+def _iter_json_array(f, chunk_size=_CHUNK_SIZE):
+    """Yield the elements of the top-level JSON array in a text file."""
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def next_char():
+        """Skip whitespace and return the next character, or '' at the end."""
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf) or eof:
+                return buf[pos:pos + 1]
+            fill()
+
+    if next_char() != "[":
+        raise ValueError("expected a JSON array in {}".format(getattr(f, "name", f)))
+    pos += 1
+    if next_char() == "]":
+        return
+    while True:
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        if not eof and (end == len(buf) or not _is_delimiter(buf[end])):
+            # the value may continue in the next chunk, like 1 of 1.5
+            fill()
+            continue
+        pos = end
+        yield value
+        char = next_char()
+        if char == "]":
+            return
+        if char != ",":
+            raise ValueError("malformed JSON array in {} at offset {}".format(getattr(f, "name", f), pos))
+        pos += 1
+        next_char()
+
+
+def _is_delimiter(char):
+    return char in ",]" or char.isspace()
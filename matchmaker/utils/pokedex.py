@@ -3,21 +3,175 @@
 
 import os
 import json
+import mmap
+import struct
+import logging
+import tempfile
 
 from pokecat.utils import normalize_name
 
+log = logging.getLogger(__name__)
+
 _local_dir = os.path.dirname(os.path.realpath(__file__))
 _pokedex_path = os.path.join(_local_dir, "pokedex.json")
-with open(_pokedex_path, "r", encoding="utf-8") as f:
-    POKEDEX = json.load(f)
+_snapshot_path = os.path.join(_local_dir, "pokedex.snapshot")
+
+# The snapshot is a compact binary form of pokedex.json: a header, a JSON
+# key index and the entries as individually encoded JSON blobs. It is memory
+# mapped, so forked workers share its pages, and entries are only decoded
+# when looked up. It is rebuilt whenever pokedex.json changes.
+_SNAPSHOT_MAGIC = b"PDXS"
+# bump when changing the snapshot layout or the name normalization
+_SNAPSHOT_VERSION = 1
+# magic, version, source size, source mtime_ns, key index length
+_SNAPSHOT_HEADER = struct.Struct("<4sIQqI")
+
+
+class _Snapshot:
+    """Lazily decoding view of a pokedex snapshot."""
+
+    def __init__(self, buffer, ids, names, order, data_start):
+        self._buffer = buffer
+        self._ids = ids
+        self._names = names
+        self._order = order
+        self._data_start = data_start
+        self._entries = {}
+
+    def entry(self, location):
+        offset, length = location
+        entry = self._entries.get(offset)
+        if entry is None:
+            start = self._data_start + offset
+            entry = self._entries[offset] = json.loads(self._buffer[start:start + length].decode("utf-8"))
+        return entry
+
+    def get_by_id(self, key):
+        location = self._ids.get(key)
+        return self.entry(location) if location else None
+
+    def get_by_name(self, key):
+        location = self._names.get(key)
+        return self.entry(location) if location else None
+
+    def entries(self):
+        return [self.entry(location) for location in self._order]
+
+    def id_dict(self):
+        return {key: self.entry(location) for key, location in self._ids.items()}
+
+    def name_dict(self):
+        return {key: self.entry(location) for key, location in self._names.items()}
+
+
+def _source_stamp():
+    stat = os.stat(_pokedex_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _build_snapshot(pokedex, stamp):
+    """Encode the pokedex entries into snapshot bytes."""
+    blobs = []
+    order = []
+    ids = {}
+    names = {}
+    offset = 0
+    for entry in pokedex:
+        blob = json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        location = [offset, len(blob)]
+        blobs.append(blob)
+        order.append(location)
+        ids[entry["id"].lower()] = location
+        names[normalize_name(entry["name"])] = location
+        offset += len(blob)
+    index = json.dumps({"ids": ids, "names": names, "order": order}, separators=(",", ":")).encode("utf-8")
+    header = _SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, _SNAPSHOT_VERSION, stamp[0], stamp[1], len(index))
+    return b"".join([header, index] + blobs)
+
 
-POKEDEX_ID_DICT = {}
+def _write_snapshot(stamp):
+    with open(_pokedex_path, "r", encoding="utf-8") as f:
+        pokedex = json.load(f)
+    fd, tmp_path = tempfile.mkstemp(dir=_local_dir, prefix=".pokedex.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_build_snapshot(pokedex, stamp))
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, _snapshot_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _open_snapshot(stamp):
+    """Map the snapshot file, or return None if it is missing or stale."""
+    try:
+        with open(_snapshot_path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    return _parse_snapshot(buffer, stamp)
+
+
+def _parse_snapshot(buffer, stamp):
+    if len(buffer) < _SNAPSHOT_HEADER.size:
+        return None
+    magic, version, size, mtime_ns, index_length = _SNAPSHOT_HEADER.unpack_from(buffer)
+    if magic != _SNAPSHOT_MAGIC or version != _SNAPSHOT_VERSION or (size, mtime_ns) != stamp:
+        return None
+    index_end = _SNAPSHOT_HEADER.size + index_length
+    index = json.loads(buffer[_SNAPSHOT_HEADER.size:index_end].decode("utf-8"))
+    return _Snapshot(buffer, index["ids"], index["names"], index["order"], index_end)
+
+
+def _read_snapshot(stamp):
+    """Snapshot of pokedex.json kept in memory instead of a mapped file."""
+    with open(_pokedex_path, "r", encoding="utf-8") as f:
+        return _parse_snapshot(_build_snapshot(json.load(f), stamp), stamp)
 
-POKEDEX_NAME_DICT = {}
 
-for entry in POKEDEX:
-    POKEDEX_ID_DICT[entry["id"].lower()] = entry
-    POKEDEX_NAME_DICT[normalize_name(entry["name"])] = entry
+def _load_snapshot():
+    stamp = _source_stamp()
+    snapshot = _open_snapshot(stamp)
+    if snapshot is None:
+        log.info("building pokedex snapshot from %s", _pokedex_path)
+        try:
+            _write_snapshot(stamp)
+        except OSError as e:
+            # e.g. a read-only install, decode the json into memory instead
+            log.warning("could not write pokedex snapshot (%s), using pokedex.json directly", e)
+            return _read_snapshot(stamp)
+        snapshot = _open_snapshot(stamp)
+        if snapshot is None:
+            # e.g. pokedex.json changed again since the stamp was taken, or the mapping failed
+            log.warning("could not open the new pokedex snapshot, using pokedex.json directly")
+            snapshot = _read_snapshot(stamp)
+    return snapshot
+
+
+_snapshot = None
+
+
+def _get_snapshot():
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = _load_snapshot()
+    return _snapshot
+
+
+def __getattr__(name):
+    # POKEDEX, POKEDEX_ID_DICT and POKEDEX_NAME_DICT are materialized on first access
+    if name == "POKEDEX":
+        value = _get_snapshot().entries()
+    elif name == "POKEDEX_ID_DICT":
+        value = _get_snapshot().id_dict()
+    elif name == "POKEDEX_NAME_DICT":
+        value = _get_snapshot().name_dict()
+    else:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    globals()[name] = value
+    return value
+
 
 GEN1_MAX_ID = 151  # Mew
 GEN2_MAX_ID = 251  # Celebi
@@ -56,7 +210,7 @@ def get_entry(nat_id):
         nat_id = str(int_id) + "-" + split[1]
     else:
         nat_id = str(int_id)
-    entry = POKEDEX_ID_DICT.get(nat_id.lower())
+    entry = _get_snapshot().get_by_id(nat_id.lower())
     if not entry:
         raise IndexError("Pokemon ID not recognized")
     return entry
@@ -66,7 +220,7 @@ def get_by_name(name):
     """Returns a pokemon dict by name.
     Returns None if no Pokemon matched."""
     name = normalize_name(name)
-    return POKEDEX_NAME_DICT.get(name)
+    return _get_snapshot().get_by_name(name)
 
 
 def get_by_name_or_entry(name_or_entry):
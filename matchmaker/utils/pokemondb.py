@@ -1,11 +1,17 @@
 # -*- coding: utf-8 -*-
 # source code owned by Twitch Plays Pokemon AUTHORIZED USE ONLY see LICENSE.MD
+import json
+import hashlib
 import logging
 from os import path
+from copy import deepcopy
+from itertools import count
+from collections import defaultdict, namedtuple
 from datetime import datetime, timedelta
 
+import gevent
 from bson.son import SON
-from pymongo import UpdateOne
+from pymongo import UpdateOne, IndexModel, ASCENDING, DESCENDING
 
 from .pbrpokemondb import get_pbr_pokemon_db
 
@@ -20,24 +26,240 @@ _POKEMON_DB_LOADERS = {
 
 MAX_COOLDOWN = timedelta(weeks=4)
 
+# Compact reference to a pokeset, carrying only what set selection looks at.
+# Resolve the full pokeset with PokemonSetRepository.get_by_id_components.
+SetHandle = namedtuple('SetHandle', ['species', 'setname', 'effective_rarity', 'shiny', 'tags'])
+
+# indexes backing the queries issued against the pokesets collection
+_INDEXES = [
+    IndexModel([("enabled", ASCENDING), ("_id.species", ASCENDING), ("_id.setname", ASCENDING)],
+               name="enabled_species_setname"),
+    IndexModel([("enabled", ASCENDING), ("data.tags", ASCENDING)],
+               name="enabled_tags"),
+    IndexModel([("enabled", ASCENDING), ("data.shiny", ASCENDING), ("data.hidden", ASCENDING)],
+               name="enabled_shiny_hidden"),
+    IndexModel([("data.tags", ASCENDING)],
+               name="tags"),
+    IndexModel([("_id.species", ASCENDING), ("last_match_at", DESCENDING)],
+               name="species_last_match_at"),
+]
+
+# bump to force a full resync after changing how sets are hashed or stored
+_SYNC_VERSION = "1"
+
+
+class PokemonSetIndex:
+    """Resident copy of the enabled pokeset documents.
+
+    Keeps the documents in memory together with indexes on the fields that
+    `PokemonSetRepository.get_by` filters on, so set lookups don't need a
+    round trip to the database. Documents handed out by the index are shared
+    and must be treated as read-only; deepcopy `data` before altering it.
+    """
+
+    def __init__(self):
+        self._docs = {}
+        self._order = {}
+        self._counter = count()
+        self._by_species = defaultdict(set)
+        self._by_setname = defaultdict(set)
+        self._by_tag = defaultdict(set)
+        self._by_shiny = defaultdict(set)
+        self._by_hidden = defaultdict(set)
+        self._by_biddable = defaultdict(set)
+        self._by_mixable = defaultdict(set)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, key):
+        return key in self._docs
+
+    def keys(self):
+        return self._docs.keys()
+
+    def documents(self):
+        return self._docs.values()
+
+    def species_ids(self):
+        return self._by_species.keys()
+
+    def load(self, documents):
+        """Replace the index contents with the given documents."""
+        self.__init__()
+        for doc in documents:
+            self.add(doc)
+
+    def add(self, doc):
+        key = make_pokeset_key(doc["_id"])
+        if key in self._docs:
+            self.remove(key)
+        data = doc["data"]
+        self._docs[key] = doc
+        self._order[key] = next(self._counter)
+        self._by_species[key[0]].add(key)
+        self._by_setname[key[1].lower()].add(key)
+        for tag in data.get("tags", ()):
+            self._by_tag[tag].add(key)
+        self._by_shiny[data.get("shiny")].add(key)
+        self._by_hidden[data.get("hidden")].add(key)
+        self._by_biddable[doc.get("biddable")].add(key)
+        self._by_mixable[doc.get("mixable")].add(key)
+
+    def remove(self, key):
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        del self._order[key]
+        data = doc["data"]
+        self._discard(self._by_species, key[0], key)
+        self._discard(self._by_setname, key[1].lower(), key)
+        for tag in data.get("tags", ()):
+            self._discard(self._by_tag, tag, key)
+        self._discard(self._by_shiny, data.get("shiny"), key)
+        self._discard(self._by_hidden, data.get("hidden"), key)
+        self._discard(self._by_biddable, doc.get("biddable"), key)
+        self._discard(self._by_mixable, doc.get("mixable"), key)
+
+    @staticmethod
+    def _discard(index, value, key):
+        keys = index.get(value)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del index[value]
+
+    def get(self, key):
+        return self._docs.get(key)
+
+    def query(self, species_id=None, setname=None,
+              tags_none=None, tags_any=None, tags_all=None,
+              not_keys=None, not_species_ids=None,
+              mixable=None, biddable=None, shiny=None, hidden=None):
+        """Return documents matching the criteria, in load order.
+
+        Mirrors the semantics of the mongo query built by `make_get_by_query`.
+        """
+        candidates = []
+        if species_id is not None:
+            candidates.append(self._by_species.get(species_id, ()))
+        if setname:
+            candidates.append(self._by_setname.get(setname.lower(), ()))
+        if tags_all:
+            candidates.extend(self._by_tag.get(tag, ()) for tag in tags_all)
+        if tags_any:
+            candidates.append(set().union(*(self._by_tag.get(tag, ()) for tag in tags_any)))
+        if shiny is not None:
+            candidates.append(self._by_shiny.get(shiny, ()))
+        if hidden is not None:
+            candidates.append(self._by_hidden.get(hidden, ()))
+        if biddable is not None:
+            candidates.append(self._by_biddable.get(biddable, ()))
+        if mixable is not None:
+            candidates.append(self._by_mixable.get(mixable, ()))
+
+        if candidates:
+            candidates.sort(key=len)
+            keys = set(candidates[0])
+            for other in candidates[1:]:
+                if not keys:
+                    break
+                keys.intersection_update(other)
+        else:
+            keys = set(self._docs)
+        if tags_none:
+            for tag in tags_none:
+                keys.difference_update(self._by_tag.get(tag, ()))
+        if not_keys:
+            keys.difference_update(not_keys)
+        if not_species_ids:
+            not_species_ids = set(not_species_ids)
+            keys = {key for key in keys if key[0] not in not_species_ids}
+        return [self._docs[key] for key in sorted(keys, key=self._order.__getitem__)]
+
 
 class PokemonSetRepository:
-    def __init__(self, db, game_id, dir_path=default_dir_path):
+    def __init__(self, db, game_id, dir_path=default_dir_path,
+                 appearance_flush_interval=5.0, max_pending_appearances=256,
+                 full_rarity_update_interval=timedelta(hours=1)):
+        """
+        Appearance updates are written behind: they are applied to the set
+        index immediately and coalesced per set into periodic bulk writes.
+        Every `appearance_flush_interval` seconds the pending updates are
+        written, or earlier once `max_pending_appearances` distinct sets are
+        pending. An interval of None or 0 disables the background flush,
+        leaving it to `flush()`. Call `close()` on shutdown.
+
+        `update_rarities` only recomputes species that appeared since its
+        last call, and rebuilds every species at most every
+        `full_rarity_update_interval` so the cooldown decay of the others
+        still progresses.
+        """
+        self._init_state(game_id, dir_path, appearance_flush_interval, max_pending_appearances,
+                         full_rarity_update_interval)
+        pokemon_db = self._load_pokemon_db()
+        self.sets = db["pokesets"]
+        self.manifests = db["pokeset_manifests"]
+        self.ensure_indexes()
+        self._sync(pokemon_db)
+        self.refresh_index()
+
+    def _init_state(self, game_id, dir_path, appearance_flush_interval, max_pending_appearances,
+                    full_rarity_update_interval):
+        """Set up everything but the database, shared with the other repositories."""
         self.game_id = game_id
-        log.info("loading pokemon db for game_id %s...", game_id)
-        pokemon_db = _POKEMON_DB_LOADERS[game_id](dir_path=dir_path)
-        log.info("loading pokemon db for game_id %s finished!", game_id)
+        self.dir_path = dir_path
+        self.full_rarity_update_interval = full_rarity_update_interval
+        self._last_full_rarity_update = None
+        self._dirty_species = set()
+        self.appearance_flush_interval = appearance_flush_interval
+        self.max_pending_appearances = max_pending_appearances
+        self._pending_appearances = {}
+        self._flusher = None
+        self.index = PokemonSetIndex()
+
+    def _load_pokemon_db(self):
+        log.info("loading pokemon db for game_id %s...", self.game_id)
+        pokemon_db = _POKEMON_DB_LOADERS[self.game_id](dir_path=self.dir_path)
+        log.info("loading pokemon db for game_id %s finished!", self.game_id)
         log.info("Length of pbr pokemon db: %d", len(pokemon_db))
-        self.sets = db["pokesets"]
+        return pokemon_db
+
+    def ensure_indexes(self):
+        """Create the indexes the pokesets collection is queried with, if missing."""
+        self.sets.create_indexes(_INDEXES)
+
+    def _sync(self, pokemon_db):
+        """Bring the database in line with the loaded pokemon db.
+
+        Each stored set carries a content hash of its data, and a manifest
+        document per game_id stores a hash over all of them. If the manifest
+        is unchanged the sync is skipped entirely, otherwise only new, changed,
+        re-enabled and removed sets are written.
+        """
+        set_hashes = {}
+        for pokeset in pokemon_db:
+            set_hashes[(pokeset["species"]["id"], pokeset["setname"])] = hash_pokeset(pokeset)
+        manifest_hash = hash_manifest(set_hashes)
+        manifest = self.manifests.find_one({"_id": self.game_id})
+        if (manifest and manifest.get("hash") == manifest_hash
+                and self.sets.count_documents({"enabled": True}) == len(set_hashes)):
+            log.info("pokemon db data in database is up to date, skipping update")
+            return
+
         log.info("preparing to update pokemon db data in database...")
-        # first, mark every set as disabled
-        self.sets.update_many({}, {"$set": {"enabled": False}})
-        # upsert each pokemon set into db
+        stored = {}
+        for doc in self.sets.find({}, {"data_hash": 1, "enabled": 1}):
+            stored[make_pokeset_key(doc["_id"])] = doc
         operations = []
         for pokeset in pokemon_db:
-            pokeset_id = make_pokeset_db_id(pokeset)
+            key = (pokeset["species"]["id"], pokeset["setname"])
+            data_hash = set_hashes[key]
+            doc = stored.get(key)
+            if doc and doc.get("enabled") and doc.get("data_hash") == data_hash:
+                continue
             operations.append(UpdateOne(
-                {"_id": pokeset_id},
+                {"_id": make_pokeset_db_id(pokeset)},
                 {
                     "$setOnInsert": {
                         "last_match": None,
@@ -46,134 +268,291 @@ class PokemonSetRepository:
                     },
                     "$set": {
                         "data": pokeset,
+                        "data_hash": data_hash,
                         "enabled": True,  # mark updated sets as enabled again
                     },
                 },
                 upsert=True,
             ))
-        log.info("updating pokemon db data in database...")
+        # mark sets that are no longer in the pokemon db as disabled
+        for key, doc in stored.items():
+            if doc.get("enabled") and key not in set_hashes:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"enabled": False}}))
+        log.info("updating pokemon db data in database (%d changed sets)...", len(operations))
         if operations:
             self.sets.bulk_write(operations, ordered=False)
+        self.manifests.replace_one(
+            {"_id": self.game_id},
+            {"_id": self.game_id, "hash": manifest_hash, "updated_at": datetime.utcnow()},
+            upsert=True,
+        )
         log.info("updating pokemon db data in database finished!")
 
+    def refresh_index(self):
+        """(Re)load the resident set index from the database."""
+        log.info("loading enabled pokemon sets into the set index...")
+        self.index.load(self.sets.find({"enabled": True}))
+        log.info("loaded %d pokemon sets into the set index", len(self.index))
+
+    def verify_index(self):
+        """Check the resident set index against the database.
+
+        Reloads the index if the enabled sets in the database differ from the
+        indexed ones, e.g. because another process edited the collection.
+
+        Returns: True if the index was already consistent.
+        """
+        db_keys = {make_pokeset_key(doc["_id"]) for doc in self.sets.find({"enabled": True}, {"_id": 1})}
+        if db_keys == set(self.index.keys()):
+            return True
+        log.warning("pokemon set index is out of sync with the database "
+                    "(%d indexed, %d in database), reloading", len(self.index), len(db_keys))
+        self.refresh_index()
+        return False
+
     def get_by_id_components(self, species_id, setname):
         """Get the pokeset with these id components."""
-        result = self.sets.find_one({"_id.species": species_id, "_id.setname": setname, "enabled": True})
+        result = self.index.get((species_id, setname))
         if not result:
             return None
-        return result["data"]
+        return deepcopy(result["data"])
 
     def get_by_species_id(self, species_id):
-        return [p["data"] for p in self.sets.find({"_id.species": species_id, "enabled": True})]
+        return [deepcopy(p["data"]) for p in self.index.query(species_id=species_id)]
+
+    def get_by_species_ids(self, species_ids):
+        """Get the pokesets of several species at once.
+
+        Returns: dict of species id to the list of its pokeset documents.
+        The documents are shared with the set index and must not be modified.
+        """
+        return {species_id: self.index.query(species_id=species_id) for species_id in set(species_ids)}
+
+    def get_many_by_id_components(self, id_components):
+        """Batched `get_by(species_id=..., setname=...)`.
+
+        Args:
+            id_components: list of (species_id, setname) pairs. Setnames are
+                matched case-insensitively, an empty setname matches all
+                sets of the species.
+
+        Returns: list with the list of matching pokeset documents for each pair.
+        """
+        id_components = list(id_components)
+        by_species = self.get_by_species_ids(species_id for species_id, _ in id_components)
+        results = []
+        for species_id, setname in id_components:
+            pokesets = by_species[species_id]
+            if setname:
+                pokesets = [p for p in pokesets if p['data']['setname'].lower() == setname.lower()]
+            results.append(pokesets)
+        return results
 
     def get_by_species_id_and_tags(self, species_id, tags):
-        return [p["data"] for p in
-                self.sets.find({"_id.species": species_id, "enabled": True, "data.tags": {"$in": tags}})]
+        return [deepcopy(p["data"]) for p in self.index.query(species_id=species_id, tags_any=tags)]
 
     def get_by_tags(self, tags):
-        return [p["data"] for p in self.sets.find({"data.tags": {"$in": tags}})]
-
+        return [deepcopy(p["data"]) for p in self.index.query(tags_any=tags)]
 
     def get_by(self, species_id=None, setname=None,
                tags_none=None, tags_any=None, tags_all=None,
                not_sets=None, not_species_ids=None,
                mixable=None, biddable=None, shinies=None, hidden=None):
-        """Get a list of pokesets meeting the desired criteria."""
-        if not_sets is None:
-            not_sets = list()
-        if not_species_ids is None:
-            not_species_ids = list()
-        and_queries = []
-        query = {'enabled': True}
-        if hidden is not None:
-            query['data.hidden'] = hidden
-        tags_query = {}
-        if biddable is not None:
-            query['biddable'] = biddable
-        if mixable is not None:
-            query['mixable'] = mixable
-        if species_id is not None:
-            query['_id.species'] = species_id
-        if tags_none:
-            tags_query["$nin"] = tags_none
-        if tags_any:
-            tags_query["$in"] = tags_any
-        if tags_all:
-            tags_query["$all"] = tags_all
-        if shinies is not None:
-            if shinies:
-                query['data.shiny'] = True
-            else:
-                query['data.shiny'] = False
-        if tags_query:
-            query['data.tags'] = tags_query
-        and_queries.append(query)
-
-        for pokeset in not_sets:
-            not_queries = []
-            not_queries.append({'_id.species': {"$ne": pokeset['species']['id']}})
-            not_queries.append({'_id.setname': {"$ne": pokeset['setname']}})
-            and_queries.append({"$or": not_queries})
-
-        for species_id in not_species_ids:
-            and_queries.append({"_id.species": {"$ne": species_id}})
-
-        query = {'$and': and_queries}
-        sets = self.sets.find(query)
-        if setname:
-            sets = (s for s in sets if s['data']['setname'].lower() == setname.lower())
-        return list(sets)
+        """Get a list of pokesets meeting the desired criteria.
+
+        Served from the resident set index. The returned documents are
+        shared with the index and must not be modified.
+        """
+        not_keys = None
+        if not_sets:
+            not_keys = {(pokeset['species']['id'], pokeset['setname']) for pokeset in not_sets}
+        return self.index.query(
+            species_id=species_id, setname=setname,
+            tags_none=tags_none, tags_any=tags_any, tags_all=tags_all,
+            not_keys=not_keys, not_species_ids=not_species_ids,
+            mixable=mixable, biddable=biddable,
+            shiny=None if shinies is None else bool(shinies), hidden=hidden)
+
+    def get_handles_by(self, **kwargs):
+        """Like `get_by`, but returns a `SetHandle` for each matching pokeset."""
+        return [make_set_handle(doc) for doc in self.get_by(**kwargs)]
 
     def find(self, query=None, **kw):
         if query is None:
             query = {}
         return self.sets.find({**query, **{"enabled": True}}, **kw)
 
-    def update_rarities(self):
-        species_data = self.sets.aggregate([
-            {"$match": {"enabled": True}},
-            {"$group": {
-                "_id": "$_id.species",
-                "count": {"$sum": 1},
-                "last_match_at": {"$max": "$last_match_at"},
-            }},
-        ])
-        species_modifiers = {}
+    def update_rarities(self, full=None):
+        """Recompute the effective rarity of sets.
+
+        Args:
+            full: True to recompute every species, False to only recompute
+                species that appeared since the last call. If None, a full
+                rebuild is done if the last one is older than
+                `full_rarity_update_interval`.
+        """
         now = datetime.utcnow()
-        for species in species_data:
-            last_match_date = species["last_match_at"]
+        if full is None:
+            full = (self._last_full_rarity_update is None
+                    or now - self._last_full_rarity_update >= self.full_rarity_update_interval)
+        if full:
+            species_ids = list(self.index.species_ids())
+            self._last_full_rarity_update = now
+        else:
+            species_ids = [species_id for species_id in self._dirty_species
+                           if species_id in self.index.species_ids()]
+        self._dirty_species.clear()
+        # computed from the set index, which already includes pending appearance updates
+        changed = []
+        for species_id in species_ids:
+            pokesets = self.index.query(species_id=species_id)
+            last_match_date = max((p["last_match_at"] for p in pokesets if p.get("last_match_at")), default=None)
             last_match_time = now - last_match_date if last_match_date else MAX_COOLDOWN
             modifier = last_match_time.total_seconds() / MAX_COOLDOWN.total_seconds()
-            modifier = min(modifier, 1.0)
-            species_modifiers[species["_id"]] = modifier / species["count"]
-        bulk_ops = []
-        for pokeset in self.find():
-            species_id = pokeset["_id"]["species"]
-            modifier = species_modifiers[species_id]
-            bulk_ops.append(UpdateOne(
-                {"_id": make_pokeset_db_id(pokeset["data"])},
-                {"$set": {"effective_rarity": pokeset["data"]["rarity"] * modifier}}))
-        self.sets.bulk_write(bulk_ops)
+            modifier = min(modifier, 1.0) / len(pokesets)
+            for pokeset in pokesets:
+                effective_rarity = pokeset["data"]["rarity"] * modifier
+                if pokeset.get("effective_rarity") == effective_rarity:
+                    continue
+                pokeset["effective_rarity"] = effective_rarity
+                changed.append(pokeset)
+        if changed:
+            self._store_effective_rarities(changed)
+
+    def _store_effective_rarities(self, pokesets):
+        self.sets.bulk_write([UpdateOne(
+            {"_id": make_pokeset_db_id(pokeset["data"])},
+            {"$set": {"effective_rarity": pokeset["effective_rarity"]}}) for pokeset in pokesets])
 
     def update_set_appearance(self, set_id, match_id, match_started_at):
-        self.sets.update_one(
-            {"_id": set_id},
+        """Record that a set appeared in a match.
+
+        The set index is updated right away, the database write is queued
+        and coalesced with other appearances of the same set.
+        """
+        key = make_pokeset_key(set_id)
+        pokeset = self.index.get(key)
+        if pokeset is not None:
+            pokeset["last_match"] = match_id
+            pokeset["last_match_at"] = match_started_at
+            pokeset["appearances"] = pokeset.get("appearances", 0) + 1
+        self._dirty_species.add(key[0])
+        pending = self._pending_appearances.get(key)
+        if pending is None:
+            pending = self._pending_appearances[key] = {"_id": set_id, "appearances": 0}
+        pending["last_match"] = match_id
+        pending["last_match_at"] = match_started_at
+        pending["appearances"] += 1
+        if len(self._pending_appearances) >= self.max_pending_appearances:
+            self.flush()
+        else:
+            self._ensure_flusher()
+
+    def flush(self):
+        """Write all pending appearance updates to the database."""
+        if not self._pending_appearances:
+            return
+        pending, self._pending_appearances = self._pending_appearances, {}
+        operations = [UpdateOne(
+            {"_id": update["_id"]},
             {
                 "$set": {
-                    "last_match": match_id,
-                    "last_match_at": match_started_at,
+                    "last_match": update["last_match"],
+                    "last_match_at": update["last_match_at"],
                 },
-                "$inc": {"appearances": 1}
+                "$inc": {"appearances": update["appearances"]}
             },
             upsert=True,
-        )
+        ) for update in pending.values()]
+        try:
+            self.sets.bulk_write(operations, ordered=False)
+        except Exception:
+            # put the updates back, merging with whatever got queued meanwhile
+            for key, update in pending.items():
+                newer = self._pending_appearances.get(key)
+                if newer is not None:
+                    newer["appearances"] += update["appearances"]
+                else:
+                    self._pending_appearances[key] = update
+            raise
+
+    def close(self):
+        """Stop the background flush and write all pending updates."""
+        if self._flusher is not None:
+            self._flusher.kill()
+            self._flusher = None
+        self.flush()
+
+    def _ensure_flusher(self):
+        if self.appearance_flush_interval and (self._flusher is None or self._flusher.dead):
+            self._flusher = gevent.spawn(self._flush_loop)
+
+    def _flush_loop(self):
+        while self._pending_appearances:
+            gevent.sleep(self.appearance_flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                log.exception("failed to write pokeset appearances, retrying later")
 
     def get_last_match_date_for_species(self, species_id):
         """Returns the last match document from the database matching
         the give pokemon id."""
-        result = self.sets.find_one({"_id.species": species_id, "enabled": True}, sort=[("last_match_at", -1)])
-        if result:
-            return result["last_match_at"]
+        pokesets = self.index.query(species_id=species_id)
+        if pokesets:
+            return max((p.get("last_match_at") for p in pokesets),
+                       key=lambda last_match_at: (last_match_at is not None, last_match_at or datetime.min))
+
+
+def make_get_by_query(species_id=None,
+                      tags_none=None, tags_any=None, tags_all=None,
+                      not_sets=None, not_species_ids=None,
+                      mixable=None, biddable=None, shinies=None, hidden=None):
+    """Build the mongo query equivalent to `PokemonSetRepository.get_by`.
+
+    The setname criterion is applied as a post-filter and therefore not part
+    of the query.
+    """
+    if not_sets is None:
+        not_sets = list()
+    if not_species_ids is None:
+        not_species_ids = list()
+    and_queries = []
+    query = {'enabled': True}
+    if hidden is not None:
+        query['data.hidden'] = hidden
+    tags_query = {}
+    if biddable is not None:
+        query['biddable'] = biddable
+    if mixable is not None:
+        query['mixable'] = mixable
+    if species_id is not None:
+        query['_id.species'] = species_id
+    if tags_none:
+        tags_query["$nin"] = tags_none
+    if tags_any:
+        tags_query["$in"] = tags_any
+    if tags_all:
+        tags_query["$all"] = tags_all
+    if shinies is not None:
+        if shinies:
+            query['data.shiny'] = True
+        else:
+            query['data.shiny'] = False
+    if tags_query:
+        query['data.tags'] = tags_query
+    and_queries.append(query)
+
+    for pokeset in not_sets:
+        not_queries = []
+        not_queries.append({'_id.species': {"$ne": pokeset['species']['id']}})
+        not_queries.append({'_id.setname': {"$ne": pokeset['setname']}})
+        and_queries.append({"$or": not_queries})
+
+    for species_id in not_species_ids:
+        and_queries.append({"_id.species": {"$ne": species_id}})
+
+    return {'$and': and_queries}
 
 
 def make_pokeset_db_id(pokeset):
@@ -181,3 +560,28 @@ def make_pokeset_db_id(pokeset):
     pokeset_id["setname"] = pokeset["setname"]
     pokeset_id["species"] = pokeset["species"]["id"]
     return pokeset_id
+
+
+def hash_pokeset(pokeset):
+    """Content hash of a pokeset's data, independent of key order."""
+    encoded = json.dumps(pokeset, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def hash_manifest(set_hashes):
+    """Hash over all (species, setname) -> content hash pairs."""
+    digest = hashlib.sha1(_SYNC_VERSION.encode("utf-8"))
+    for key in sorted(set_hashes):
+        digest.update("{}\0{}\0{}\n".format(key[0], key[1], set_hashes[key]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def make_set_handle(doc):
+    data = doc["data"]
+    return SetHandle(doc["_id"]["species"], doc["_id"]["setname"], doc.get("effective_rarity", 0),
+                     data.get("shiny", False), tuple(data.get("tags", ())))
+
+
+def make_pokeset_key(pokeset_id):
+    """Hashable (species, setname) key for a pokeset db id."""
+    return pokeset_id["species"], pokeset_id["setname"]